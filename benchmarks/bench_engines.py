@@ -0,0 +1,38 @@
+"""
+Compares the simulation engines on QLearningAgent vs strategy pairings.
+
+Usage: python benchmarks/bench_engines.py [rounds] [iterations]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.QLearningAgent import QLearningAgent
+from model.constants import ROUNDS, ITERATIONS
+from model.engine import qlearning_kernel
+from model.tournamentManager import BOT_TYPES, ENGINES, play_pairing
+
+
+def time_pairing(opponent_name: str, engine: str, rounds: int, iterations: int) -> float:
+    start = time.perf_counter()
+    play_pairing(QLearningAgent(), BOT_TYPES[opponent_name](), rounds, iterations, None, 0, engine=engine)
+    return time.perf_counter() - start
+
+
+def main(rounds: int = ROUNDS, iterations: int = ITERATIONS) -> None:
+    print(f"kernel backend: {'numba' if qlearning_kernel.is_compiled() else 'pure python'}")
+    # Warm up, so that compilation is not part of the timings
+    time_pairing("TFTBot", "compiled", 1, 1)
+
+    turns = rounds * iterations
+    print(f"{'opponent':<15}" + "".join(f"{engine + ' (turns/s)':>24}" for engine in ENGINES))
+    for opponent_name in [name for name in BOT_TYPES if name != "QLearningAgent"]:
+        timings = [time_pairing(opponent_name, engine, rounds, iterations) for engine in ENGINES]
+        print(f"{opponent_name:<15}" + "".join(f"{turns / t:>24,.0f}" for t in timings))
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
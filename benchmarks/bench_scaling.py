@@ -0,0 +1,145 @@
+"""
+Scaling study of run_round_robin over the number of bots, rounds, iterations and workers.
+
+Every configuration runs in a fresh interpreter, so its peak RSS is its own. For each
+one the wall time, turns per second, peak RSS and bytes written are recorded in
+scaling_results.jsonl, and plotted into scaling_results.png by analyze_scaling:
+
+    bots        the default bots plus extra Q-learning agents, up to each --bots size
+    rounds      each of --rounds-sweep at the smallest number of bots
+    iterations  each of --iterations-sweep at the smallest number of bots
+    strong      the same tournament on each of --workers
+    weak        --rounds rounds per worker on each of --workers
+
+Usage: python benchmarks/bench_scaling.py [--bots 6 12 24 48] [--workers 1 2 4] [--log-policy none] ...
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from model.constants import OUTPUT_DIR
+from model.logging.InteractionLogger import LOG_POLICIES, LOG_NONE
+from model.tournamentManager import BOT_TYPES, ENGINES, ENGINE_PYTHON
+
+
+def peak_rss_mb(who) -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / 2 ** 20 if sys.platform == "darwin" else rss / 2 ** 10
+
+
+def directory_bytes(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name))
+               for path, _, names in os.walk(directory) for name in names)
+
+
+def run_configuration(config: dict) -> dict:
+    """Plays one configuration in this process and measures it"""
+    from model.constants import MATCHES_PLAYED
+    from model.tournamentManager import run_round_robin
+
+    with tempfile.TemporaryDirectory() as output_dir, open(os.devnull, "w") as devnull:
+        stdout = sys.stdout
+        sys.stdout = devnull  # every pairing prints a line
+        try:
+            start = time.perf_counter()
+            _, aggregate_stats = run_round_robin(
+                num_learners=config['bots'] - len(BOT_TYPES), rounds=config['rounds'],
+                iterations=config['iterations'], workers=config['workers'], seed=0,
+                log_policy=config['log_policy'], output_dir=output_dir, plots=False, engine=config['engine'])
+            wall_time = time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+        output_bytes = directory_bytes(output_dir)
+
+    # Every turn is counted once for each of the two bots playing it
+    turns = sum(stats[MATCHES_PLAYED] for stats in aggregate_stats.values()) // 2
+    return {
+        **config,
+        'wall_time': wall_time,
+        'turns': int(turns),
+        'turns_per_sec': turns / wall_time,
+        'peak_rss_mb': peak_rss_mb(resource.RUSAGE_SELF),
+        'worker_peak_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN),
+        'output_bytes': output_bytes,
+    }
+
+
+def measure(config: dict) -> dict:
+    """Runs one configuration in a fresh interpreter"""
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--single", json.dumps(config)],
+                            cwd=ROOT, check=True, capture_output=True, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def configurations(args) -> list:
+    base = {'bots': min(args.bots), 'rounds': args.rounds, 'iterations': args.iterations, 'workers': 1,
+            'log_policy': args.log_policy, 'engine': args.engine}
+    configs = [{**base, 'study': 'bots', 'bots': bots} for bots in args.bots]
+    configs += [{**base, 'study': 'rounds', 'rounds': rounds} for rounds in args.rounds_sweep]
+    configs += [{**base, 'study': 'iterations', 'iterations': iterations} for iterations in args.iterations_sweep]
+    configs += [{**base, 'study': 'strong', 'bots': max(args.bots), 'workers': workers} for workers in args.workers]
+    configs += [{**base, 'study': 'weak', 'bots': max(args.bots), 'rounds': args.rounds * workers,
+                 'workers': workers} for workers in args.workers]
+    return configs
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Scaling study of the round-robin tournament.")
+    parser.add_argument("--bots", nargs="+", type=int, default=[6, 12, 24, 48],
+                        help=f"tournament sizes, at least {len(BOT_TYPES)}")
+    parser.add_argument("--rounds", type=int, default=20, help="games per pairing outside the rounds sweep")
+    parser.add_argument("--iterations", type=int, default=20, help="turns per game outside the iterations sweep")
+    parser.add_argument("--rounds-sweep", nargs="*", type=int, default=[10, 100, 1000])
+    parser.add_argument("--iterations-sweep", nargs="*", type=int, default=[10, 100, 1000])
+    parser.add_argument("--workers", nargs="*", type=int, default=[1, 2, 4])
+    parser.add_argument("--log-policy", choices=LOG_POLICIES, default=LOG_NONE)
+    parser.add_argument("--engine", choices=ENGINES, default=ENGINE_PYTHON)
+    parser.add_argument("--output-dir", default=os.path.join(OUTPUT_DIR, "scaling"))
+    parser.add_argument("--no-plots", action="store_true")
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    if args.single is not None:
+        print(json.dumps(run_configuration(json.loads(args.single))))
+        return
+    if min(args.bots) < len(BOT_TYPES):
+        raise SystemExit(f"--bots must be at least {len(BOT_TYPES)}, the default bots")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    results_file = os.path.join(args.output_dir, "scaling_results.jsonl")
+    results = []
+    print(f"{'study':<12}{'bots':>6}{'rounds':>8}{'iters':>7}{'workers':>8}{'wall (s)':>10}{'turns/s':>14}"
+          f"{'RSS (MB)':>10}{'output (MB)':>13}")
+    with open(results_file, "w") as file:
+        for config in configurations(args):
+            result = measure(config)
+            results.append(result)
+            file.write(json.dumps(result) + "\n")
+            file.flush()
+            print(f"{result['study']:<12}{result['bots']:>6}{result['rounds']:>8}{result['iterations']:>7}"
+                  f"{result['workers']:>8}{result['wall_time']:>10.2f}{result['turns_per_sec']:>14,.0f}"
+                  f"{result['peak_rss_mb']:>10.1f}{result['output_bytes'] / 2 ** 20:>13.2f}")
+    print(f"Results have been written to {results_file}")
+
+    if not args.no_plots:
+        import matplotlib
+        matplotlib.use("Agg")
+        from model.stat_analysis.performance_analyzer import analyze_scaling
+        analyze_scaling(results, output_dir=args.output_dir, show=False)
+        print(f"Scaling plots have been generated in the {args.output_dir} directory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Measures the startup cost of the entry points.
+
+Each entry point is imported in a fresh interpreter several times; the median
+wall time is reported together with the heavy modules the import pulled in.
+
+Usage: python benchmarks/bench_startup.py [repeats]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["numpy", "pandas", "matplotlib"]
+ENTRY_POINTS = {
+    "baseline (python -c pass)": "pass",
+    "model.tournamentManager": "import model.tournamentManager",
+    "main": "import main",
+    "worker": "import worker",
+}
+
+
+def time_import(statement: str, repeats: int) -> float:
+    """Returns the median wall time in seconds of running the statement in a new interpreter."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], cwd=ROOT, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def loaded_heavy_modules(statement: str) -> list:
+    """Returns the heavy modules that end up in sys.modules after the statement runs."""
+    probe = f"{statement}\nimport sys\nprint(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, check=True,
+                            capture_output=True, text=True)
+    output = result.stdout.strip().splitlines()
+    return [m for m in output[-1].split(",") if m] if output else []
+
+
+def main(repeats: int = 5) -> None:
+    print(f"{'entry point':<30}{'median (ms)':>12}  heavy modules")
+    for label, statement in ENTRY_POINTS.items():
+        median = time_import(statement, repeats)
+        heavy = loaded_heavy_modules(statement)
+        print(f"{label:<30}{median * 1000:>12.1f}  {', '.join(heavy) or '-'}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
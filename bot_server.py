@@ -0,0 +1,22 @@
+import argparse
+
+from model.constants import BOT_SERVER_PORT
+from model.distributed import parse_address
+from model.remote import bot_factory, serve_bot, serve_pipe
+
+# Serves the moves of a strategy to RemoteBots in other processes, see model/remote.py:
+# over TCP, or with --stdio over stdin and stdout to the process that started it.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the moves of a strategy to remote players.")
+    parser.add_argument("--bot", required=True,
+                        help="the strategy: a bot type such as TFTBot, or a module:Class path")
+    parser.add_argument("--listen", metavar="HOST:PORT", default=f"127.0.0.1:{BOT_SERVER_PORT}",
+                        help="the address to serve on")
+    parser.add_argument("--stdio", action="store_true",
+                        help="serve one client over stdin and stdout instead of TCP")
+    args = parser.parse_args()
+    factory = bot_factory(args.bot)
+    if args.stdio:
+        serve_pipe(factory)
+    else:
+        serve_bot(factory, *parse_address(args.listen))
@@ -1,6 +1,196 @@
-from model.tournamentManager import run_round_robin
+import argparse
 
-if __name__ == "__main__":
-    run_round_robin()
+from model.ExplorationSchedule import SCHEDULES
+from model.constants import (ROUNDS, ITERATIONS, OUTPUT_DIR, ERROR_RATE, MISPERCEPTION_RATE, CONTINUATION_PROBABILITY,
+                             REPLAY_CAPACITY, SEARCH_MIN_ROUNDS, SEARCH_CANDIDATES)
+from model.logging.InteractionLogger import LOG_POLICIES, LOG_FULL
+from model.tournamentManager import run_round_robin, BOT_TYPES, OUTPUT_FORMATS, ENGINES, ENGINE_PYTHON
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run a round-robin Prisoner's Dilemma tournament.")
+    parser.add_argument("--bots", nargs="*", choices=list(BOT_TYPES), default=None,
+                        help="bots to enter (default: all, none with an empty list)")
+    parser.add_argument("--learners", type=int, default=0,
+                        help="extra Q-learning agents to enter for self-play")
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="games per pairing")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS, help="turns per game")
+    parser.add_argument("--tournaments", type=int, default=1, help="independent tournaments with fresh bots")
+    parser.add_argument("--workers", type=int, default=1, help="processes to spread the pairings over")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible runs")
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE,
+                        help="probability that a chosen move is misexecuted")
+    parser.add_argument("--misperception-rate", type=float, default=MISPERCEPTION_RATE,
+                        help="probability that a move is misperceived by the opponent")
+    parser.add_argument("--continuation-probability", type=float, default=CONTINUATION_PROBABILITY,
+                        help="chance that a game goes on after each turn, replacing the fixed --iterations")
+    parser.add_argument("--schedule", choices=list(SCHEDULES), default="exponential",
+                        help="how the Q-learning agents explore and how that decays over the rounds")
+    parser.add_argument("--replay", type=int, default=0, metavar="CAPACITY",
+                        help=f"let the Q-learning agents replay minibatches from a ring of this many transitions "
+                             f"per opponent, e.g. {REPLAY_CAPACITY} (default: off)")
+    parser.add_argument("--log-policy", choices=LOG_POLICIES, default=LOG_FULL,
+                        help="how much of the Q-learning detail to log")
+    parser.add_argument("--log-every", type=int, default=1, help="with --log-policy sampled, log every n-th game")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv", dest="output_format",
+                        help="format of the statistics and log files")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="directory the outputs are written to")
+    parser.add_argument("--history", action="store_true",
+                        help="keep every turn of every game in a memory-mapped store in the output directory")
+    parser.add_argument("--curves", action="store_true",
+                        help="build multi-resolution learning curves of the logged Q-learning turns in the output "
+                             "directory and plot them")
+    parser.add_argument("--stream", action="store_true",
+                        help="write results while the tournament runs instead of only at the end")
+    parser.add_argument("--reproducible", action="store_true",
+                        help="record a digest of every pairing for --verify, drawing a seed if none is given")
+    parser.add_argument("--verify", metavar="RECORD", default=None,
+                        help="instead of running, replay the pairings of a reproducibility.json serially "
+                             "and check their digests")
+    parser.add_argument("--verify-sample", type=int, default=None,
+                        help="with --verify, the number of pairings to replay (default: all)")
+    parser.add_argument("--serve", metavar="HOST:PORT", default=None,
+                        help="serve the pairings as work units to workers on other hosts (python worker.py "
+                             "--connect HOST:PORT), with --workers local workers joining in")
+    parser.add_argument("--search", choices=("halving", "hyperband"), default=None,
+                        help="instead of a tournament, search the Q-learning hyperparameters by successive halving "
+                             "or Hyperband against the strategy bots, with --rounds as the full budget")
+    parser.add_argument("--candidates", type=int, default=SEARCH_CANDIDATES,
+                        help="with --search halving, the number of configurations to start from")
+    parser.add_argument("--search-min-rounds", type=int, default=SEARCH_MIN_ROUNDS,
+                        help="with --search, the rounds of the first rung")
+    parser.add_argument("--exact-check", action="store_true",
+                        help="compare the simulated payoffs of the strategy pairings with their exact expectations")
+    parser.add_argument("--no-plots", action="store_true", help="skip the analysis plots")
+    parser.add_argument("--show-plots", action="store_true", help="display the plots once saved")
+    parser.add_argument("--engine", choices=ENGINES, default=ENGINE_PYTHON,
+                        help="'compiled' runs Q-learning vs strategy pairings through the whole-game kernel")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile the run and save the stats to the output directory")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    for option in ("rounds", "iterations", "tournaments", "workers", "log_every", "candidates", "search_min_rounds"):
+        if getattr(args, option) < 1:
+            raise SystemExit(f"--{option.replace('_', '-')} must be at least 1")
+    if args.learners < 0 or args.replay < 0:
+        raise SystemExit("--learners and --replay must not be negative")
+    if args.verify_sample is not None and args.verify_sample < 1:
+        raise SystemExit("--verify-sample must be at least 1")
+    duplicates = sorted({name for name in args.bots or () if args.bots.count(name) > 1})
+    if duplicates:
+        raise SystemExit(f"--bots names {duplicates} more than once, add Q-learning agents with --learners instead")
+    if args.verify is not None:
+        from model.reproducibility import verify_run
+        mismatches = verify_run(args.verify, args.verify_sample)
+        if mismatches:
+            raise SystemExit(f"{len(mismatches)} pairings did not reproduce")
+        print("All checked pairings reproduced bit for bit")
+        return mismatches
+    if args.search is not None:
+        return run_search(args)
+
+    def run():
+        return run_round_robin(
+            bot_names=args.bots,
+            rounds=args.rounds,
+            iterations=args.iterations,
+            num_tournaments=args.tournaments,
+            workers=args.workers,
+            seed=args.seed,
+            log_policy=args.log_policy,
+            log_every=args.log_every,
+            output_format=args.output_format,
+            output_dir=args.output_dir,
+            plots=not args.no_plots,
+            show_plots=args.show_plots,
+            engine=args.engine,
+            num_learners=args.learners,
+            error_rate=args.error_rate,
+            misperception_rate=args.misperception_rate,
+            continuation_probability=args.continuation_probability,
+            record_history=args.history,
+            schedule=SCHEDULES[args.schedule](),
+            stream=args.stream,
+            reproducible=args.reproducible,
+            replay_capacity=args.replay,
+            serve=args.serve,
+            record_curves=args.curves,
+        )
+
+    if args.profile:
+        result = profile(run, args.output_dir)
+    else:
+        result = run()
+    if args.exact_check:
+        print_exact_check(args, result[0])
+    return result
+
+
+def profile(run, output_dir: str):
+    """Profiles the run, saves the stats to the output directory and returns what the run returned"""
+    import cProfile
+    import os
+    import pstats
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(run)
+    profile_file = os.path.join(output_dir, "profile.prof")
+    profiler.dump_stats(profile_file)
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    print(f"Profile has been saved to {profile_file}")
+    return result
 
-print("test")
\ No newline at end of file
+
+def print_exact_check(args, tournament_stats) -> None:
+    """Prints the simulated and exact average payoff per turn of every strategy pairing"""
+    from model.engine.markov import expected_round_robin, cross_check
+    from model.tournamentManager import create_bots
+
+    expected = expected_round_robin(create_bots(args.bots, args.learners), args.rounds, args.iterations,
+                                    args.continuation_probability, args.error_rate, args.misperception_rate)
+    print(f"\n{'pairing':>8}  {'bot':<16}{'simulated':>10}{'exact':>10}{'difference':>12}")
+    for row in cross_check(tournament_stats, expected, args.tournaments):
+        print(f"{row['pairing']:>8}  {row['bot_name']:<16}{row['simulated_payoff']:>10.4f}"
+              f"{row['exact_payoff']:>10.4f}{row['simulated_payoff'] - row['exact_payoff']:>12.4f}")
+
+
+def run_search(args) -> dict:
+    """Runs the hyperparameter search and saves its results and learning curves to the output directory"""
+    import json
+    import os
+    import random
+    from model.hyperparameter_search import successive_halving, hyperband, sample_candidates, SEARCH_RESULTS_FILE
+
+    options = {'iterations': args.iterations, 'seed': args.seed, 'workers': args.workers, 'engine': args.engine,
+               'error_rate': args.error_rate, 'misperception_rate': args.misperception_rate,
+               'continuation_probability': args.continuation_probability,
+               'opponents': [name for name in args.bots if name != "QLearningAgent"] if args.bots else None}
+    if args.search == "hyperband":
+        result = hyperband(args.rounds, args.search_min_rounds, **options)
+        candidates = [candidate for bracket in result['brackets'] for candidate in bracket['candidates']]
+    else:
+        result = successive_halving(sample_candidates(args.candidates, random.Random(args.seed)),
+                                    args.search_min_rounds, args.rounds, **options)
+        candidates = result['candidates']
+    best = result['best']
+    print(f"\nBest configuration after {best['rounds']} rounds, scoring {best['score']:.4f} per turn: "
+          f"learning rate {best['learning_rate']:.4g}, discount factor {best['discount_factor']:.4g}, "
+          f"exploration rate {best['exploration_rate']:.4g}, decay rate {best['decay_rate']:.4g}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    results_file = os.path.join(args.output_dir, SEARCH_RESULTS_FILE)
+    with open(results_file, "w") as file:
+        json.dump(result, file, indent=2)
+    print(f"Search results and learning curves have been written to {results_file}")
+    if not args.no_plots:
+        from model.stat_analysis.performance_analyzer import plot_learning_curves
+        plot_learning_curves(candidates, best, args.output_dir, show=args.show_plots)
+        print(f"Learning curves have been plotted in the {args.output_dir} directory")
+    return result
+
+
+if __name__ == "__main__":
+    main()
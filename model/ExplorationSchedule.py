@@ -0,0 +1,214 @@
+import math
+from typing import Dict, List
+
+from model.constants import (DEFAULT_EXPLORATION_RATE, DECAY_RATE, LINEAR_SCHEDULE_END, INVERSE_TIME_RATE,
+                             STEP_SCHEDULE_FACTOR, STEP_SCHEDULE_EVERY, BOLTZMANN_TEMPERATURE, UCB_COEFFICIENT,
+                             ROUNDS)
+
+# How the exploration parameter is used when choosing an action. The values are the
+# codes the engines work with.
+POLICY_EPSILON_GREEDY = 0
+POLICY_BOLTZMANN = 1
+POLICY_UCB = 2
+
+
+class ExplorationSchedule:
+    """
+    How a Q-learning agent explores, and how its exploration parameter changes from one
+    round to the next.
+
+    The parameter is ε for ε-greedy, the temperature for Boltzmann (softmax) selection and
+    the bonus coefficient for UCB. It starts at start for every opponent and is multiplied
+    by decay_factor(r) at the end of round r. The factors are precomputed into a table the
+    first time they are needed, so advancing a round is a single lookup, and the engines
+    read the same table as an array.
+
+    Attributes:
+        start (float): The parameter in the first round against every opponent
+        policy (int): One of the POLICY_* codes
+    """
+    policy = POLICY_EPSILON_GREEDY
+
+    def __init__(self, start: float = DEFAULT_EXPLORATION_RATE):
+        if start < 0:
+            raise ValueError("Exploration parameter must not be negative")
+        self.start = start
+        self._factors: List[float] = []
+
+    def decay_factor(self, round: int) -> float:
+        """The factor the parameter is multiplied by at the end of the given round"""
+        raise NotImplementedError
+
+    def settings(self) -> Dict:
+        """The arguments the schedule was created with, so it can be created again"""
+        return {'start': self.start}
+
+    def decay_factors(self, first_round: int, rounds: int) -> List[float]:
+        """
+        The factors of rounds first_round to first_round + rounds - 1, from the table,
+        which grows by doubling when a longer run needs it.
+        """
+        end = first_round + rounds
+        if end > len(self._factors):
+            size = max(end, 2 * len(self._factors), ROUNDS)
+            self._factors = [self.decay_factor(round) for round in range(size)]
+        return self._factors[first_round:end]
+
+    def rates(self, rounds: int, start: float = None) -> List[float]:
+        """
+        The parameter in each of the first rounds, as an agent following the schedule would
+        see it. Lets schedules be compared without playing any games.
+        """
+        rate = self.start if start is None else start
+        rates = []
+        for factor in self.decay_factors(0, rounds):
+            rates.append(rate)
+            rate = rate * factor
+        return rates
+
+
+class ExponentialSchedule(ExplorationSchedule):
+    """Multiplies the parameter by decay after every round, the original behaviour"""
+
+    def __init__(self, start: float = DEFAULT_EXPLORATION_RATE, decay: float = DECAY_RATE):
+        super().__init__(start)
+        self.decay = decay
+
+    def settings(self) -> Dict:
+        return {'start': self.start, 'decay': self.decay}
+
+    def decay_factor(self, round: int) -> float:
+        return self.decay
+
+
+class LinearSchedule(ExplorationSchedule):
+    """Moves the parameter linearly from start to end over horizon rounds, then holds it"""
+
+    def __init__(self, start: float = DEFAULT_EXPLORATION_RATE, end: float = LINEAR_SCHEDULE_END,
+                 horizon: int = ROUNDS):
+        super().__init__(start)
+        if not 0 <= end <= start:
+            raise ValueError("Linear schedule must end between 0 and its start")
+        if horizon < 1:
+            raise ValueError("Linear schedule horizon must be at least 1")
+        self.end = end
+        self.horizon = horizon
+
+    def settings(self) -> Dict:
+        return {'start': self.start, 'end': self.end, 'horizon': self.horizon}
+
+    def value(self, round: int) -> float:
+        return self.start + (self.end - self.start) * min(round, self.horizon) / self.horizon
+
+    def decay_factor(self, round: int) -> float:
+        current = self.value(round)
+        return self.value(round + 1) / current if current > 0 else 0.0
+
+
+class InverseTimeSchedule(ExplorationSchedule):
+    """Parameter start / (1 + rate * r) in round r"""
+
+    def __init__(self, start: float = DEFAULT_EXPLORATION_RATE, rate: float = INVERSE_TIME_RATE):
+        super().__init__(start)
+        if rate < 0:
+            raise ValueError("Inverse-time rate must not be negative")
+        self.rate = rate
+
+    def settings(self) -> Dict:
+        return {'start': self.start, 'rate': self.rate}
+
+    def decay_factor(self, round: int) -> float:
+        return (1 + self.rate * round) / (1 + self.rate * (round + 1))
+
+
+class StepSchedule(ExplorationSchedule):
+    """Multiplies the parameter by factor once every `every` rounds"""
+
+    def __init__(self, start: float = DEFAULT_EXPLORATION_RATE, factor: float = STEP_SCHEDULE_FACTOR,
+                 every: int = STEP_SCHEDULE_EVERY):
+        super().__init__(start)
+        if every < 1:
+            raise ValueError("Step schedule interval must be at least 1")
+        self.factor = factor
+        self.every = every
+
+    def settings(self) -> Dict:
+        return {'start': self.start, 'factor': self.factor, 'every': self.every}
+
+    def decay_factor(self, round: int) -> float:
+        return self.factor if (round + 1) % self.every == 0 else 1.0
+
+
+class BoltzmannSchedule(ExponentialSchedule):
+    """
+    Softmax selection: the agent defects with probability 1 / (1 + exp((Q(s, C) - Q(s, D)) / T)),
+    with the temperature T decaying exponentially.
+    """
+    policy = POLICY_BOLTZMANN
+
+    def __init__(self, temperature: float = BOLTZMANN_TEMPERATURE, decay: float = DECAY_RATE):
+        super().__init__(temperature, decay)
+
+    def settings(self) -> Dict:
+        return {'temperature': self.start, 'decay': self.decay}
+
+
+class UCBSchedule(ExponentialSchedule):
+    """
+    Upper confidence bound selection: the agent picks the action with the highest
+    Q(s, a) + c * sqrt(ln N(s) / N(s, a)), trying every action once first. N counts the
+    visits per opponent; c decays exponentially, by default not at all.
+    """
+    policy = POLICY_UCB
+
+    def __init__(self, coefficient: float = UCB_COEFFICIENT, decay: float = 1.0):
+        super().__init__(coefficient, decay)
+
+    def settings(self) -> Dict:
+        return {'coefficient': self.start, 'decay': self.decay}
+
+
+# Schedules by the name the command line uses, all with their default settings
+SCHEDULES = {
+    "exponential": ExponentialSchedule,
+    "linear": LinearSchedule,
+    "inverse-time": InverseTimeSchedule,
+    "step": StepSchedule,
+    "boltzmann": BoltzmannSchedule,
+    "ucb": UCBSchedule,
+}
+
+
+def describe_schedule(schedule: ExplorationSchedule) -> Dict:
+    """The class and settings of a schedule, None for the agents' default"""
+    if schedule is None:
+        return None
+    return {'name': type(schedule).__name__, **schedule.settings()}
+
+
+def schedule_from_description(description: Dict) -> ExplorationSchedule:
+    """Creates a schedule again from describe_schedule's description"""
+    if description is None:
+        return None
+    settings = dict(description)
+    schedule_types = {schedule_type.__name__: schedule_type for schedule_type in SCHEDULES.values()}
+    return schedule_types[settings.pop('name')](**settings)
+
+
+def boltzmann_defect_probability(q_cooperate: float, q_defect: float, temperature: float) -> float:
+    """Softmax probability of defecting; greedy, ties going to COOPERATE, at temperature 0"""
+    if temperature <= 0:
+        return 1.0 if q_defect > q_cooperate else 0.0
+    x = (q_cooperate - q_defect) / temperature
+    # Written both ways round so that exp never overflows
+    if x >= 0:
+        z = math.exp(-x)
+        return z / (1 + z)
+    return 1 / (1 + math.exp(x))
+
+
+def ucb_value(q_value: float, coefficient: float, state_visits: int, action_visits: int) -> float:
+    """UCB score of one action; untried actions come first"""
+    if action_visits == 0:
+        return math.inf
+    return q_value + coefficient * math.sqrt(math.log(state_visits) / action_visits)
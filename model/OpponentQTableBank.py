@@ -0,0 +1,404 @@
+"""
+The per-opponent Q-tables of one Q-learning agent as rows of a single array, so that a
+learner can face very large populations in bounded memory.
+
+An OpponentQTableBank gives every opponent an id in a SymbolTable and keeps the rows of
+the most recently used opponents in one contiguous array. A row holds the opponent's six
+Q-values, with states and actions encoded as in the engines, followed by the agent's
+exploration parameter and exploration round against that opponent and its UCB visit
+counts, laid out like the Q-values. Once capacity rows
+are resident, the least recently used row is evicted to a memory-mapped spill file,
+indexed by opponent id, and faulted back in the next time that opponent comes up.
+Beyond its name, an opponent costs no Python objects of its own.
+
+The bank is a mapping from opponent names to BankedQTable views, so it stands in for
+the agent's dict of QTables, and exploration_rates, exploration_rounds and visit_counts
+are mappings over the same rows. Views look their row up on every access, so they stay
+valid while rows move between memory and disk. Replay buffers do not fit in a row; they
+are kept in a BankedObjects LRU of the same capacity, which pickles the least recently
+used ones to a spill file of its own.
+"""
+import collections
+import pickle
+import tempfile
+from collections.abc import Mapping, MutableMapping
+
+import numpy as np
+
+from model.QTable import QTable
+from model.constants import *
+from model.engine.common import STATE_INDEX, ACTION_NAMES
+from model.logging.SymbolTable import SymbolTable
+
+# Columns of a row: the Q-values by state and action, the exploration state, then the
+# visit counts by state and action
+Q_COLUMNS = len(STATE_INDEX) * len(ACTION_NAMES)
+RATE_COLUMN = Q_COLUMNS
+ROUND_COLUMN = Q_COLUMNS + 1
+VISIT_COLUMN = Q_COLUMNS + 2
+ROW_SIZE = VISIT_COLUMN + Q_COLUMNS
+
+
+class OpponentQTableBank(Mapping):
+    """
+    Attributes:
+        capacity (int): The most rows kept in memory
+        start_rate (float): The exploration parameter of a new opponent's row
+        opponents (SymbolTable): The ids of the opponents, which index the spill file
+        rows (np.ndarray): The resident rows, of shape (capacity, ROW_SIZE)
+        slots (OrderedDict): Opponent id -> resident row, least recently used first
+        exploration_rates (BankedColumn): The exploration parameter per opponent
+        exploration_rounds (BankedColumn): The rounds played per opponent
+        visit_counts (BankedVisitCounts): The UCB visit counts per opponent
+        replay_buffers (BankedObjects): The replay ring per opponent, if any
+        evictions (int): Rows written out to the spill file
+        faults (int): Rows read back from the spill file
+    """
+
+    def __init__(self, capacity: int = QTABLE_BANK_CAPACITY, start_rate: float = DEFAULT_EXPLORATION_RATE,
+                 spill_dir=None):
+        """
+        Args:
+            spill_dir (str): Directory of the spill file, created on the first eviction and
+                removed once the bank is closed or collected. Defaults to the temp directory
+        """
+        if capacity < 1:
+            raise ValueError("Bank capacity must be at least 1")
+        self.capacity = capacity
+        self.start_rate = start_rate
+        self.spill_dir = spill_dir
+        self.opponents = SymbolTable()
+        self.rows = np.zeros((capacity, ROW_SIZE))
+        # The rows as flat doubles, read and written as Python floats, much faster than numpy scalars
+        self.cells = memoryview(self.rows).cast('B').cast('d')
+        self.slots = collections.OrderedDict()
+        self.free = list(range(capacity - 1, -1, -1))
+        # Per opponent id, whether its row was ever written to the spill file
+        self.spilled = bytearray()
+        self.spill_file = None
+        self.spill = None
+        self.evictions = 0
+        self.faults = 0
+        self.exploration_rates = BankedColumn(self, RATE_COLUMN, float)
+        self.exploration_rounds = BankedColumn(self, ROUND_COLUMN, int)
+        self.visit_counts = BankedVisitCounts(self)
+        self.replay_buffers = BankedObjects(capacity, spill_dir)
+
+    def __getstate__(self):
+        """Every row in id order, the resident ones in LRU order, without the spill file"""
+        rows = np.zeros((len(self.opponents), ROW_SIZE))
+        for opponent in range(len(self.opponents)):
+            if opponent in self.slots:
+                rows[opponent] = self.rows[self.slots[opponent]]
+            elif opponent < len(self.spilled) and self.spilled[opponent]:
+                rows[opponent] = self.spill[opponent]
+        return {'capacity': self.capacity, 'start_rate': self.start_rate, 'spill_dir': self.spill_dir,
+                'names': self.opponents.names, 'rows': rows, 'resident': list(self.slots),
+                'replay_buffers': self.replay_buffers}
+
+    def __setstate__(self, state):
+        self.__init__(state['capacity'], state['start_rate'], state['spill_dir'])
+        for name in state['names']:
+            self.opponents.intern(name)
+        rows = state['rows']
+        resident = set(state['resident'])
+        spilled = [opponent for opponent in range(len(rows)) if opponent not in resident]
+        if spilled:
+            self._grow_spill(len(rows))
+            self.spill[spilled] = rows[spilled]
+            for opponent in spilled:
+                self.spilled[opponent] = 1
+        for opponent in state['resident']:
+            self.rows[self.slot(opponent)] = rows[opponent]
+        self.replay_buffers = state['replay_buffers']
+
+    def close(self) -> None:
+        """Removes the spill files; rows and replay buffers still on disk are lost"""
+        self.replay_buffers.close()
+        self.spill = None
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+    # ROWS
+    def slot(self, opponent: int) -> int:
+        """The resident row of an opponent id, faulting it in, or creating it, if need be"""
+        slot = self.slots.get(opponent)
+        if slot is not None:
+            self.slots.move_to_end(opponent)
+            return slot
+        if self.free:
+            slot = self.free.pop()
+        else:
+            victim, slot = self.slots.popitem(last=False)
+            self._evict(victim, slot)
+        if opponent < len(self.spilled) and self.spilled[opponent]:
+            self.rows[slot] = self.spill[opponent]
+            self.faults += 1
+        else:
+            self.rows[slot] = 0.0
+            self.rows[slot, RATE_COLUMN] = self.start_rate
+        self.slots[opponent] = slot
+        return slot
+
+    def _evict(self, opponent: int, slot: int) -> None:
+        self._grow_spill(opponent + 1)
+        self.spill[opponent] = self.rows[slot]
+        self.spilled[opponent] = 1
+        self.evictions += 1
+
+    def _grow_spill(self, length: int) -> None:
+        """Makes room for the rows of length opponent ids in the spill file"""
+        if length > len(self.spilled):
+            self.spilled.extend(bytes(length - len(self.spilled)))
+        if self.spill is not None and len(self.spill) >= length:
+            return
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile(prefix="qtables-", dir=self.spill_dir)
+        # Grow by doubling, so that the file is only remapped a few times
+        length = max(length, 2 * (0 if self.spill is None else len(self.spill)), self.capacity)
+        self.spill_file.truncate(length * ROW_SIZE * 8)
+        self.spill = np.memmap(self.spill_file, dtype=np.float64, mode="r+", shape=(length, ROW_SIZE))
+
+    # MAPPING OF OPPONENT NAMES TO Q-TABLES
+    def __getitem__(self, opponent_name) -> "BankedQTable":
+        opponent = self.opponents.ids.get(opponent_name)
+        if opponent is None:
+            raise KeyError(opponent_name)
+        return BankedQTable(self, opponent)
+
+    def __setitem__(self, opponent_name, table: QTable) -> None:
+        """Copies the values of any QTable into the opponent's row"""
+        # Read first: reading a view of this bank may move rows around
+        values = [table.get_q_value(state, action) for state in STATE_INDEX for action in ACTION_NAMES]
+        start = self.slot(self.opponents.intern(opponent_name)) * ROW_SIZE
+        for offset, value in enumerate(values):
+            self.cells[start + offset] = value
+
+    def __contains__(self, opponent_name) -> bool:
+        return opponent_name in self.opponents
+
+    def __iter__(self):
+        return iter(self.opponents.names)
+
+    def __len__(self) -> int:
+        return len(self.opponents)
+
+
+class BankedQTable(QTable):
+    """
+    The QTable of one opponent in an OpponentQTableBank. get_table() returns a copy of
+    the values; reads and updates go through the other methods.
+    """
+
+    def __init__(self, bank: OpponentQTableBank, opponent: int):
+        self.bank = bank
+        self.opponent = opponent
+
+    def _start(self) -> int:
+        return self.bank.slot(self.opponent) * ROW_SIZE
+
+    def get_table(self) -> dict:
+        start = self._start()
+        cells = self.bank.cells
+        return {state: {action: cells[start + row * 2 + STATE_INDEX[action]] for action in ACTION_NAMES}
+                for state, row in STATE_INDEX.items()}
+
+    def get_q_value(self, state: str, action: str) -> float:
+        return self.bank.cells[self._start() + STATE_INDEX[state] * 2 + STATE_INDEX[action]]
+
+    def set_q_value(self, state: str, action: str, value: float):
+        self.bank.cells[self._start() + STATE_INDEX[state] * 2 + STATE_INDEX[action]] = value
+
+    def update_q_value(self, state: str, action: str,
+                       learning_rate: float, immediate_reward: float,
+                       discount_factor: float, next_state: str):
+        """The Bellman update of QTable, applied to the opponent's row"""
+        start = self._start()
+        cells = self.bank.cells
+        cell = start + STATE_INDEX[state] * 2 + STATE_INDEX[action]
+        next_row = start + STATE_INDEX[next_state] * 2
+        current_q_value = cells[cell]
+        max_future_q_value = max(cells[next_row], cells[next_row + 1])
+        cells[cell] = current_q_value + learning_rate * (
+                immediate_reward + (discount_factor * max_future_q_value) - current_q_value
+        )
+
+
+class BankedColumn(MutableMapping):
+    """One exploration column of an OpponentQTableBank, as a mapping from opponent names"""
+
+    def __init__(self, bank: OpponentQTableBank, column: int, value_type: type):
+        self.bank = bank
+        self.column = column
+        self.value_type = value_type
+
+    def __getitem__(self, opponent_name):
+        opponent = self.bank.opponents.ids.get(opponent_name)
+        if opponent is None:
+            raise KeyError(opponent_name)
+        return self.value_type(self.bank.cells[self.bank.slot(opponent) * ROW_SIZE + self.column])
+
+    def __setitem__(self, opponent_name, value) -> None:
+        self.bank.cells[self.bank.slot(self.bank.opponents.intern(opponent_name)) * ROW_SIZE + self.column] = value
+
+    def __delitem__(self, opponent_name):
+        raise TypeError("Opponents cannot be removed from a Q-table bank")
+
+    def __contains__(self, opponent_name) -> bool:
+        return opponent_name in self.bank.opponents
+
+    def __iter__(self):
+        return iter(self.bank.opponents.names)
+
+    def __len__(self) -> int:
+        return len(self.bank.opponents)
+
+
+class BankedVisitCounts(MutableMapping):
+    """
+    The UCB visit counts of an OpponentQTableBank, as a mapping from opponent names to
+    dicts of state -> BankedVisitRow, like the agent's dict of visit counts.
+    """
+
+    def __init__(self, bank: OpponentQTableBank):
+        self.bank = bank
+
+    def __getitem__(self, opponent_name):
+        opponent = self.bank.opponents.ids.get(opponent_name)
+        if opponent is None:
+            raise KeyError(opponent_name)
+        return {state: BankedVisitRow(self.bank, opponent, VISIT_COLUMN + row * 2) for state, row in STATE_INDEX.items()}
+
+    def __setitem__(self, opponent_name, visit_counts) -> None:
+        """Copies the counts of any nested state -> action -> count mapping into the opponent's row"""
+        # Read first: reading a view of this bank may move rows around
+        values = [visit_counts[state][action] for state in STATE_INDEX for action in ACTION_NAMES]
+        start = self.bank.slot(self.bank.opponents.intern(opponent_name)) * ROW_SIZE + VISIT_COLUMN
+        for offset, value in enumerate(values):
+            self.bank.cells[start + offset] = value
+
+    def __delitem__(self, opponent_name):
+        raise TypeError("Opponents cannot be removed from a Q-table bank")
+
+    def __contains__(self, opponent_name) -> bool:
+        return opponent_name in self.bank.opponents
+
+    def __iter__(self):
+        return iter(self.bank.opponents.names)
+
+    def __len__(self) -> int:
+        return len(self.bank.opponents)
+
+
+class BankedVisitRow(MutableMapping):
+    """The visit counts of one state against one opponent, as a mapping from actions"""
+
+    def __init__(self, bank: OpponentQTableBank, opponent: int, column: int):
+        self.bank = bank
+        self.opponent = opponent
+        self.column = column
+
+    def __getitem__(self, action) -> int:
+        return int(self.bank.cells[self.bank.slot(self.opponent) * ROW_SIZE + self.column + STATE_INDEX[action]])
+
+    def __setitem__(self, action, count) -> None:
+        self.bank.cells[self.bank.slot(self.opponent) * ROW_SIZE + self.column + STATE_INDEX[action]] = count
+
+    def __delitem__(self, action):
+        raise TypeError("Actions cannot be removed from visit counts")
+
+    def __iter__(self):
+        return iter(ACTION_NAMES)
+
+    def __len__(self) -> int:
+        return len(ACTION_NAMES)
+
+
+class BankedObjects(MutableMapping):
+    """
+    Objects kept per opponent, such as replay buffers, with the capacity most recently
+    used in memory. The others are pickled to a spill file, each overwriting its earlier
+    copy where it fits, and loaded back on their next use.
+
+    Attributes:
+        resident (OrderedDict): Opponent name -> object in memory, least recently used first
+        spilled (Dict[str, tuple]): Opponent name -> offset, length and room of its latest
+            pickle in the spill file, current unless the opponent is also resident
+        evictions (int): Objects pickled to the spill file
+        faults (int): Objects loaded back from the spill file
+    """
+
+    def __init__(self, capacity: int = QTABLE_BANK_CAPACITY, spill_dir=None):
+        self.capacity = capacity
+        self.spill_dir = spill_dir
+        self.resident = collections.OrderedDict()
+        self.spilled = {}
+        self.spill_file = None
+        self.spill_end = 0
+        self.evictions = 0
+        self.faults = 0
+
+    def __getstate__(self):
+        """Every object, least recently used first, without the spill file"""
+        items = [(name, self._read(name)) for name in self.spilled if name not in self.resident]
+        return {'capacity': self.capacity, 'spill_dir': self.spill_dir,
+                'items': items + list(self.resident.items())}
+
+    def __setstate__(self, state):
+        self.__init__(state['capacity'], state['spill_dir'])
+        for name, value in state['items']:
+            self[name] = value
+
+    def close(self) -> None:
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+    def __getitem__(self, opponent_name):
+        value = self.resident.get(opponent_name)
+        if value is not None:
+            self.resident.move_to_end(opponent_name)
+            return value
+        if opponent_name not in self.spilled:
+            raise KeyError(opponent_name)
+        value = self._read(opponent_name)
+        self.faults += 1
+        self[opponent_name] = value
+        return value
+
+    def __setitem__(self, opponent_name, value) -> None:
+        self.resident[opponent_name] = value
+        self.resident.move_to_end(opponent_name)
+        if len(self.resident) > self.capacity:
+            self._evict(*self.resident.popitem(last=False))
+
+    def __delitem__(self, opponent_name):
+        raise TypeError("Opponents cannot be removed from a Q-table bank")
+
+    def __contains__(self, opponent_name) -> bool:
+        return opponent_name in self.resident or opponent_name in self.spilled
+
+    def __iter__(self):
+        return iter(dict.fromkeys([*self.spilled, *self.resident]))
+
+    def __len__(self) -> int:
+        return len(self.spilled.keys() | self.resident.keys())
+
+    def _read(self, opponent_name):
+        offset, length, _ = self.spilled[opponent_name]
+        self.spill_file.seek(offset)
+        return pickle.loads(self.spill_file.read(length))
+
+    def _evict(self, opponent_name, value) -> None:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile(prefix="objects-", dir=self.spill_dir)
+        offset, _, room = self.spilled.get(opponent_name, (self.spill_end, 0, 0))
+        if len(data) > room:
+            offset, room = self.spill_end, len(data)
+            self.spill_end += room
+        self.spill_file.seek(offset)
+        self.spill_file.write(data)
+        self.spilled[opponent_name] = (offset, len(data), room)
+        self.evictions += 1
@@ -1,7 +1,11 @@
+import contextlib
 import random
-from typing import Dict, List
+from typing import Dict, List, Optional
 from model.QTable import QTable
-from model.constants import COOPERATE, DEFECT, LEARNING_RATE, DISCOUNT_FACTOR, DEFAULT_EXPLORATION_RATE
+from model.ExplorationSchedule import (ExplorationSchedule, ExponentialSchedule, POLICY_EPSILON_GREEDY,
+                                       POLICY_BOLTZMANN, POLICY_UCB, boltzmann_defect_probability, ucb_value)
+from model.constants import (COOPERATE, DEFECT, LEARNING_RATE, DISCOUNT_FACTOR, DEFAULT_EXPLORATION_RATE, DECAY_RATE,
+                             REPLAY_BATCH_SIZE)
 
 
 class QLearningAgent:
@@ -13,30 +17,70 @@ class QLearningAgent:
     over time using the Q-learning algorithm.
 
     Attributes:
+        name (str): The name stats and opponents' Q-tables refer to this agent by. Agents
+            playing each other need distinct names.
         learning_rate (float): The rate at which the agent updates its Q-values (α).
         discount_factor (float): The factor by which future rewards are discounted (γ).
         exploration_rate (float): The probability of taking random actions for exploration (ε).
+        schedule (ExplorationSchedule): How the agent explores and how its exploration
+            parameter decays. Defaults to ε-greedy starting at exploration_rate and
+            decaying by DECAY_RATE every round.
         QTables (Dict[str, Dict[str, Dict[str, float]]]): A dictionary containing a Q-table for
             each opponent. Each Q-table maps states to actions and their Q-values.
         actions (List[str]): The possible actions the agent can take ("Cooperate" or "Defect").
+        exploration_rates (Dict[str, float]): The current exploration parameter per opponent.
+        exploration_rounds (Dict[str, int]): The rounds played per opponent, which index the
+            schedule's decay factors.
+        visit_counts (Dict[str, Dict[str, Dict[str, int]]]): Per opponent, how often each
+            action was chosen in each state. Used by UCB.
+        replay_capacity (int): The transitions kept per opponent for experience replay, 0
+            to learn from each transition only once
+        replay_batch_size (int): The transitions replayed every REPLAY_INTERVAL turns
+        replay_buffers (Dict[str, ReplayBuffer]): The replay ring per opponent
+        qtable_capacity (int): With a capacity, the Q-tables, exploration state, visit
+            counts and replay buffers live in an OpponentQTableBank that keeps this many
+            opponents in memory and spills the rest to disk, for very large populations
     """
 
     def __init__(self, learning_rate: float = LEARNING_RATE,
                  discount_factor: float = DISCOUNT_FACTOR,
                  exploration_rate: float = DEFAULT_EXPLORATION_RATE,
-                 actions: List[str] = [COOPERATE, DEFECT]):
-
+                 actions: List[str] = [COOPERATE, DEFECT],
+                 name: str = "QLearningAgent",
+                 schedule: Optional[ExplorationSchedule] = None,
+                 replay_capacity: int = 0,
+                 replay_batch_size: int = REPLAY_BATCH_SIZE,
+                 qtable_capacity: Optional[int] = None):
+
+        self.name = name
         self.learning_rate = learning_rate
         self.discount_factor = discount_factor
         self.exploration_rate = exploration_rate
         self.actions = actions
+        self.schedule = schedule if schedule is not None else ExponentialSchedule(exploration_rate, DECAY_RATE)
 
         # the key of the dictionary str is the NAME of the BOT
         # the value is the QTable for that specific opponent
         self.QTables: Dict[str, QTable] = {}
         self.exploration_rates: Dict[str, float] = {}
+        self.exploration_rounds: Dict[str, int] = {}
+        self.visit_counts: Dict[str, Dict[str, Dict[str, int]]] = {}
+        self.replay_capacity = replay_capacity
+        self.replay_batch_size = replay_batch_size
+        self.replay_buffers = {}
+        self.qtable_capacity = qtable_capacity
+        if qtable_capacity is not None:
+            from model.OpponentQTableBank import OpponentQTableBank
+            self.QTables = OpponentQTableBank(qtable_capacity, self.schedule.start)
+            self.exploration_rates = self.QTables.exploration_rates
+            self.exploration_rounds = self.QTables.exploration_rounds
+            self.visit_counts = self.QTables.visit_counts
+            self.replay_buffers = self.QTables.replay_buffers
 
     # Getters
+    def get_name(self) -> str:
+        return self.name
+
     def get_learning_rate(self):
         return self.learning_rate
 
@@ -44,8 +88,29 @@ class QLearningAgent:
         return self.discount_factor
 
     def get_exploration_rate(self, opponent_name: str) -> float:
-        return self.exploration_rates.get(opponent_name, DEFAULT_EXPLORATION_RATE)
+        return self.exploration_rates.get(opponent_name, self.schedule.start)
+
+    def get_exploration_round(self, opponent_name: str) -> int:
+        return self.exploration_rounds.get(opponent_name, 0)
+
+    def get_schedule(self) -> ExplorationSchedule:
+        return self.schedule
+
+    def get_visit_counts(self, opponent_name: str) -> Dict[str, Dict[str, int]]:
+        if opponent_name not in self.visit_counts:
+            self.visit_counts[opponent_name] = {state: {COOPERATE: 0, DEFECT: 0}
+                                                for state in (None, COOPERATE, DEFECT)}
+        return self.visit_counts[opponent_name]
     
+    def get_replay_buffer(self, opponent_name: str):
+        """The replay ring for an opponent, created on first use with its own generator"""
+        if opponent_name not in self.replay_buffers:
+            import numpy as np
+            from model.ReplayBuffer import ReplayBuffer
+            self.replay_buffers[opponent_name] = ReplayBuffer(self.replay_capacity, self.replay_batch_size,
+                                                              np.random.default_rng(random.getrandbits(64)))
+        return self.replay_buffers[opponent_name]
+
     def get_qtables(self):
         return self.QTables
 
@@ -61,7 +126,7 @@ class QLearningAgent:
     
     # Setters
     def set_exploration_rate(self, opponent_name: str, rate: float) -> None:
-        if not 0 <= rate <= 1:
+        if rate < 0 or (rate > 1 and self.schedule.policy == POLICY_EPSILON_GREEDY):
             raise ValueError("Exploration rate must be between 0 and 1")
         self.exploration_rates[opponent_name] = rate
     
@@ -75,6 +140,13 @@ class QLearningAgent:
         new_rate = old_rate * decay_rate
         self.set_exploration_rate(opponent_name, new_rate)
 
+    def advance_exploration(self, opponent_name: str) -> None:
+        """Moves the exploration parameter for an opponent on to the next round of the schedule"""
+        round = self.exploration_rounds.get(opponent_name, 0)
+        factor = self.schedule.decay_factors(round, 1)[0]
+        self.exploration_rates[opponent_name] = self.get_exploration_rate(opponent_name) * factor
+        self.exploration_rounds[opponent_name] = round + 1
+
     def initialize_q_table_for_opponent(self, opponent_name: str):
         """Initialize Q-table for a new opponent"""
         if opponent_name not in self.QTables:
@@ -83,7 +155,7 @@ class QLearningAgent:
     def initialize_exploration_rate(self, opponent_name: str):
         """Initialize exploration rate for a new opponent"""
         if opponent_name not in self.exploration_rates:
-            self.exploration_rates[opponent_name] = DEFAULT_EXPLORATION_RATE
+            self.exploration_rates[opponent_name] = self.schedule.start
 
 
     def update_q_value(self, opponent_name: str, state: str, action: str,
@@ -100,10 +172,27 @@ class QLearningAgent:
         table.update_q_value(state, action, self.get_learning_rate(), reward,
                              self.get_discount_factor(), next_state)
 
+        if self.replay_capacity:
+            self.replay(opponent_name, state, action, reward, next_state)
+
+    def replay(self, opponent_name: str, state: str, action: str, reward: float, next_state: str) -> None:
+        """Adds a transition to the opponent's replay ring and learns from a minibatch of the ring"""
+        from model.ReplayBuffer import q_array, write_q_array
+        buffer = self.get_replay_buffer(opponent_name)
+        buffer.add(state, action, reward, next_state)
+        if buffer.due():
+            table = self.get_qtable_for_opponent(opponent_name)
+            # A SharedQTable with striped updates holds its stripe's lock for the whole
+            # read-modify-write, so that updates from other processes are not lost
+            with getattr(table, "lock", None) or contextlib.nullcontext():
+                q = q_array(table)
+                buffer.replay(q, self.get_learning_rate(), self.get_discount_factor())
+                write_q_array(table, q)
+
 
     def choose_action(self, opponent_name: str, state: str) -> str:
         """
-        Selects an action for the agent using the ε-greedy policy.
+        Selects an action for the agent using the policy of its schedule, by default ε-greedy.
 
         Args:
             opponent_name (str): The name of the opponent the agent is playing against.
@@ -112,6 +201,15 @@ class QLearningAgent:
         Returns:
             str: The action that yields the highest payoff
         """
+        policy = self.schedule.policy
+        if policy == POLICY_BOLTZMANN:
+            state_actions = self.get_qtable_for_opponent(opponent_name).get_table()[state]
+            defect_probability = boltzmann_defect_probability(
+                state_actions[COOPERATE], state_actions[DEFECT], self.get_exploration_rate(opponent_name))
+            return DEFECT if random.random() < defect_probability else COOPERATE
+        if policy == POLICY_UCB:
+            return self.choose_ucb_action(opponent_name, state)
+
         if random.random() < self.get_exploration_rate(opponent_name):
             return random.choice([COOPERATE, DEFECT])
         else:
@@ -119,6 +217,18 @@ class QLearningAgent:
             state_actions = q_table.get_table()[state]
             return max(state_actions, key=state_actions.get)
 
+    def choose_ucb_action(self, opponent_name: str, state: str) -> str:
+        """Picks the action with the highest UCB score, ties going to COOPERATE, and counts the visit"""
+        state_actions = self.get_qtable_for_opponent(opponent_name).get_table()[state]
+        counts = self.get_visit_counts(opponent_name)[state]
+        state_visits = counts[COOPERATE] + counts[DEFECT]
+        coefficient = self.get_exploration_rate(opponent_name)
+        cooperate_value = ucb_value(state_actions[COOPERATE], coefficient, state_visits, counts[COOPERATE])
+        defect_value = ucb_value(state_actions[DEFECT], coefficient, state_visits, counts[DEFECT])
+        action = DEFECT if defect_value > cooperate_value else COOPERATE
+        counts[action] += 1
+        return action
+
 
 
 
@@ -0,0 +1,84 @@
+import numpy as np
+
+from model.constants import REPLAY_BATCH_SIZE, REPLAY_INTERVAL
+from model.engine.common import ACTION_NAMES, STATE_INDEX
+
+# Row of each Q-table state in the arrays, in the engines' encoding
+STATES = tuple(sorted(STATE_INDEX, key=STATE_INDEX.get))
+
+
+class ReplayBuffer:
+    """
+    A fixed-capacity ring of a Q-learning agent's transitions against one opponent, kept
+    in preallocated arrays. Once it holds a minibatch, every interval-th new transition is
+    followed by a Bellman update over a minibatch sampled from the ring, so each turn is
+    learned from many times over.
+
+    Attributes:
+        capacity (int): The number of transitions kept; the oldest are overwritten first
+        batch_size (int): The transitions sampled for every replay
+        interval (int): The transitions added between two replays
+        rng (np.random.Generator): The generator minibatches are sampled with
+    """
+
+    def __init__(self, capacity: int, batch_size: int = REPLAY_BATCH_SIZE, rng: np.random.Generator = None,
+                 interval: int = REPLAY_INTERVAL):
+        if capacity < 1 or batch_size < 1 or interval < 1:
+            raise ValueError("Replay capacity, batch size and interval must be at least 1")
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.interval = interval
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.states = np.zeros(capacity, dtype=np.int8)
+        self.actions = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        self.next_states = np.zeros(capacity, dtype=np.int8)
+        self.position = 0
+        self.size = 0
+        self.added = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, state, action: str, reward: float, next_state) -> None:
+        position = self.position
+        self.states[position] = STATE_INDEX[state]
+        self.actions[position] = STATE_INDEX[action]
+        self.rewards[position] = reward
+        self.next_states[position] = STATE_INDEX[next_state]
+        self.position = (position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.added += 1
+
+    def due(self) -> bool:
+        """Whether a replay is due after the last transition added"""
+        return self.size >= self.batch_size and self.added % self.interval == 0
+
+    def replay(self, q: np.ndarray, learning_rate: float, discount_factor: float) -> None:
+        """
+        One batched Bellman update of the Q-values q, of shape (3, 2) with rows as in STATES,
+        in place. Every TD error is taken from the Q-values before the update, and a
+        state-action pair sampled several times moves by their mean.
+        """
+        if not self.size:
+            return
+        sample = self.rng.integers(0, self.size, self.batch_size)
+        states = self.states[sample]
+        actions = self.actions[sample]
+        errors = self.rewards[sample] + discount_factor * q[self.next_states[sample]].max(axis=1) - q[states, actions]
+        cells = states * 2 + actions
+        totals = np.bincount(cells, weights=errors, minlength=q.size)
+        counts = np.bincount(cells, minlength=q.size)
+        q += learning_rate * (totals / np.maximum(counts, 1)).reshape(q.shape)
+
+
+def q_array(qtable) -> np.ndarray:
+    """The Q-values of a QTable as a (3, 2) array with rows as in STATES"""
+    return np.array([[qtable.get_q_value(state, action) for action in ACTION_NAMES] for state in STATES])
+
+
+def write_q_array(qtable, q: np.ndarray) -> None:
+    """Writes the Q-values of q_array's layout back into a QTable"""
+    for row, state in enumerate(STATES):
+        for column, action in enumerate(ACTION_NAMES):
+            qtable.set_q_value(state, action, float(q[row, column]))
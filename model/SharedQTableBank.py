@@ -0,0 +1,250 @@
+"""
+Q-tables in shared memory, so that one logical Q-learning agent can learn from games
+played in several processes at the same time.
+
+A SharedQTableBank holds the Q-values of a group of agents against a group of opponents
+in one multiprocessing.shared_memory block, laid out as (agents, opponents, states,
+actions) with states and actions encoded as in the engines. A SharedQTable is a QTable
+over one (agent, opponent) cell of the bank: agents use it like any other Q-table, and
+every update goes straight into the shared block. Pickling a SharedQTable only sends
+the bank's name and its indices, so tables are never copied between processes.
+
+Updates are either lock-free (Hogwild-style: a concurrent update may now and then be
+lost, which Q-learning tolerates) or take one of a fixed set of locks, striped over the
+(agent, opponent) cells.
+"""
+import contextlib
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Dict, List
+
+import numpy as np
+
+from model.QTable import QTable
+from model.bots.BaseBot import get_bot_name
+from model.constants import *
+from model.engine.common import STATE_INDEX, ACTION_NAMES
+
+UPDATE_HOGWILD = "hogwild"
+UPDATE_STRIPED = "striped"
+UPDATE_MODES = (UPDATE_HOGWILD, UPDATE_STRIPED)
+
+# Q-values per (agent, opponent) cell: states by actions
+CELL_SIZE = len(STATE_INDEX) * len(ACTION_NAMES)
+
+# Banks this process has attached to, by shared memory name
+_attached_banks: Dict[str, "SharedQTableBank"] = {}
+
+
+class SharedQTableBank:
+    """
+    The Q-values of every agent against every opponent in one shared memory block.
+
+    The process that creates a bank owns the block and unlinks it on close(). Other
+    processes receive the bank through their pool initializer (attach_bank), as the
+    striped locks can only be passed on when a process starts.
+
+    Attributes:
+        agent_names (List[str]): The agents, in the order of the first axis
+        opponent_names (List[str]): The opponents, in the order of the second axis
+        update (str): UPDATE_HOGWILD or UPDATE_STRIPED
+        values (np.ndarray): The Q-values, of shape (agents, opponents, 3, 2)
+        locks (list): The lock stripes with UPDATE_STRIPED, None otherwise
+    """
+
+    def __init__(self, agent_names: List[str], opponent_names: List[str], update: str = UPDATE_HOGWILD,
+                 stripes: int = LOCK_STRIPES):
+        if update not in UPDATE_MODES:
+            raise ValueError(f"Unknown update mode {update!r}, choose from {list(UPDATE_MODES)}")
+        self.agent_names = list(agent_names)
+        self.opponent_names = list(opponent_names)
+        self.update = update
+        self.shape = (len(self.agent_names), len(self.opponent_names), len(STATE_INDEX), len(ACTION_NAMES))
+        self.memory = shared_memory.SharedMemory(create=True, size=max(int(np.prod(self.shape)), 1) * 8)
+        self.owner = True
+        self.values = np.ndarray(self.shape, dtype=np.float64, buffer=self.memory.buf)
+        self.values[:] = 0.0
+        self.locks = [multiprocessing.Lock() for _ in range(stripes)] if update == UPDATE_STRIPED else None
+        _attached_banks[self.name] = self
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def __getstate__(self):
+        return {'name': self.name, 'agent_names': self.agent_names, 'opponent_names': self.opponent_names,
+                'update': self.update, 'shape': self.shape, 'locks': self.locks}
+
+    def __setstate__(self, state):
+        self.agent_names = state['agent_names']
+        self.opponent_names = state['opponent_names']
+        self.update = state['update']
+        self.shape = state['shape']
+        self.locks = state['locks']
+        self.memory = shared_memory.SharedMemory(name=state['name'])
+        self.owner = False
+        self.values = np.ndarray(self.shape, dtype=np.float64, buffer=self.memory.buf)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def lock(self, agent_index: int, opponent_index: int):
+        """The lock of the stripe of an (agent, opponent) cell, or a no-op without locking"""
+        if self.locks is None:
+            return contextlib.nullcontext()
+        return self.locks[(agent_index * len(self.opponent_names) + opponent_index) % len(self.locks)]
+
+    def table(self, agent_name: str, opponent_name: str) -> "SharedQTable":
+        return SharedQTable(self, self.agent_names.index(agent_name), self.opponent_names.index(opponent_name))
+
+    def bind(self, agent) -> None:
+        """Replaces the agent's Q-tables for the bank's opponents by shared ones, starting from their values"""
+        if agent.qtable_capacity is not None:
+            raise ValueError("Agents keeping their Q-tables in an OpponentQTableBank cannot share them")
+        for opponent_name in self.opponent_names:
+            table = self.table(agent.get_name(), opponent_name)
+            if opponent_name in agent.get_qtables():
+                for state in STATE_INDEX:
+                    for action in ACTION_NAMES:
+                        table.set_q_value(state, action, agent.get_q_value(opponent_name, state, action))
+            agent.set_qtable_for_opponent(opponent_name, table)
+
+    def unbind(self, agent) -> None:
+        """Gives the agent plain copies of its shared Q-tables, so it outlives the bank"""
+        for opponent_name in self.opponent_names:
+            shared_table = agent.get_qtable_for_opponent(opponent_name)
+            table = QTable(states=agent.actions, actions=agent.actions)
+            table.table = shared_table.get_table()
+            agent.set_qtable_for_opponent(opponent_name, table)
+            shared_table.release()
+
+    def close(self) -> None:
+        """
+        Detaches from the block, freeing it if this process created the bank. Every
+        SharedQTable of the bank must have been unbound or released first.
+        """
+        _attached_banks.pop(self.name, None)
+        self.values = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+class SharedQTable(QTable):
+    """
+    The QTable of one agent against one opponent, kept in a SharedQTableBank. get_table()
+    returns a copy of the values; reads and updates go through the other methods.
+    """
+
+    def __init__(self, bank: SharedQTableBank, agent_index: int, opponent_index: int):
+        self.bank = bank
+        self.agent_index = agent_index
+        self.opponent_index = opponent_index
+        # The cell's six doubles, read and written as Python floats, much faster than numpy scalars
+        start = (agent_index * len(bank.opponent_names) + opponent_index) * CELL_SIZE * 8
+        self.cells = bank.memory.buf[start:start + CELL_SIZE * 8].cast('d')
+        self.lock = bank.lock(agent_index, opponent_index)
+
+    def __reduce__(self):
+        return _attached_table, (self.bank.name, self.agent_index, self.opponent_index)
+
+    def get_table(self) -> dict:
+        cells = self.cells
+        return {state: {action: cells[row * 2 + STATE_INDEX[action]] for action in ACTION_NAMES}
+                for state, row in STATE_INDEX.items()}
+
+    def get_q_value(self, state: str, action: str) -> float:
+        return self.cells[STATE_INDEX[state] * 2 + STATE_INDEX[action]]
+
+    def set_q_value(self, state: str, action: str, value: float):
+        self.cells[STATE_INDEX[state] * 2 + STATE_INDEX[action]] = value
+
+    def update_q_value(self, state: str, action: str,
+                       learning_rate: float, immediate_reward: float,
+                       discount_factor: float, next_state: str):
+        """The Bellman update of QTable, applied in the shared block"""
+        cells = self.cells
+        cell = STATE_INDEX[state] * 2 + STATE_INDEX[action]
+        next_row = STATE_INDEX[next_state] * 2
+        with self.lock:
+            current_q_value = cells[cell]
+            max_future_q_value = max(cells[next_row], cells[next_row + 1])
+            cells[cell] = current_q_value + learning_rate * (
+                    immediate_reward + (discount_factor * max_future_q_value) - current_q_value
+            )
+
+    def release(self) -> None:
+        """Lets go of the shared block, after which the table can no longer be used"""
+        self.cells.release()
+
+
+def attach_bank(bank: SharedQTableBank) -> None:
+    """Pool initializer making a bank available to the SharedQTables sent to this process"""
+    _attached_banks[bank.name] = bank
+
+
+def _attached_table(name: str, agent_index: int, opponent_index: int) -> SharedQTable:
+    if name not in _attached_banks:
+        raise RuntimeError(f"Shared Q-table bank {name} is not attached in this process, see attach_bank")
+    return SharedQTable(_attached_banks[name], agent_index, opponent_index)
+
+
+def train_shared(agent, opponent, rounds: int, iterations: int = ITERATIONS, workers: int = 2,
+                 update: str = UPDATE_HOGWILD, seed=None, **options) -> dict:
+    """
+    Trains one agent against one opponent on parallel game streams: the rounds are split
+    over workers processes, each playing its share of games against its own copy of the
+    opponent, all learning into the same shared Q-table. Every stream explores as the
+    agent would over its own rounds; afterwards the agent's exploration moves on by all
+    rounds played, and its UCB visit counts add up those of the streams. Other options
+    are passed on to play_pairing, with the Python engine.
+
+    Returns: dict: The stats of both bots over all rounds, as play_pairing returns them
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    opponent_name = get_bot_name(opponent)
+    agent.initialize_q_table_for_opponent(opponent_name)
+    agent.initialize_exploration_rate(opponent_name)
+    shares = [rounds // workers + (stream < rounds % workers) for stream in range(workers)]
+    shares = [share for share in shares if share]
+
+    total_stats = {}
+    with SharedQTableBank([agent.get_name()], [opponent_name], update) as bank:
+        bank.bind(agent)
+        try:
+            tasks = [(agent, opponent, share, iterations, seed, stream, options)
+                     for stream, share in enumerate(shares)]
+            with ProcessPoolExecutor(max_workers=len(shares), initializer=attach_bank, initargs=(bank,)) as executor:
+                streams = list(executor.map(_play_stream, tasks))
+        finally:
+            # Even when a stream fails, so that the bank can be closed and its block freed
+            bank.unbind(agent)
+
+    visit_counts = agent.get_visit_counts(opponent_name)
+    for round_stats, stream_counts in streams:
+        for bot_name, stats in round_stats.items():
+            totals = total_stats.setdefault(bot_name, dict.fromkeys(stats, 0))
+            for key, value in stats.items():
+                totals[key] += value
+        for state, counts in stream_counts.items():
+            for action, count in counts.items():
+                visit_counts[state][action] += count
+    for _ in range(rounds):
+        agent.advance_exploration(opponent_name)
+    return total_stats
+
+
+def _play_stream(task):
+    from model.tournamentManager import play_pairing, seed_pairing, ENGINE_PYTHON
+    agent, opponent, rounds, iterations, seed, stream, options = task
+    opponent_name = get_bot_name(opponent)
+    # Only the games of this stream are counted
+    agent.visit_counts.pop(opponent_name, None)
+    seed_pairing(seed, 1, stream)
+    # The compiled kernel would write back whole tables, losing the other streams' updates
+    round_stats = play_pairing(agent, opponent, rounds, iterations, None, 0, **{**options, 'engine': ENGINE_PYTHON})
+    return round_stats, agent.get_visit_counts(opponent_name)
@@ -5,14 +5,24 @@ class BaseBot():
     Represents a generic bot for the Prisoner's Dilemma game
 
     This is a base class for all bot strategies. It provides a structure for implementing
-    specific strategies by defining common methods that can be overridden by subclasses
+    specific strategies by defining common methods that can be overridden by subclasses.
+    Strategies that can be written as a finite-state machine also declare it as `fsm`,
+    which lets the fast engines run them. Strategies played by a bot server in another
+    process hold the RemoteConnection they are played over as `connection`.
     """
+    fsm = None
+    connection = None
+
     def __init__(self, name):
         self.name = name
 
     def get_name(self) -> str:
         return self.name
 
+    def get_fsm(self):
+        """Returns the strategy's FSMSpec, or None if it has no FSM form."""
+        return self.fsm
+
     # Determines the action (Cooperate/Defect) the bot will take in the current round.
     def choose_action(self, name, opponent_last_action: Optional[str]) -> str:
         """Defines the action the bot will take."""
@@ -22,3 +32,13 @@ class BaseBot():
     def reset(self) -> None:
         """Resets the bot's state for a new round."""
         pass
+
+
+def get_bot_name(bot) -> str:
+    """The name stats and Q-tables are keyed by: the player's own name, or its type if it has none."""
+    return bot.get_name() if hasattr(bot, "get_name") else type(bot).__name__
+
+
+def is_remote(bot) -> bool:
+    """Whether the player's moves are chosen in another process, see model/remote.py"""
+    return getattr(bot, "connection", None) is not None
@@ -1,6 +1,7 @@
 from typing import Optional
 
 from model.bots.BaseBot import BaseBot
+from model.bots.FSMSpec import FSMSpec
 from model.constants import COOPERATE
 
 
@@ -9,6 +10,8 @@ class CooperateBot(BaseBot):
     A bot that always cooperates, regardless of the opponent's actions
     """
 
+    fsm = FSMSpec("CooperateBot", transitions=[[0, 0]], defect_probabilities=[0.0])
+
     def __init__(self):
         super().__init__(name="CooperateBot")
 
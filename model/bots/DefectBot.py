@@ -1,6 +1,7 @@
 from typing import Optional
 
 from model.bots.BaseBot import BaseBot
+from model.bots.FSMSpec import FSMSpec
 from model.constants import DEFECT
 
 
@@ -9,6 +10,8 @@ class DefectBot(BaseBot):
     A bot that always Defects, regardless of the opponent's actions
     """
 
+    fsm = FSMSpec("DefectBot", transitions=[[0, 0]], defect_probabilities=[1.0])
+
     def __init__(self):
         super().__init__(name="DefectBot")
 
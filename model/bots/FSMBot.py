@@ -0,0 +1,34 @@
+import random
+from typing import Optional
+
+from model.bots.BaseBot import BaseBot
+from model.bots.FSMSpec import FSMSpec
+from model.constants import COOPERATE, DEFECT
+
+
+class FSMBot(BaseBot):
+    """
+    A bot that plays any strategy given as an FSMSpec, so new archetypes can be
+    added as data. The same spec also runs in the fast engines.
+    """
+
+    def __init__(self, fsm: FSMSpec):
+        super().__init__(name=fsm.name)
+        self.fsm = fsm
+        self.state = None  # no move played yet
+
+    def choose_action(self, name, opponent_last_action: Optional[str] = None) -> str:
+        if self.state is None:
+            self.state = self.fsm.initial_state
+        elif opponent_last_action is not None:
+            self.state = self.fsm.next_state(self.state, opponent_last_action)
+
+        defect_probability = self.fsm.defect_probabilities[self.state]
+        if defect_probability == 0:
+            return COOPERATE
+        if defect_probability == 1:
+            return DEFECT
+        return DEFECT if random.random() < defect_probability else COOPERATE
+
+    def reset(self):
+        self.state = None
@@ -0,0 +1,49 @@
+from typing import List
+from model.constants import COOPERATE, DEFECT
+
+# Index of each action in the transition tables
+ACTION_INDEX = {COOPERATE: 0, DEFECT: 1}
+
+
+class FSMSpec:
+    """
+    Declarative finite-state-machine representation of a strategy.
+
+    The machine starts in the initial state and plays its first move from there. Before
+    every later move it moves to transitions[state][opponent's last action]. In each state
+    it defects with the state's defect probability, so deterministic states use 0 or 1.
+
+    Attributes:
+        name (str): The name of the strategy
+        transitions (List[List[int]]): Next state indexed by (state, opponent's last action),
+            with the actions indexed as in ACTION_INDEX
+        defect_probabilities (List[float]): Probability of defecting in each state
+        initial_state (int): The state the first move is played from
+    """
+
+    def __init__(self, name: str, transitions: List[List[int]],
+                 defect_probabilities: List[float], initial_state: int = 0):
+        num_states = len(defect_probabilities)
+        if len(transitions) != num_states:
+            raise ValueError("There must be one row of transitions per state")
+        for row in transitions:
+            if len(row) != len(ACTION_INDEX) or not all(0 <= state < num_states for state in row):
+                raise ValueError("Each transition row needs a valid next state per opponent action")
+        if not all(0 <= p <= 1 for p in defect_probabilities):
+            raise ValueError("Defect probabilities must be between 0 and 1")
+        if not 0 <= initial_state < num_states:
+            raise ValueError("Initial state must be one of the states")
+
+        self.name = name
+        self.transitions = [list(row) for row in transitions]
+        self.defect_probabilities = list(defect_probabilities)
+        self.initial_state = initial_state
+
+    def get_num_states(self) -> int:
+        return len(self.defect_probabilities)
+
+    def next_state(self, state: int, opponent_action: str) -> int:
+        return self.transitions[state][ACTION_INDEX[opponent_action]]
+
+    def is_deterministic(self) -> bool:
+        return all(p in (0, 1) for p in self.defect_probabilities)
@@ -1,6 +1,7 @@
 from typing import Optional
 
 from model.bots.BaseBot import BaseBot
+from model.bots.FSMSpec import FSMSpec
 from model.constants import DEFECT, COOPERATE
 
 
@@ -10,6 +11,9 @@ class GrimBot(BaseBot):
     opponent defects, then it defects forever
     """
 
+    # state 1 defects forever once it is entered
+    fsm = FSMSpec("GrimBot", transitions=[[0, 1], [1, 1]], defect_probabilities=[0.0, 1.0])
+
     def __init__(self):
         super().__init__(name="GrimBot")
         self.cooperate = True  # grim will start off cooperating
@@ -0,0 +1,37 @@
+from typing import Dict, Optional
+
+from model.bots.FSMBot import FSMBot
+from model.bots.FSMSpec import FSMSpec
+from model.constants import COOPERATE, DEFECT
+
+# FSM state of each Q-table state: the first move, then the opponent's last action
+POLICY_STATES = (None, COOPERATE, DEFECT)
+
+
+class PolicyBot(FSMBot):
+    """
+    A trained QLearningAgent frozen into a greedy lookup table: in every state it plays the
+    action the agent's Q-table for one opponent rates highest, ties going to COOPERATE,
+    without exploring or learning. As an FSM bot it runs in the fast engines, so trained
+    policies can be evaluated at the cost of TFTBot games.
+
+    Attributes:
+        agent_name (str): The name of the agent the policy was taken from
+        opponent_name (str): The opponent whose Q-table the policy was taken from
+        actions (Dict[Optional[str], str]): The action played in each state
+    """
+
+    def __init__(self, agent, opponent_name: str, name: Optional[str] = None):
+        table = agent.get_qtable_for_opponent(opponent_name).get_table()
+        self.agent_name = agent.get_name()
+        self.opponent_name = opponent_name
+        self.actions = {state: max(table[state], key=table[state].get) for state in POLICY_STATES}
+        # The next state only depends on the opponent's last action
+        transitions = [[POLICY_STATES.index(COOPERATE), POLICY_STATES.index(DEFECT)]] * len(POLICY_STATES)
+        super().__init__(FSMSpec(name or f"{self.agent_name}@{opponent_name}", transitions,
+                                 [1.0 if self.actions[state] == DEFECT else 0.0 for state in POLICY_STATES]))
+
+
+def freeze_policies(agent) -> Dict[str, PolicyBot]:
+    """A PolicyBot for every opponent the agent has a Q-table for, by opponent name"""
+    return {opponent_name: PolicyBot(agent, opponent_name) for opponent_name in agent.get_qtables()}
@@ -1,7 +1,8 @@
 import random
 from typing import Optional
 from model.bots.BaseBot import BaseBot
-from model.constants import COOPERATE, DEFECT
+from model.bots.FSMSpec import FSMSpec
+from model.constants import COOPERATE, DEFECT, TFT90_RETALIATION_RATE
 
 class TFT90Bot(BaseBot):
     """
@@ -9,6 +10,9 @@ class TFT90Bot(BaseBot):
     then mirrors the opponent's last move, but has a 10% chance of forgiving defections.
     """
 
+    # state 1 is entered after an opponent defection and retaliates 90% of the time
+    fsm = FSMSpec("TFT90Bot", transitions=[[0, 1], [0, 1]], defect_probabilities=[0.0, TFT90_RETALIATION_RATE])
+
     def __init__(self):
         super().__init__(name="TFT90Bot")
         self.is_first_round = True
@@ -19,7 +23,7 @@ class TFT90Bot(BaseBot):
             return COOPERATE
 
         if opponent_last_action == DEFECT:
-            return DEFECT if random.random() < 0.9 else COOPERATE
+            return DEFECT if random.random() < TFT90_RETALIATION_RATE else COOPERATE
 
         return COOPERATE
 
@@ -1,6 +1,7 @@
 from typing import Optional
 
 from model.bots.BaseBot import BaseBot
+from model.bots.FSMSpec import FSMSpec
 from model.constants import COOPERATE
 
 
@@ -10,6 +11,9 @@ class TFTBot(BaseBot):
     then copies opponents last move
     """
 
+    # state 0 cooperates, state 1 defects; both move to the opponent's last action
+    fsm = FSMSpec("TFTBot", transitions=[[0, 1], [0, 1]], defect_probabilities=[0.0, 1.0])
+
     def __init__(self):
         super().__init__(name="TFTBot")
         self.is_first_round = True 
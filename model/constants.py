@@ -8,6 +8,50 @@ DEFAULT_EXPLORATION_RATE = 1.0
 DISCOUNT_FACTOR = 0.99
 DECAY_RATE = 0.99
 
+# Experience replay: transitions kept per opponent when enabled, transitions per replayed
+# minibatch, and transitions added between two replays
+REPLAY_CAPACITY = 1000
+REPLAY_BATCH_SIZE = 32
+REPLAY_INTERVAL = 4
+
+# Distributed runs, see model/distributed.py: the coordinator's port, the seconds a worker
+# may hold a work unit before it is served again, and how often idle workers ask for more
+COORDINATOR_PORT = 7878
+UNIT_LEASE_SECONDS = 300.0
+WORKER_POLL_SECONDS = 0.2
+
+# Bots played in another process, see model/remote.py: the port a bot server listens on,
+# and the groups of games whose batches of moves are in flight at once on a connection
+BOT_SERVER_PORT = 7879
+REMOTE_PIPELINE_DEPTH = 4
+
+# Hyperparameter search: configurations to start from, the rounds of the first rung, and
+# 1 / the share of candidates kept after each rung
+SEARCH_CANDIDATES = 32
+SEARCH_MIN_ROUNDS = 50
+SEARCH_ETA = 2
+
+# Locks shared by the Q-tables of a SharedQTableBank with striped updates
+LOCK_STRIPES = 16
+
+# Opponent rows an OpponentQTableBank keeps in memory before spilling to disk
+QTABLE_BANK_CAPACITY = 4096
+
+# Parallel runs, see model/scheduling.py: the least estimated seconds of work handed to a
+# worker process at once, which amortizes sending the bots over
+PAIRING_MIN_CHUNK_SECONDS = 0.05
+
+# Turns per batch handed out by stream_round_robin
+TURN_BATCH_SIZE = 256
+
+# Exploration schedules, see model/ExplorationSchedule.py
+LINEAR_SCHEDULE_END = 0.01
+INVERSE_TIME_RATE = 0.01
+STEP_SCHEDULE_FACTOR = 0.5
+STEP_SCHEDULE_EVERY = 100
+BOLTZMANN_TEMPERATURE = 10.0
+UCB_COEFFICIENT = 10.0
+
 # Payoff matrix for the Prisoner's Dilemma
 PAYOFF_MATRIX = {
     (COOPERATE, COOPERATE): (3, 3),
@@ -15,6 +59,16 @@ PAYOFF_MATRIX = {
     (DEFECT, COOPERATE): (5, 0),
     (DEFECT, DEFECT): (1, 1),
 }
+# TFT90Bot retaliates against a defection with this probability
+TFT90_RETALIATION_RATE = 0.9
+
+# Noise: chance that a move is misexecuted, and chance that a move is misperceived by the opponent
+ERROR_RATE = 0.0
+MISPERCEPTION_RATE = 0.0
+
+# Chance that a game continues after each turn; None plays a fixed number of iterations
+CONTINUATION_PROBABILITY = None
+
 # tournament constants
 ROUND_NUM = "round_number"
 ACTIONS_SUFFIX = "_actions"
@@ -28,4 +82,15 @@ ITERATIONS = 200
 ROUNDS = 1000
 NUM_TOURNAMENTS = 10
 
-
+# output
+OUTPUT_DIR = "analysis_output"
+HISTORY_DIR = "history"
+CURVES_DIR = "curves"
+# Buckets of a learning-curve level combined into one bucket of the next, and the most
+# buckets drawn of any curve
+CURVE_DOWNSAMPLING = 4
+CURVE_PLOT_POINTS = 2000
+RESULTS_FILE = "tournament_results.npz"
+PAIRING_COSTS_FILE = "pairing_costs.json"
+# Results waiting for each consumer of the streaming pipeline before the simulation blocks
+PIPELINE_QUEUE_SIZE = 64
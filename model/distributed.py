@@ -0,0 +1,290 @@
+"""
+Tournaments and sweeps spread over worker processes on any number of hosts.
+
+A Coordinator splits runs into work units, one per (parameter point, tournament,
+pairing), and serves them over TCP. Workers connect with run_worker, ask for units and
+stream the stats of every unit back as soon as it is played. Every unit is played from
+fresh bots with its own seed, as play_pairing_of_run does, so a unit gives the same
+stats wherever and however often it is played:
+
+    retries         the units of a worker whose connection drops, or that hold a unit for
+                    longer than the lease, go back to the queue
+    work stealing   once the queue is empty, idle workers also play the units others are
+                    still busy with, oldest first, and the first result counts
+
+The results of each point are added up in tournament and pairing order into the same
+tournament_stats and aggregate_stats as simulate_round_robin. The one exception is the
+compiled engine with several Q-learning agents: simulate_round_robin trains every
+learner-vs-learner pairing of a tournament in one batch, seeded for the whole batch,
+while a unit plays its pairing on its own, so those pairings come out differently.
+
+The protocol is one JSON object per line. A worker sends {"type": "request"} and gets
+back a unit ({"type": "unit", "unit": id, "parameters": ..., "seed": ...,
+"tournament": t, "pairing": p}), {"type": "wait"} while others finish the last units, or
+{"type": "done"}; it returns each unit's stats as {"type": "result", "unit": id,
+"stats": ...}.
+"""
+import collections
+import itertools
+import json
+import socket
+import socketserver
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from model.ExplorationSchedule import describe_schedule
+from model.constants import *
+from model.tournamentManager import BOT_TYPES, ENGINE_PYTHON, add_to_aggregate_stats, play_pairing_of_run
+
+# Parameters of a run, as run_round_robin records them, for whatever a point leaves out
+DEFAULT_PARAMETERS = {
+    'bot_names': None, 'num_learners': 0, 'rounds': ROUNDS, 'iterations': ITERATIONS, 'num_tournaments': 1,
+    'engine': ENGINE_PYTHON, 'error_rate': ERROR_RATE, 'misperception_rate': MISPERCEPTION_RATE,
+    'continuation_probability': CONTINUATION_PROBABILITY, 'schedule': describe_schedule(None),
+    'replay_capacity': 0,
+}
+
+
+def sweep_points(grid: Dict[str, list], **base) -> List[Dict]:
+    """Every combination of the values in grid, by parameter name, on top of the base parameters"""
+    names = list(grid)
+    return [{**base, **dict(zip(names, values))} for values in itertools.product(*(grid[name] for name in names))]
+
+
+def parse_address(address: str) -> tuple:
+    """(host, port) of a "host:port" or "port" address, the host defaulting to all interfaces"""
+    host, _, port = address.rpartition(":")
+    return host or "0.0.0.0", int(port)
+
+
+def send_message(file, message: Dict) -> None:
+    # Stats from the compiled engines hold numpy scalars
+    file.write((json.dumps(message, default=lambda value: value.item()) + "\n").encode())
+    file.flush()
+
+
+def receive_message(file) -> Optional[Dict]:
+    """The next message, or None once the other side has closed the connection"""
+    line = file.readline()
+    return json.loads(line) if line else None
+
+
+class Coordinator:
+    """
+    Serves the work units of one or more runs to workers, and collects their results.
+
+    Attributes:
+        points (List[Dict]): The parameters of every run, with a seed each
+        address (tuple[str, int]): The host and port workers connect to
+        lease (float): Seconds a worker may hold a unit before it is served again
+        retries (int): Units served again after their worker was lost or ran out of lease
+        steals (int): Units served to a second worker while the first was still busy
+    """
+
+    def __init__(self, points: List[Dict], host: str = "127.0.0.1", port: int = COORDINATOR_PORT,
+                 lease: float = UNIT_LEASE_SECONDS, steal: bool = True,
+                 on_result: Optional[Callable[[int, int, int, Dict], None]] = None):
+        """
+        Args:
+            points (List[Dict]): The runs to play, each a dict of run_round_robin parameters
+                with a 'seed'; see DEFAULT_PARAMETERS for what may be left out
+            port (int): The port to listen on, 0 for any free one
+            steal (bool): Whether idle workers also play the units others are busy with
+            on_result (Callable): Called with the point, tournament, pairing and stats of
+                every unit as its first result arrives
+        """
+        self.points = []
+        for point in points:
+            if point.get('seed') is None:
+                raise ValueError("Every point needs a seed, so that units can be played again anywhere")
+            self.points.append({**DEFAULT_PARAMETERS, **point})
+        self.lease = lease
+        self.steal = steal
+        self.on_result = on_result
+        self.retries = 0
+        self.steals = 0
+
+        # Units in the order their results are reduced: point, tournament, pairing
+        self.units = []
+        for number, point in enumerate(self.points):
+            num_bots = len(point['bot_names'] or BOT_TYPES) + point['num_learners']
+            num_pairings = num_bots * (num_bots - 1) // 2
+            self.units += [(number, tournament_num, index) for tournament_num in range(1, point['num_tournaments'] + 1)
+                           for index in range(num_pairings)]
+        self.pending = collections.deque(range(len(self.units)))
+        # Unit id -> {worker id: time the unit was served to that worker}
+        self.in_flight: Dict[int, Dict[int, float]] = {}
+        self.results: Dict[int, Dict] = {}
+        self.condition = threading.Condition()
+        self.worker_ids = itertools.count()
+
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                coordinator._serve_worker(self.rfile, self.wfile)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.address = self.server.server_address
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def done(self) -> bool:
+        return len(self.results) == len(self.units)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every unit has a result, returning False if the timeout ran out first"""
+        with self.condition:
+            return self.condition.wait_for(self.done, timeout)
+
+    def stats(self, point: int = 0):
+        """
+        Returns: tuple[list, dict]: The per-match stats and the aggregate stats of a point,
+        as simulate_round_robin returns them
+        """
+        tournament_stats = []
+        aggregate_stats = {}
+        for unit, (number, _, _) in enumerate(self.units):
+            if number == point:
+                tournament_stats.append(self.results[unit])
+                add_to_aggregate_stats(aggregate_stats, self.results[unit])
+        return tournament_stats, aggregate_stats
+
+    def _next_unit(self, worker: int) -> Optional[int]:
+        """The unit to serve a worker next, None if there is none for it right now"""
+        now = time.monotonic()
+        # Units whose every lease ran out are played again
+        for unit, holders in list(self.in_flight.items()):
+            if all(now - served > self.lease for served in holders.values()):
+                del self.in_flight[unit]
+                self.pending.append(unit)
+                self.retries += 1
+        # A unit queued again when its lease ran out may have had its result since
+        while self.pending and self.pending[0] in self.results:
+            self.pending.popleft()
+        if self.pending:
+            unit = self.pending.popleft()
+        elif self.steal:
+            others = [(min(holders.values()), unit) for unit, holders in self.in_flight.items()
+                      if worker not in holders]
+            if not others:
+                return None
+            unit = min(others)[1]
+            self.steals += 1
+        else:
+            return None
+        self.in_flight.setdefault(unit, {})[worker] = now
+        return unit
+
+    def _add_result(self, worker: int, unit: int, round_stats: Dict) -> None:
+        self.in_flight.get(unit, {}).pop(worker, None)
+        if unit in self.results:
+            return
+        self.in_flight.pop(unit, None)
+        self.results[unit] = round_stats
+        if self.on_result is not None:
+            self.on_result(*self.units[unit], round_stats)
+        self.condition.notify_all()
+
+    def _drop_worker(self, worker: int) -> None:
+        """Serves the units a lost worker was playing again, unless others are playing them too"""
+        for unit, holders in list(self.in_flight.items()):
+            if holders.pop(worker, None) is not None and not holders:
+                del self.in_flight[unit]
+                self.pending.appendleft(unit)
+                self.retries += 1
+
+    def _serve_worker(self, rfile, wfile) -> None:
+        worker = next(self.worker_ids)
+        try:
+            while True:
+                message = receive_message(rfile)
+                if message is None:
+                    break
+                with self.condition:
+                    if message['type'] == 'result':
+                        self._add_result(worker, message['unit'], message['stats'])
+                        continue
+                    finished = self.done()
+                    unit = None if finished else self._next_unit(worker)
+                if unit is not None:
+                    number, tournament_num, index = self.units[unit]
+                    send_message(wfile, {'type': 'unit', 'unit': unit, 'parameters': self.points[number],
+                                         'seed': self.points[number]['seed'], 'tournament': tournament_num,
+                                         'pairing': index})
+                else:
+                    send_message(wfile, {'type': 'done' if finished else 'wait'})
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with self.condition:
+                self._drop_worker(worker)
+
+
+def run_worker(host: str = "127.0.0.1", port: int = COORDINATOR_PORT,
+               poll_interval: float = WORKER_POLL_SECONDS, max_units: Optional[int] = None) -> int:
+    """
+    Plays the units a coordinator serves until it has none left or has gone away, or until
+    max_units have been played, sending the stats of each back as soon as it is done.
+
+    Returns: int: The number of units played
+    """
+    played = 0
+    with socket.create_connection((host, port)) as connection, connection.makefile('rwb') as file:
+        while max_units is None or played < max_units:
+            try:
+                send_message(file, {'type': 'request'})
+                message = receive_message(file)
+            except ConnectionError:
+                # The coordinator has everything it needs and has shut down
+                break
+            if message is None or message['type'] == 'done':
+                break
+            if message['type'] == 'wait':
+                time.sleep(poll_interval)
+                continue
+            round_stats = play_pairing_of_run(message['parameters'], message['seed'], message['tournament'],
+                                              message['pairing'])
+            try:
+                send_message(file, {'type': 'result', 'unit': message['unit'], 'stats': round_stats})
+            except ConnectionError:
+                break
+            played += 1
+    return played
+
+
+def run_distributed(points: List[Dict], workers: int = 1, host: str = "127.0.0.1", port: int = COORDINATOR_PORT,
+                    **options) -> List[tuple]:
+    """
+    Plays the runs through a coordinator, with the given number of local worker processes
+    joining in, and waits for all units, whichever workers play them. Other options are
+    passed on to the Coordinator.
+
+    Returns: List[tuple]: The per-match stats and the aggregate stats of every point
+    """
+    import multiprocessing
+
+    with Coordinator(points, host, port, **options) as coordinator:
+        # Local workers reach a coordinator listening on all interfaces through the loopback
+        local_host = "127.0.0.1" if coordinator.address[0] == "0.0.0.0" else coordinator.address[0]
+        processes = [multiprocessing.Process(target=run_worker, args=(local_host, coordinator.address[1]), daemon=True)
+                     for _ in range(workers)]
+        for process in processes:
+            process.start()
+        coordinator.wait()
+        for process in processes:
+            process.join()
+        return [coordinator.stats(number) for number in range(len(coordinator.points))]
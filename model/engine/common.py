@@ -0,0 +1,54 @@
+"""
+Integer encoding and stats helpers shared by the array-based engines.
+"""
+import numpy as np
+
+from model.bots.BaseBot import BaseBot
+from model.constants import *
+
+C, D = 0, 1
+NONE_STATE = 2
+ACTION_NAMES = (COOPERATE, DEFECT)
+STATE_INDEX = {COOPERATE: C, DEFECT: D, None: NONE_STATE}
+
+
+def payoff_array() -> np.ndarray:
+    """PAYOFF_MATRIX as an integer array indexed by (action1, action2, player)"""
+    payoff = np.zeros((2, 2, 2), dtype=np.int64)
+    for (action1, action2), rewards in PAYOFF_MATRIX.items():
+        payoff[STATE_INDEX[action1], STATE_INDEX[action2]] = rewards
+    return payoff
+
+
+def noise_masks(rng: np.random.Generator, shape, rate) -> np.ndarray:
+    """
+    Pre-generated noise: a 0/1 mask of the given shape that is 1 where a move is flipped,
+    each entry with probability rate (which broadcasts against the shape). No random
+    numbers are drawn when the rate is 0, so noise-free runs are unchanged.
+    """
+    rate = np.asarray(rate, dtype=np.float64)
+    if not np.any(rate > 0):
+        return np.zeros(shape, dtype=np.uint8)
+    return (rng.random(shape) < rate).astype(np.uint8)
+
+
+def get_fsm_spec(bot):
+    """Returns the bot's FSMSpec, or None if it cannot run in the FSM engines"""
+    return bot.get_fsm() if isinstance(bot, BaseBot) else None
+
+
+def pairing_stats(names, payoffs: np.ndarray, cooperations: np.ndarray, turns) -> dict:
+    """
+    Builds the stats dict of play_game from per-game payoff and cooperation arrays of
+    shape (games, 2). Turns is the total number of turns played by each side.
+    """
+    stats = {}
+    for side, name in enumerate(names):
+        cooperate_count = int(cooperations[:, side].sum())
+        stats[name] = {
+            TOTAL_PAYOFF: int(payoffs[:, side].sum()),
+            MATCHES_PLAYED: int(turns),
+            COOPERATE_COUNT: cooperate_count,
+            DEFECT_COUNT: int(turns) - cooperate_count
+        }
+    return stats
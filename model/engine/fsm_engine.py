@@ -0,0 +1,141 @@
+"""
+Generic lock-step engine for strategies given as FSMSpec tables.
+
+The specs are stacked into padded arrays, and any number of games are stepped together:
+each turn is a handful of fancy-indexing operations over all games at once, whatever
+mix of strategies is being played.
+"""
+from typing import List
+
+import numpy as np
+
+from model.bots.FSMSpec import FSMSpec
+from model.bots.BaseBot import get_bot_name
+from model.engine.common import C, payoff_array, get_fsm_spec, pairing_stats, noise_masks
+
+
+class FSMTables:
+    """
+    A set of FSMSpecs stacked into arrays. Specs with fewer states are padded with
+    unreachable states.
+
+    Attributes:
+        names (List[str]): The names of the stacked strategies
+        transitions (np.ndarray): Next states of shape (specs, states, 2)
+        defect_probabilities (np.ndarray): Defect probabilities of shape (specs, states)
+        initial_states (np.ndarray): Initial states of shape (specs,)
+    """
+
+    def __init__(self, specs: List[FSMSpec]):
+        num_states = max(spec.get_num_states() for spec in specs)
+        self.names = [spec.name for spec in specs]
+        self.transitions = np.zeros((len(specs), num_states, 2), dtype=np.int64)
+        self.defect_probabilities = np.zeros((len(specs), num_states), dtype=np.float64)
+        self.initial_states = np.array([spec.initial_state for spec in specs], dtype=np.int64)
+        for row, spec in enumerate(specs):
+            self.transitions[row, :spec.get_num_states()] = spec.transitions
+            self.defect_probabilities[row, :spec.get_num_states()] = spec.defect_probabilities
+
+    def initial(self, rows: np.ndarray) -> np.ndarray:
+        return self.initial_states[rows]
+
+    def advance(self, rows: np.ndarray, states: np.ndarray, opponent_actions: np.ndarray) -> np.ndarray:
+        """Moves every machine to its next state given the opponent's last action"""
+        return self.transitions[rows, states, opponent_actions]
+
+    def choose(self, rows: np.ndarray, states: np.ndarray, draws: np.ndarray) -> np.ndarray:
+        """Actions (0 cooperate, 1 defect) of every machine for uniform draws in [0, 1)"""
+        return (draws < self.defect_probabilities[rows, states]).astype(np.int64)
+
+
+def play_fsm_games(tables: FSMTables, rows1: np.ndarray, rows2: np.ndarray, lengths,
+                   rng: np.random.Generator, error_rate=0.0, misperception_rate=0.0, moves=None):
+    """
+    Plays len(rows1) games in lock-step, game g between tables rows rows1[g] and rows2[g].
+
+    Lengths is the number of turns, either shared by all games or one per game. Games are
+    ordered longest first, so the games still running at any turn are a prefix of the
+    arrays and finished games cost nothing.
+
+    The noise rates are scalars or per-game arrays. Noise masks for all turns of all games
+    are generated up front; they flip the executed moves and, separately, the moves as
+    the opponent perceives them, which is what the machines step on.
+
+    If moves is given, an array of shape (max length, games), it is filled with the
+    2-bit joint action of every turn of every game (see HistoryStore).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Per-game payoffs and cooperation counts of shape (games, 2)
+    """
+    payoff = payoff_array()
+    games = len(rows1)
+    lengths = np.broadcast_to(np.asarray(lengths, dtype=np.int64), (games,))
+    order = np.argsort(-lengths, kind="stable")
+    sorted_lengths = lengths[order]
+    rows1 = np.asarray(rows1)[order]
+    rows2 = np.asarray(rows2)[order]
+    max_length = int(sorted_lengths[0]) if games else 0
+    # Number of games still running at each turn
+    running = np.searchsorted(-sorted_lengths, -np.arange(max_length), side="left")
+
+    payoffs = np.zeros((games, 2), dtype=np.int64)
+    cooperations = np.zeros((games, 2), dtype=np.int64)
+
+    # Per-game rates broadcast over (turns, games, side)
+    error_rate = np.broadcast_to(np.asarray(error_rate, dtype=np.float64), (games,))[order]
+    misperception_rate = np.broadcast_to(np.asarray(misperception_rate, dtype=np.float64), (games,))[order]
+    errors = noise_masks(rng, (max_length, games, 2), error_rate[:, None])
+    misperceptions = noise_masks(rng, (max_length, games, 2), misperception_rate[:, None])
+
+    states1 = tables.initial(rows1)
+    states2 = tables.initial(rows2)
+    seen1 = seen2 = None
+    for turn in range(max_length):
+        n = running[turn]
+        if turn > 0:
+            states1 = tables.advance(rows1[:n], states1[:n], seen2[:n])
+            states2 = tables.advance(rows2[:n], states2[:n], seen1[:n])
+        draws = rng.random((2, n))
+        actions1 = tables.choose(rows1[:n], states1, draws[0]) ^ errors[turn, :n, 0]
+        actions2 = tables.choose(rows2[:n], states2, draws[1]) ^ errors[turn, :n, 1]
+
+        payoffs[:n] += payoff[actions1, actions2]
+        cooperations[:n, 0] += actions1 == C
+        cooperations[:n, 1] += actions2 == C
+        if moves is not None:
+            moves[turn, order[:n]] = (actions1 << 1) | actions2
+
+        # Each side steps on the other's move as it perceived it
+        seen1 = actions1 ^ misperceptions[turn, :n, 0]
+        seen2 = actions2 ^ misperceptions[turn, :n, 1]
+
+    # Back to the order of the games
+    payoffs[order] = payoffs.copy()
+    cooperations[order] = cooperations.copy()
+    return payoffs, cooperations
+
+
+def supports_pairing(bot1, bot2) -> bool:
+    """Whether both bots have an FSM form"""
+    return get_fsm_spec(bot1) is not None and get_fsm_spec(bot2) is not None
+
+
+def play_pairing_batched(bot1, bot2, lengths, rng: np.random.Generator,
+                         error_rate: float = 0.0, misperception_rate: float = 0.0, history=None) -> dict:
+    """
+    Batched version of play_pairing for two FSM bots: all rounds are independent games,
+    so they are played together in lock-step. Lengths holds the number of turns of each
+    round. Every game is recorded in the HistoryBuffer history, if given. Returns the
+    same stats dict.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    rounds = len(lengths)
+    tables = FSMTables([get_fsm_spec(bot1), get_fsm_spec(bot2)])
+    moves = np.zeros((int(lengths.max(initial=0)), rounds), dtype=np.uint8) if history is not None else None
+    payoffs, cooperations = play_fsm_games(tables, np.zeros(rounds, dtype=np.int64),
+                                           np.ones(rounds, dtype=np.int64), lengths, rng,
+                                           error_rate, misperception_rate, moves)
+    if history is not None:
+        for round, length in enumerate(lengths):
+            history.record_game(moves[:length, round])
+    return pairing_stats([get_bot_name(bot1), get_bot_name(bot2)], payoffs, cooperations, lengths.sum())
@@ -0,0 +1,160 @@
+"""
+Batched self-play engine for pairings in which both sides are QLearningAgents.
+
+Every pairing keeps two Q-tables, one per side, for the opponent it faces. All pairings
+play their rounds in lock-step and both sides are updated every turn with one batched
+Bellman update, so the cost of a learner-vs-learner tournament grows with the array
+sizes rather than with the number of Python calls.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+from model.QLearningAgent import QLearningAgent
+from model.bots.BaseBot import get_bot_name
+from model.ExplorationSchedule import POLICY_BOLTZMANN, POLICY_UCB
+from model.engine.common import C, D, NONE_STATE, payoff_array, pairing_stats, noise_masks
+from model.engine.qlearning_kernel import (qtable_to_array, array_to_qtable, read_visit_counts,
+                                          write_visit_counts)
+
+
+def supports_pairing(bot1, bot2) -> bool:
+    """Whether both sides of the pairing are Q-learning agents without experience replay"""
+    return all(isinstance(bot, QLearningAgent) and not bot.replay_capacity for bot in (bot1, bot2))
+
+
+def play_learner_pairings(pairings: List[Tuple[QLearningAgent, QLearningAgent]], lengths,
+                          rng: np.random.Generator, error_rate: float = 0.0, misperception_rate: float = 0.0,
+                          histories=None) -> List[dict]:
+    """
+    Plays all rounds of every learner-vs-learner pairing together, decaying both sides'
+    exploration parameters after each round by the factors of their schedules. The
+    agents' Q-tables and exploration state for these opponents are read at the start and
+    written back at the end. Noise masks for every round are generated up front, as in
+    the FSM engine.
+
+    lengths has shape (rounds, pairings) and holds the number of turns of each game.
+    Games that have ended are masked out of the remaining turns of their round.
+    histories, if given, holds one HistoryBuffer per pairing to record every game in.
+
+    Returns: List[dict]: The stats dict of each pairing, in the order of the pairings
+    """
+    num_pairings = len(pairings)
+    if num_pairings == 0:
+        return []
+    names = [(get_bot_name(agent1), get_bot_name(agent2)) for agent1, agent2 in pairings]
+    # Every side of every pairing as (agent, opponent name)
+    sides = [[(agent1, name2), (agent2, name1)] for (agent1, agent2), (name1, name2) in zip(pairings, names)]
+    for pairing_sides in sides:
+        for agent, opponent_name in pairing_sides:
+            agent.initialize_q_table_for_opponent(opponent_name)
+            agent.initialize_exploration_rate(opponent_name)
+    lengths = np.asarray(lengths, dtype=np.int64).reshape(-1, num_pairings)
+    rounds = len(lengths)
+
+    # Per pairing and side: Q-table of shape (3, 2), visit counts of the same shape, exploration
+    # parameter, policy, learning rate and discount factor, and the decay factor of every round
+    q = np.array([[qtable_to_array(agent.get_qtable_for_opponent(opponent_name))
+                   for agent, opponent_name in pairing_sides] for pairing_sides in sides])
+    counts = np.array([[read_visit_counts(agent, opponent_name)
+                        for agent, opponent_name in pairing_sides] for pairing_sides in sides])
+    exploration_rates = np.array([[agent.get_exploration_rate(opponent_name)
+                                   for agent, opponent_name in pairing_sides] for pairing_sides in sides])
+    policies = np.array([[agent.get_schedule().policy for agent, _ in pairing_sides] for pairing_sides in sides])
+    learning_rates = np.array([[agent.get_learning_rate() for agent, _ in pairing_sides] for pairing_sides in sides])
+    discount_factors = np.array([[agent.get_discount_factor() for agent, _ in pairing_sides]
+                                 for pairing_sides in sides])
+    first_rounds = [[agent.get_exploration_round(opponent_name) for agent, opponent_name in pairing_sides]
+                    for pairing_sides in sides]
+    decay_factors = np.array([[agent.get_schedule().decay_factors(first_round, rounds)
+                               for (agent, _), first_round in zip(pairing_sides, pairing_first_rounds)]
+                              for pairing_sides, pairing_first_rounds in zip(sides, first_rounds)]).reshape(
+        num_pairings, 2, rounds).transpose(2, 0, 1)
+    boltzmann = policies == POLICY_BOLTZMANN
+    ucb = policies == POLICY_UCB
+
+    payoff = payoff_array()
+    pairing_index = np.arange(num_pairings)[:, None]
+    side_index = np.arange(2)[None, :]
+    payoffs = np.zeros((num_pairings, 2), dtype=np.int64)
+    cooperations = np.zeros((num_pairings, 2), dtype=np.int64)
+
+    for round, round_lengths in enumerate(lengths):
+        # Each side's state is the other side's last action
+        opponent_last = np.full((num_pairings, 2), -1, dtype=np.int64)
+        max_length = int(round_lengths.max())
+        errors = noise_masks(rng, (max_length, num_pairings, 2), error_rate)
+        misperceptions = noise_masks(rng, (max_length, num_pairings, 2), misperception_rate)
+        moves = np.zeros((max_length, num_pairings), dtype=np.uint8)
+        for turn in range(max_length):
+            active = (turn < round_lengths)[:, None]
+            draws = rng.random((2, num_pairings, 2))
+            first_turn = opponent_last < 0
+            choice_states = np.where(first_turn, NONE_STATE, opponent_last)
+            states = np.where(first_turn, C, opponent_last)
+
+            # Every side of every pairing chooses by its own policy, ties going to COOPERATE
+            choice_q = q[pairing_index, side_index, choice_states]
+            greedy = (choice_q[..., D] > choice_q[..., C]).astype(np.int64)
+            random_actions = (draws[1] >= 0.5).astype(np.int64)
+            actions = np.where(draws[0] < exploration_rates, random_actions, greedy)
+            if boltzmann.any():
+                softmax_actions = (draws[1] < boltzmann_defect_probabilities(choice_q, exploration_rates))
+                actions = np.where(boltzmann, softmax_actions.astype(np.int64), actions)
+            if ucb.any():
+                choice_counts = counts[pairing_index, side_index, choice_states]
+                ucb_actions = ucb_choices(choice_q, choice_counts, exploration_rates)
+                actions = np.where(ucb, ucb_actions, actions)
+                counts[pairing_index, side_index, choice_states, actions] += ucb & active
+            actions = actions ^ errors[turn]
+            # Each side sees the other's move, possibly misperceived
+            opponent_actions = (actions ^ misperceptions[turn])[:, ::-1]
+
+            rewards = payoff[actions[:, 0], actions[:, 1]]
+            payoffs += rewards * active
+            cooperations += (actions == C) & active
+            moves[turn] = (actions[:, 0] << 1) | actions[:, 1]
+
+            # Batched Bellman update with the opponent's perceived action as the next state
+            max_future = q[pairing_index, side_index, opponent_actions].max(axis=-1)
+            current = q[pairing_index, side_index, states, actions]
+            updated = current + learning_rates * (rewards + (discount_factors * max_future) - current)
+            q[pairing_index, side_index, states, actions] = np.where(active, updated, current)
+            opponent_last = opponent_actions
+
+        if histories is not None:
+            for index, history in enumerate(histories):
+                history.record_game(moves[:round_lengths[index], index])
+        exploration_rates = exploration_rates * decay_factors[round]
+
+    results = []
+    turns = lengths.sum(axis=0)
+    for index, (pairing_sides, (name1, name2)) in enumerate(zip(sides, names)):
+        for side, (agent, opponent_name) in enumerate(pairing_sides):
+            array_to_qtable(q[index, side], agent.get_qtable_for_opponent(opponent_name))
+            write_visit_counts(counts[index, side], agent, opponent_name)
+            agent.set_exploration_rate(opponent_name, float(exploration_rates[index, side]))
+            agent.exploration_rounds[opponent_name] = first_rounds[index][side] + rounds
+        results.append(pairing_stats([name1, name2], payoffs[index:index + 1],
+                                     cooperations[index:index + 1], int(turns[index])))
+    return results
+
+
+def boltzmann_defect_probabilities(choice_q: np.ndarray, temperatures: np.ndarray) -> np.ndarray:
+    """Softmax probabilities of defecting, greedy where the temperature is 0"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (choice_q[..., C] - choice_q[..., D]) / temperatures
+    # exp of minus the absolute value never overflows
+    z = np.exp(-np.abs(x))
+    probabilities = np.where(x >= 0, z / (1 + z), 1 / (1 + z))
+    greedy = (choice_q[..., D] > choice_q[..., C]).astype(np.float64)
+    return np.where(temperatures > 0, probabilities, greedy)
+
+
+def ucb_choices(choice_q: np.ndarray, choice_counts: np.ndarray, coefficients: np.ndarray) -> np.ndarray:
+    """Actions with the highest UCB score, untried actions first and ties going to COOPERATE"""
+    state_visits = choice_counts.sum(axis=-1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bonus = coefficients[..., None] * np.sqrt(np.log(np.maximum(state_visits, 1)) / choice_counts)
+    values = np.where(choice_counts > 0, choice_q + bonus, np.inf)
+    return (values[..., D] > values[..., C]).astype(np.int64)
@@ -0,0 +1,222 @@
+"""
+Exact expected payoffs of FSM strategy pairings, without simulating any games.
+
+Two FSM bots playing each other form a Markov chain over their joint states: from joint
+state (s1, s2) both sides defect with their states' probabilities, noise flips the
+executed and the perceived moves, and each side steps on the move it perceived. The
+chains of many pairings are built as one stack of transition matrices of shape
+(pairings, S, S), S being the number of joint states, and solved together:
+
+    fixed horizon       the distribution over the turns of a game, summed by repeated squaring
+    geometric horizon   (I - δT)⁻¹ with continuation probability δ
+    long run            the limiting average over turns, the stationary distribution
+                        reached from the initial state
+
+The results are expectations, so they can be compared with the simulated stats of the
+same pairings to check the engines.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from model.bots.BaseBot import get_bot_name
+from model.constants import *
+from model.engine.common import payoff_array, get_fsm_spec
+from model.engine.fsm_engine import FSMTables
+
+# Doublings of the averaging window of the long-run solution, enough for the transient
+# and periodic parts of any chain to vanish below float precision
+LONG_RUN_DOUBLINGS = 60
+
+
+class JointChains:
+    """
+    The Markov chains of len(rows1) pairings, pairing p between tables rows rows1[p] and
+    rows2[p]. Joint state s1 * n + s2 is side 1 in state s1 and side 2 in state s2, with n
+    the padded number of states of the tables.
+
+    Attributes:
+        transitions (np.ndarray): Transition probabilities of shape (pairings, S, S)
+        rewards (np.ndarray): Expected payoff of each side per turn from each joint state,
+            of shape (pairings, S, 2)
+        cooperations (np.ndarray): Probability that each side's executed move is COOPERATE
+            from each joint state, of shape (pairings, S, 2)
+        initial (np.ndarray): Distribution over the joint states at the first turn, of
+            shape (pairings, S)
+    """
+
+    def __init__(self, tables: FSMTables, rows1: np.ndarray, rows2: np.ndarray,
+                 error_rate=0.0, misperception_rate=0.0):
+        rows1 = np.asarray(rows1, dtype=np.int64)
+        rows2 = np.asarray(rows2, dtype=np.int64)
+        pairings = len(rows1)
+        n = tables.transitions.shape[1]
+        size = n * n
+        payoff = payoff_array()
+        # Per-pairing rates, broadcast over the joint states
+        error_rate = np.broadcast_to(np.asarray(error_rate, dtype=np.float64), (pairings,))[:, None]
+        misperception_rate = np.broadcast_to(np.asarray(misperception_rate, dtype=np.float64), (pairings,))[:, None]
+
+        states1, states2 = np.divmod(np.arange(size), n)
+        # Probability of each side's executed move being DEFECT, of shape (pairings, S)
+        defects1 = tables.defect_probabilities[rows1[:, None], states1[None, :]]
+        defects2 = tables.defect_probabilities[rows2[:, None], states2[None, :]]
+        executed1 = defects1 * (1 - error_rate) + (1 - defects1) * error_rate
+        executed2 = defects2 * (1 - error_rate) + (1 - defects2) * error_rate
+
+        self.transitions = np.zeros((pairings, size, size))
+        self.rewards = np.zeros((pairings, size, 2))
+        self.cooperations = np.stack([1 - executed1, 1 - executed2], axis=-1)
+        pairing_index = np.repeat(np.arange(pairings), size)
+        state_index = np.tile(np.arange(size), pairings)
+        for action1 in (0, 1):
+            for action2 in (0, 1):
+                p_actions = (executed1 if action1 else 1 - executed1) * (executed2 if action2 else 1 - executed2)
+                self.rewards += p_actions[..., None] * payoff[action1, action2]
+                for flip1 in (0, 1):
+                    for flip2 in (0, 1):
+                        # What side 2 saw of side 1's move, and side 1 of side 2's
+                        seen1, seen2 = action1 ^ flip1, action2 ^ flip2
+                        p_seen = ((misperception_rate if flip1 else 1 - misperception_rate)
+                                  * (misperception_rate if flip2 else 1 - misperception_rate))
+                        next1 = tables.transitions[rows1[:, None], states1[None, :], seen2]
+                        next2 = tables.transitions[rows2[:, None], states2[None, :], seen1]
+                        np.add.at(self.transitions,
+                                  (pairing_index, state_index, (next1 * n + next2).ravel()),
+                                  (p_actions * p_seen).ravel())
+
+        self.initial = np.zeros((pairings, size))
+        self.initial[np.arange(pairings), tables.initial(rows1) * n + tables.initial(rows2)] = 1.0
+
+    def visits(self, turns: int) -> np.ndarray:
+        """Expected number of visits to every joint state over a game of the given turns"""
+        # Sum of the first k powers and the k-th power, for k = 1, 2, 4, ... by doubling
+        total = np.zeros_like(self.initial)
+        power = self.transitions
+        partial_sum = np.broadcast_to(np.eye(self.transitions.shape[1]), self.transitions.shape).copy()
+        distribution = self.initial
+        remaining = turns
+        while remaining:
+            if remaining & 1:
+                # Add the next block of turns, starting from the current distribution
+                total += np.einsum('ps,pst->pt', distribution, partial_sum)
+                distribution = np.einsum('ps,pst->pt', distribution, power)
+            remaining >>= 1
+            if remaining:
+                partial_sum = partial_sum + partial_sum @ power
+                power = _square(power)
+        return total
+
+    def discounted_visits(self, continuation_probability: float) -> np.ndarray:
+        """Expected number of visits to every joint state when a game goes on after each turn with the given chance"""
+        size = self.transitions.shape[1]
+        system = np.eye(size) - continuation_probability * self.transitions
+        # x (I - δT) = π₀, solved transposed
+        return np.linalg.solve(np.swapaxes(system, 1, 2), self.initial[..., None])[..., 0]
+
+    def stationary(self) -> np.ndarray:
+        """
+        The long-run share of turns spent in every joint state, starting from the initial
+        state. Averaging over windows of doubling length also covers chains that are
+        periodic or have several closed classes.
+        """
+        size = self.transitions.shape[1]
+        identity = np.eye(size)
+        power = self.transitions
+        average = np.broadcast_to(identity, self.transitions.shape).copy()
+        for _ in range(LONG_RUN_DOUBLINGS):
+            average = _renormalize(average @ (identity + power) / 2)
+            power = _square(power)
+        return np.einsum('ps,pst->pt', self.initial, average)
+
+    def expected(self, visits: np.ndarray):
+        """
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Expected payoffs and cooperations of both sides,
+            of shape (pairings, 2), for the given expected visits
+        """
+        return np.einsum('ps,psk->pk', visits, self.rewards), np.einsum('ps,psk->pk', visits, self.cooperations)
+
+
+def _renormalize(stochastic: np.ndarray) -> np.ndarray:
+    """Rescales rows to sum to 1, as rounding errors in the row sums grow with every squaring"""
+    return stochastic / stochastic.sum(axis=-1, keepdims=True)
+
+
+def _square(stochastic: np.ndarray) -> np.ndarray:
+    return _renormalize(stochastic @ stochastic)
+
+
+def supports_pairing(bot1, bot2) -> bool:
+    """Whether both bots have an FSM form, so their pairing is a Markov chain"""
+    return get_fsm_spec(bot1) is not None and get_fsm_spec(bot2) is not None
+
+
+def expected_round_robin(bots: list, rounds: int = ROUNDS, iterations: int = ITERATIONS,
+                         continuation_probability: Optional[float] = CONTINUATION_PROBABILITY,
+                         error_rate: float = ERROR_RATE, misperception_rate: float = MISPERCEPTION_RATE) -> Dict:
+    """
+    The exact expected stats of every pairing of FSM bots in a round robin between the
+    given bots, all solved as one batch. Pairings are indexed as in simulate_round_robin;
+    pairings involving learners are left out.
+
+    Returns: Dict: Stats dicts as play_pairing returns them, with expected values, by pairing index
+    """
+    pairs = [(index, i, j) for index, (i, j) in
+             enumerate((i, j) for i in range(len(bots)) for j in range(i + 1, len(bots)))]
+    pairs = [(index, i, j) for index, i, j in pairs if supports_pairing(bots[i], bots[j])]
+    if not pairs:
+        return {}
+
+    # Table rows of the FSM bots
+    rows = {}
+    for _, i, j in pairs:
+        rows.setdefault(i, len(rows))
+        rows.setdefault(j, len(rows))
+    tables = FSMTables([get_fsm_spec(bots[bot]) for bot in rows])
+    chains = JointChains(tables, [rows[i] for _, i, _ in pairs], [rows[j] for _, _, j in pairs],
+                         error_rate, misperception_rate)
+    if continuation_probability is None:
+        visits = chains.visits(iterations)
+        turns = iterations
+    else:
+        visits = chains.discounted_visits(continuation_probability)
+        turns = 1 / (1 - continuation_probability)
+    payoffs, cooperations = chains.expected(visits)
+
+    expected = {}
+    for row, (index, i, j) in enumerate(pairs):
+        expected[index] = {}
+        for side, bot in enumerate((bots[i], bots[j])):
+            expected[index][get_bot_name(bot)] = {
+                TOTAL_PAYOFF: rounds * payoffs[row, side],
+                MATCHES_PLAYED: rounds * turns,
+                COOPERATE_COUNT: rounds * cooperations[row, side],
+                DEFECT_COUNT: rounds * (turns - cooperations[row, side]),
+            }
+    return expected
+
+
+def cross_check(tournament_stats: List[Dict], expected: Dict, num_tournaments: int = 1) -> List[Dict]:
+    """
+    Compares the simulated stats of simulate_round_robin with expected_round_robin for the
+    same bots, pairing by pairing over all tournaments.
+
+    Returns: List[Dict]: Per pairing and bot, the simulated and exact average payoff per
+    turn and cooperation rate
+    """
+    num_pairings = len(tournament_stats) // num_tournaments
+    rows = []
+    for index, pairing in sorted(expected.items()):
+        simulated = tournament_stats[index::num_pairings]
+        for name, exact in pairing.items():
+            totals = {key: sum(stats[name][key] for stats in simulated) for key in exact}
+            rows.append({
+                'pairing': index,
+                'bot_name': name,
+                'simulated_payoff': totals[TOTAL_PAYOFF] / totals[MATCHES_PLAYED],
+                'exact_payoff': exact[TOTAL_PAYOFF] / exact[MATCHES_PLAYED],
+                'simulated_cooperation': totals[COOPERATE_COUNT] / totals[MATCHES_PLAYED],
+                'exact_cooperation': exact[COOPERATE_COUNT] / exact[MATCHES_PLAYED],
+            })
+    return rows
@@ -0,0 +1,54 @@
+"""
+Monte Carlo sweeps over noise levels for pairings of FSM strategies.
+
+Each noise level plays all rounds of all replicates as one lock-step batch in the FSM
+engine. Levels get independent random streams derived from the seed, so they can be
+spread over worker processes without changing the results.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+from model.bots.FSMSpec import FSMSpec
+from model.constants import ROUNDS, ITERATIONS
+from model.engine.fsm_engine import FSMTables, play_fsm_games
+
+
+def noise_sweep(fsm1: FSMSpec, fsm2: FSMSpec, levels: List[Tuple[float, float]], replicates: int = 10,
+                rounds: int = ROUNDS, iterations: int = ITERATIONS, seed=None, workers: int = 1) -> dict:
+    """
+    Plays replicates of the pairing at every (error_rate, misperception_rate) level.
+
+    Returns:
+        dict: 'levels' as an array of shape (levels, 2), and 'average_payoffs' and
+        'cooperation_rates' per turn of shape (levels, replicates, 2) for (fsm1, fsm2)
+    """
+    seeds = np.random.SeedSequence(seed).spawn(len(levels))
+    tasks = [(fsm1, fsm2, error_rate, misperception_rate, replicates, rounds, iterations, level_seed)
+             for (error_rate, misperception_rate), level_seed in zip(levels, seeds)]
+
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_play_level, tasks))
+    else:
+        results = [_play_level(task) for task in tasks]
+
+    return {
+        'levels': np.array(levels, dtype=np.float64).reshape(len(levels), 2),
+        'average_payoffs': np.array([payoffs for payoffs, _ in results]),
+        'cooperation_rates': np.array([cooperations for _, cooperations in results]),
+    }
+
+
+def _play_level(task):
+    fsm1, fsm2, error_rate, misperception_rate, replicates, rounds, iterations, level_seed = task
+    rng = np.random.default_rng(level_seed)
+    games = replicates * rounds
+    payoffs, cooperations = play_fsm_games(FSMTables([fsm1, fsm2]), np.zeros(games, dtype=np.int64),
+                                           np.ones(games, dtype=np.int64), iterations, rng,
+                                           error_rate, misperception_rate)
+    # Per-turn averages of each replicate
+    turns = rounds * iterations
+    return (payoffs.reshape(replicates, rounds, 2).sum(axis=1) / turns,
+            cooperations.reshape(replicates, rounds, 2).sum(axis=1) / turns)
@@ -0,0 +1,291 @@
+"""
+Whole-game kernel for a QLearningAgent playing a strategy bot with an FSM form.
+
+The turn loop has a sequential dependency (choose, get reward, Bellman update), so
+instead of vectorizing it the loop is written over plain integers and compiled with
+Numba when it is installed. Without Numba the very same function runs as pure Python
+on nested lists. Both backends consume the same pre-drawn random numbers and do the
+same float64 operations, so for a given seed they produce identical results.
+
+Encoding: actions and states are 0 (COOPERATE) and 1 (DEFECT); the Q-table array has a
+third row for the `None` state of QTable. The opponent is given by its FSMSpec tables.
+Each turn uses three draws: the exploration check, the random action while exploring
+(or the softmax draw under Boltzmann selection), and the opponent's own draw. The
+agent's exploration parameter is multiplied by its schedule's decay factor for each
+round, read from a precomputed array. Noise comes as pre-generated 0/1 masks that flip the
+executed moves and the moves as the other side perceives them.
+
+Games may differ in length, so the per-turn inputs are flat arrays over all turns of
+all rounds, and round r covers the rows offsets[r] to offsets[r + 1].
+"""
+import numpy as np
+
+from model.ExplorationSchedule import (POLICY_EPSILON_GREEDY, POLICY_BOLTZMANN, POLICY_UCB,
+                                       boltzmann_defect_probability, ucb_value)
+from model.QTable import QTable
+from model.bots.BaseBot import get_bot_name
+from model.bots.FSMSpec import FSMSpec
+from model.constants import *
+from model.engine.common import (C, D, NONE_STATE, ACTION_NAMES, STATE_INDEX, payoff_array, get_fsm_spec,
+                                 pairing_stats, noise_masks)
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+DRAWS_PER_TURN = 3
+
+# The selection helpers are called from inside the kernel, so they are compiled along with it
+if njit is not None:
+    boltzmann_defect_probability = njit(cache=True)(boltzmann_defect_probability)
+    ucb_value = njit(cache=True)(ucb_value)
+
+
+def _play_games(q, payoff, transitions, defect_probabilities, initial_state, offsets,
+                exploration_rate, decay_factors, policy, counts, learning_rate, discount_factor,
+                draws, errors, misperceptions, payoffs, cooperations, moves):
+    for round in range(len(offsets) - 1):
+        agent_last = -1
+        opponent_last = -1
+        opponent_state = initial_state
+        for row in range(offsets[round], offsets[round + 1]):
+            u = draws[row]
+            error = errors[row]
+            misperception = misperceptions[row]
+
+            # Agent: epsilon-greedy on the opponent's last action. As in play_game, the first
+            # turn chooses from the None row but learns as if the opponent had cooperated.
+            choice_state = opponent_last if opponent_last >= 0 else NONE_STATE
+            state = opponent_last if opponent_last >= 0 else C
+            if policy == POLICY_BOLTZMANN:
+                defect_probability = boltzmann_defect_probability(q[choice_state][C], q[choice_state][D],
+                                                                  exploration_rate)
+                agent_action = D if u[1] < defect_probability else C
+            elif policy == POLICY_UCB:
+                state_visits = counts[choice_state][C] + counts[choice_state][D]
+                cooperate_value = ucb_value(q[choice_state][C], exploration_rate, state_visits,
+                                            counts[choice_state][C])
+                defect_value = ucb_value(q[choice_state][D], exploration_rate, state_visits,
+                                         counts[choice_state][D])
+                agent_action = D if defect_value > cooperate_value else C
+                counts[choice_state][agent_action] += 1
+            elif u[0] < exploration_rate:
+                agent_action = C if u[1] < 0.5 else D
+            else:
+                agent_action = C if q[choice_state][C] >= q[choice_state][D] else D
+            agent_action = agent_action ^ error[0]
+
+            # Opponent machine steps on the agent's last action
+            if agent_last >= 0:
+                opponent_state = transitions[opponent_state][agent_last]
+            opponent_action = (D if u[2] < defect_probabilities[opponent_state] else C) ^ error[1]
+
+            agent_reward = payoff[agent_action][opponent_action][0]
+            payoffs[round][0] += agent_reward
+            payoffs[round][1] += payoff[agent_action][opponent_action][1]
+            if agent_action == C:
+                cooperations[round][0] += 1
+            if opponent_action == C:
+                cooperations[round][1] += 1
+            moves[row] = agent_action * 2 + opponent_action
+
+            # Each side continues from the other's move as it perceived it
+            agent_seen = agent_action ^ misperception[0]
+            opponent_seen = opponent_action ^ misperception[1]
+
+            # Bellman update towards the opponent's perceived action as the next state
+            next_row = q[opponent_seen]
+            max_future = next_row[C] if next_row[C] >= next_row[D] else next_row[D]
+            current = q[state][agent_action]
+            q[state][agent_action] = current + learning_rate * (
+                agent_reward + (discount_factor * max_future) - current
+            )
+
+            agent_last = agent_seen
+            opponent_last = opponent_seen
+
+        exploration_rate = exploration_rate * decay_factors[round]
+    return exploration_rate
+
+
+_compiled_play_games = njit(cache=True)(_play_games) if njit is not None else None
+
+
+def is_compiled() -> bool:
+    """Whether the kernel runs through Numba rather than the pure Python fallback"""
+    return _compiled_play_games is not None
+
+
+def qtable_to_array(qtable: QTable) -> np.ndarray:
+    q = np.zeros((3, 2), dtype=np.float64)
+    for state, row in STATE_INDEX.items():
+        for action in ACTION_NAMES:
+            q[row, STATE_INDEX[action]] = qtable.get_q_value(state, action)
+    return q
+
+
+def array_to_qtable(q: np.ndarray, qtable: QTable) -> None:
+    for state, row in STATE_INDEX.items():
+        for action in ACTION_NAMES:
+            qtable.set_q_value(state, action, float(q[row, STATE_INDEX[action]]))
+
+
+def visit_counts_to_array(visit_counts) -> np.ndarray:
+    counts = np.zeros((3, 2), dtype=np.int64)
+    for state, row in STATE_INDEX.items():
+        for action in ACTION_NAMES:
+            counts[row, STATE_INDEX[action]] = visit_counts[state][action]
+    return counts
+
+
+def array_to_visit_counts(counts: np.ndarray, visit_counts) -> None:
+    for state, row in STATE_INDEX.items():
+        for action in ACTION_NAMES:
+            visit_counts[state][action] = int(counts[row, STATE_INDEX[action]])
+
+
+def read_visit_counts(agent, opponent_name: str) -> np.ndarray:
+    """
+    The agent's visit counts against an opponent as a (3, 2) array. Only UCB keeps them,
+    so other policies get zeros without the agent storing any counts.
+    """
+    if agent.get_schedule().policy != POLICY_UCB:
+        return np.zeros((3, 2), dtype=np.int64)
+    return visit_counts_to_array(agent.get_visit_counts(opponent_name))
+
+
+def write_visit_counts(counts: np.ndarray, agent, opponent_name: str) -> None:
+    if agent.get_schedule().policy == POLICY_UCB:
+        array_to_visit_counts(counts, agent.get_visit_counts(opponent_name))
+
+
+def draw_random_numbers(rng: np.random.Generator, turns: int) -> np.ndarray:
+    return rng.random((turns, DRAWS_PER_TURN))
+
+
+def play_qlearning_games(q: np.ndarray, opponent: FSMSpec, lengths: np.ndarray,
+                         exploration_rate: float, decay_factors, learning_rate: float,
+                         discount_factor: float, draws: np.ndarray, errors: np.ndarray = None,
+                         misperceptions: np.ndarray = None, compiled: bool = True, moves: np.ndarray = None,
+                         policy: int = POLICY_EPSILON_GREEDY, counts: np.ndarray = None):
+    """
+    Plays all rounds of a Q-agent against a strategy bot, decaying the exploration
+    parameter after every round.
+
+    Args:
+        q (np.ndarray): The (3, 2) Q-table array, updated in-place
+        opponent (FSMSpec): The opponent's strategy
+        lengths (np.ndarray): The number of turns of each round
+        exploration_rate (float): The exploration parameter in the first round
+        decay_factors: The factor the parameter is multiplied by after each round, one
+            shared by all rounds or one per round
+        draws (np.ndarray): Uniform random numbers of shape (total turns, DRAWS_PER_TURN)
+        errors (np.ndarray): 0/1 masks of shape (total turns, 2) flipping the executed
+            moves of (agent, opponent), see noise_masks. Defaults to no noise
+        misperceptions (np.ndarray): Same for the moves as the other side perceives them
+        compiled (bool): Use the Numba kernel when it is available
+        moves (np.ndarray): If given, filled with the 2-bit joint action of (agent, opponent)
+            of every turn, of shape (total turns,)
+        policy (int): One of the POLICY_* codes of ExplorationSchedule
+        counts (np.ndarray): The (3, 2) visit counts UCB uses, updated in-place
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, float]: Per-round payoffs and cooperation counts of
+        shape (rounds, 2) for (agent, opponent), and the decayed exploration parameter
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    rounds = len(lengths)
+    offsets = np.zeros(rounds + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if errors is None:
+        errors = np.zeros((offsets[-1], 2), dtype=np.uint8)
+    if misperceptions is None:
+        misperceptions = np.zeros((offsets[-1], 2), dtype=np.uint8)
+    if moves is None:
+        moves = np.zeros(offsets[-1], dtype=np.uint8)
+    if counts is None:
+        counts = np.zeros((3, 2), dtype=np.int64)
+    decay_factors = np.broadcast_to(np.asarray(decay_factors, dtype=np.float64), (rounds,))
+    payoff = payoff_array()
+    transitions = np.array(opponent.transitions, dtype=np.int64)
+    defect_probabilities = np.array(opponent.defect_probabilities, dtype=np.float64)
+    if compiled and is_compiled():
+        payoffs = np.zeros((rounds, 2), dtype=np.int64)
+        cooperations = np.zeros((rounds, 2), dtype=np.int64)
+        exploration_rate = _compiled_play_games(q, payoff, transitions, defect_probabilities, opponent.initial_state,
+                                                offsets, exploration_rate, np.ascontiguousarray(decay_factors),
+                                                policy, counts, learning_rate, discount_factor, draws, errors,
+                                                misperceptions, payoffs, cooperations, moves)
+        return payoffs, cooperations, exploration_rate
+
+    # Pure Python on nested lists, which is much faster than indexing arrays element by element
+    q_list = q.tolist()
+    payoffs = [[0, 0] for _ in range(rounds)]
+    cooperations = [[0, 0] for _ in range(rounds)]
+    moves_list = [0] * int(offsets[-1])
+    counts_list = counts.tolist()
+    exploration_rate = _play_games(q_list, payoff.tolist(), opponent.transitions, opponent.defect_probabilities,
+                                   opponent.initial_state, offsets.tolist(), exploration_rate, decay_factors.tolist(),
+                                   policy, counts_list, learning_rate, discount_factor, draws.tolist(),
+                                   errors.tolist(), misperceptions.tolist(), payoffs, cooperations, moves_list)
+    q[:] = q_list
+    counts[:] = counts_list
+    moves[:] = moves_list
+    return np.array(payoffs, dtype=np.int64), np.array(cooperations, dtype=np.int64), exploration_rate
+
+
+def supports_pairing(bot1, bot2) -> bool:
+    """Whether the pairing is a QLearningAgent without experience replay against a bot with an FSM form"""
+    from model.QLearningAgent import QLearningAgent
+    for agent, opponent in ((bot1, bot2), (bot2, bot1)):
+        if isinstance(agent, QLearningAgent) and not agent.replay_capacity and get_fsm_spec(opponent) is not None:
+            return True
+    return False
+
+
+def play_pairing_compiled(bot1, bot2, lengths, rng: np.random.Generator, error_rate: float = 0.0,
+                          misperception_rate: float = 0.0, history=None) -> dict:
+    """
+    Kernel version of play_pairing: plays all rounds, with lengths holding the number of
+    turns of each round, updates the agent's Q-table and exploration state and returns the
+    same stats dict. No per-turn interactions are logged, but every game is recorded in
+    the HistoryBuffer history, if given.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    turns = int(lengths.sum())
+    from model.QLearningAgent import QLearningAgent
+    agent_first = isinstance(bot1, QLearningAgent) and get_fsm_spec(bot2) is not None
+    agent, opponent = (bot1, bot2) if agent_first else (bot2, bot1)
+    opponent_name = get_bot_name(opponent)
+
+    agent.initialize_q_table_for_opponent(opponent_name)
+    agent.initialize_exploration_rate(opponent_name)
+    qtable = agent.get_qtable_for_opponent(opponent_name)
+    q = qtable_to_array(qtable)
+    moves = np.zeros(turns, dtype=np.uint8)
+    schedule = agent.get_schedule()
+    first_round = agent.get_exploration_round(opponent_name)
+    counts = read_visit_counts(agent, opponent_name)
+
+    payoffs, cooperations, exploration_rate = play_qlearning_games(
+        q, get_fsm_spec(opponent), lengths, agent.get_exploration_rate(opponent_name),
+        schedule.decay_factors(first_round, len(lengths)), agent.get_learning_rate(), agent.get_discount_factor(),
+        draw_random_numbers(rng, turns),
+        noise_masks(rng, (turns, 2), error_rate),
+        noise_masks(rng, (turns, 2), misperception_rate),
+        moves=moves, policy=schedule.policy, counts=counts)
+
+    array_to_qtable(q, qtable)
+    write_visit_counts(counts, agent, opponent_name)
+    agent.set_exploration_rate(opponent_name, exploration_rate)
+    agent.exploration_rounds[opponent_name] = first_round + len(lengths)
+    if history is not None:
+        if not agent_first:
+            moves = ((moves & 1) << 1) | (moves >> 1)
+        for start, stop in zip(np.cumsum(lengths) - lengths, np.cumsum(lengths)):
+            history.record_game(moves[start:stop])
+
+    stats = pairing_stats([get_bot_name(agent), opponent_name], payoffs, cooperations, turns)
+    # Keep the bot order of play_game
+    return {get_bot_name(bot1): stats[get_bot_name(bot1)], get_bot_name(bot2): stats[get_bot_name(bot2)]}
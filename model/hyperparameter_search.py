@@ -0,0 +1,170 @@
+"""
+Successive-halving and Hyperband search over the hyperparameters of QLearningAgent.
+
+Every candidate is a QLearningAgent with its own learning rate, discount factor, initial
+exploration rate and decay rate. Successive halving trains all candidates for a small
+budget of rounds against the strategy bots, keeps the best 1/eta of them and trains the
+survivors on from the Q-tables and exploration state they reached, multiplying the
+budget by eta each rung until it reaches max_rounds. Hyperband runs several such
+brackets, from many candidates on a small budget to a few on the full one, so no single
+starting budget has to be guessed.
+
+Candidates are ranked by their average payoff per turn over the later 1 - 1/eta of the
+rounds they played, which leaves out the rounds dominated by early exploration. The
+payoff of every round is kept as the candidate's learning curve.
+"""
+import math
+import random
+from typing import Dict, List, Optional
+
+from model.ExplorationSchedule import ExponentialSchedule
+from model.QLearningAgent import QLearningAgent
+from model.constants import *
+from model.tournamentManager import BOT_TYPES, ENGINE_PYTHON, play_pairing, seed_pairing
+
+# Ranges candidates are drawn from. The learning rate is drawn log-uniformly, and the
+# discount factor and decay rate by the log of their distance to 1
+SEARCH_SPACE = {
+    'learning_rate': (0.01, 1.0),
+    'discount_factor': (0.5, 0.999),
+    'exploration_rate': (0.05, 1.0),
+    'decay_rate': (0.9, 0.9999),
+}
+
+SEARCH_RESULTS_FILE = "hyperparameter_search.json"
+
+
+def sample_candidates(count: int, rng: random.Random, space: Dict = SEARCH_SPACE) -> List[Dict]:
+    """Draws count configurations from the search space"""
+    def log_uniform(low, high):
+        return 10 ** rng.uniform(math.log10(low), math.log10(high))
+
+    candidates = []
+    for _ in range(count):
+        candidates.append({
+            'learning_rate': log_uniform(*space['learning_rate']),
+            'discount_factor': 1 - log_uniform(1 - space['discount_factor'][1], 1 - space['discount_factor'][0]),
+            'exploration_rate': rng.uniform(*space['exploration_rate']),
+            'decay_rate': 1 - log_uniform(1 - space['decay_rate'][1], 1 - space['decay_rate'][0]),
+        })
+    return candidates
+
+
+def create_candidate(config: Dict, name: str = "QLearningAgent") -> QLearningAgent:
+    return QLearningAgent(learning_rate=config['learning_rate'], discount_factor=config['discount_factor'],
+                          exploration_rate=config['exploration_rate'], name=name,
+                          schedule=ExponentialSchedule(config['exploration_rate'], config['decay_rate']))
+
+
+def score(curve: List[float], eta: int) -> float:
+    """The average payoff per turn over the later 1 - 1/eta of the rounds of a learning curve"""
+    later = curve[len(curve) // eta:]
+    return sum(later) / len(later)
+
+
+def successive_halving(candidates: List[Dict], min_rounds: int = SEARCH_MIN_ROUNDS, max_rounds: int = ROUNDS,
+                       eta: int = SEARCH_ETA, opponents: Optional[List[str]] = None, iterations: int = ITERATIONS,
+                       seed=None, workers: int = 1, verbose: bool = True, **options) -> Dict:
+    """
+    Trains the candidate configurations against the opponents for min_rounds, keeps the
+    best 1/eta of them, at least one, and trains the survivors on with eta times the
+    rounds in total each rung, until max_rounds have been played. Rungs spread the
+    candidates over workers processes. Other options are passed on to play_pairing.
+
+    Args:
+        candidates (List[Dict]): Configurations with the keys of SEARCH_SPACE
+        opponents (List[str]): Names of the bots to train against, see BOT_TYPES. Defaults
+            to all of them but the Q-learning agent
+
+    Returns:
+        Dict: 'best', the winning configuration with its 'score', 'rounds' and 'curve';
+        'candidates', every configuration with the same keys as far as it got; and
+        'rungs', the rounds played by the end of each rung and the candidates it kept
+    """
+    if eta < 2:
+        raise ValueError("eta must be at least 2")
+    if not 1 <= min_rounds <= max_rounds:
+        raise ValueError("Rounds must satisfy 1 <= min_rounds <= max_rounds")
+    if opponents is None:
+        opponents = [name for name, bot_type in BOT_TYPES.items() if bot_type is not QLearningAgent]
+
+    agents = [create_candidate(config, f"Candidate_{number}") for number, config in enumerate(candidates)]
+    curves = [[] for _ in candidates]
+    survivors = list(range(len(candidates)))
+    rungs = []
+    budget = min_rounds
+    while True:
+        tasks = [(agents[number], opponents, len(curves[number]), budget - len(curves[number]), iterations,
+                  seed, number, options) for number in survivors]
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_train_candidate, tasks))
+        else:
+            results = [_train_candidate(task) for task in tasks]
+        for number, (agent, curve) in zip(survivors, results):
+            agents[number] = agent
+            curves[number] += curve
+
+        ranked = sorted(survivors, key=lambda number: score(curves[number], eta), reverse=True)
+        done = budget >= max_rounds
+        survivors = ranked[:1] if done else ranked[:max(1, len(ranked) // eta)]
+        rungs.append({'rounds': budget, 'survivors': survivors})
+        if verbose:
+            print(f"Rung {len(rungs) - 1}: {len(ranked)} candidates after {budget} rounds, best score "
+                  f"{score(curves[ranked[0]], eta):.3f}, keeping {len(survivors)}")
+        if done:
+            break
+        budget = min(budget * eta, max_rounds)
+
+    results = [{**config, 'score': score(curve, eta), 'rounds': len(curve), 'curve': curve}
+               for config, curve in zip(candidates, curves)]
+    return {'best': results[survivors[0]], 'candidates': results, 'rungs': rungs}
+
+
+def hyperband(max_rounds: int = ROUNDS, min_rounds: int = SEARCH_MIN_ROUNDS, eta: int = SEARCH_ETA,
+              seed=None, space: Dict = SEARCH_SPACE, verbose: bool = True, **options) -> Dict:
+    """
+    Runs the brackets of Hyperband: bracket s starts (s_max + 1) / (s + 1) * eta^s fresh
+    candidates on max_rounds / eta^s rounds, s going down from the most aggressive
+    bracket, whose first budget is about min_rounds, to plain training at max_rounds.
+    Other options are passed on to successive_halving.
+
+    Returns: Dict: The best configuration over all brackets under 'best', and the result
+    of every bracket's successive_halving under 'brackets'
+    """
+    if not 1 <= min_rounds <= max_rounds:
+        raise ValueError("Rounds must satisfy 1 <= min_rounds <= max_rounds")
+    s_max = int(math.log(max_rounds / min_rounds, eta) + 1e-9)
+    rng = random.Random(seed)
+    brackets = []
+    for s in range(s_max, -1, -1):
+        count = math.ceil((s_max + 1) / (s + 1) * eta ** s)
+        first_budget = max(1, round(max_rounds / eta ** s))
+        if verbose:
+            print(f"Bracket {s}: {count} candidates from {first_budget} rounds")
+        brackets.append(successive_halving(sample_candidates(count, rng, space), first_budget, max_rounds, eta,
+                                           seed=None if seed is None else f"{seed}:{s}", verbose=verbose,
+                                           **options))
+    best = max((bracket['best'] for bracket in brackets), key=lambda result: result['score'])
+    return {'best': best, 'brackets': brackets}
+
+
+def _train_candidate(task):
+    """
+    Plays a candidate's next rounds against every opponent, one round at a time, and
+    returns the agent with its average payoff per turn in each of those rounds.
+    """
+    agent, opponents, first_round, rounds, iterations, seed, number, options = task
+    payoffs = [0] * rounds
+    turns = [0] * rounds
+    for index, opponent_name in enumerate(opponents):
+        opponent = BOT_TYPES[opponent_name]()
+        # The same random numbers for a candidate's rounds whatever the number of workers
+        seed_pairing(seed, number, f"{first_round}:{index}")
+        for round in range(rounds):
+            stats = play_pairing(agent, opponent, 1, iterations, None, first_round + round,
+                                 **{'engine': ENGINE_PYTHON, **options})[agent.get_name()]
+            payoffs[round] += stats[TOTAL_PAYOFF]
+            turns[round] += stats[MATCHES_PLAYED]
+    return agent, [payoff / turn for payoff, turn in zip(payoffs, turns)]
@@ -0,0 +1,246 @@
+"""
+Append-only, memory-mapped store of the joint actions of every turn of every game.
+
+Each turn is kept as a 2-bit joint action, (action1 << 1) | action2 with 0 for
+COOPERATE and 1 for DEFECT, packed four turns to a byte. Every game starts on a byte
+boundary, and an index holds the tournament, pairing, round, byte offset and length of
+each game. The names of the bots of every pairing are kept next to it.
+
+Files in the store directory:
+    actions.bin    packed joint actions, appended game by game
+    index.bin      one INDEX_DTYPE record per game
+    pairings.jsonl the bot names of every (tournament, pairing), one JSON record per line
+
+Reading maps both binary files with np.memmap, so analyses only unpack the games they
+select, chunk by chunk, and never load the whole history.
+"""
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from model.constants import COOPERATE, DEFECT
+
+ACTIONS_FILE = "actions.bin"
+INDEX_FILE = "index.bin"
+PAIRINGS_FILE = "pairings.jsonl"
+
+INDEX_DTYPE = np.dtype([
+    ("tournament", "<i4"),
+    ("pairing", "<i4"),
+    ("round", "<i4"),
+    ("offset", "<i8"),
+    ("length", "<i4"),
+])
+
+TURNS_PER_BYTE = 4
+# Bit shifts of the four turns within a byte, first turn in the high bits
+SHIFTS = np.array([6, 4, 2, 0], dtype=np.uint8)
+# Bytes of packed actions unpacked at once by the analyses
+CHUNK_BYTES = 1 << 24
+
+
+def pack_actions(codes) -> bytes:
+    """Packs 2-bit joint action codes four to a byte, padding the last byte with zeros"""
+    codes = np.asarray(codes, dtype=np.uint8)
+    padded = np.zeros(-(-len(codes) // TURNS_PER_BYTE) * TURNS_PER_BYTE, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    return np.bitwise_or.reduce(padded.reshape(-1, TURNS_PER_BYTE) << SHIFTS, axis=1).astype(np.uint8).tobytes()
+
+
+def unpack_actions(packed: np.ndarray, length: Optional[int] = None) -> np.ndarray:
+    """Unpacks bytes into joint action codes, optionally dropping the padding"""
+    codes = ((np.asarray(packed, dtype=np.uint8)[:, None] >> SHIFTS) & 3).ravel()
+    return codes if length is None else codes[:length]
+
+
+class HistoryBuffer:
+    """
+    The games of one pairing, kept in memory until they are written to a HistoryStore.
+    Games are recorded in round order. A buffer is small and picklable, so it can be
+    filled in a worker process and written by the main process.
+    """
+
+    def __init__(self, tournament: int, pairing: int, names: Tuple[str, str]):
+        self.tournament = tournament
+        self.pairing = pairing
+        self.names = names
+        self.games = []
+
+    def record_game(self, codes) -> None:
+        """Adds the joint action codes of the next round's game"""
+        self.games.append(np.asarray(codes, dtype=np.uint8))
+
+
+class HistoryStore:
+    """
+    Attributes:
+        directory (str): The directory holding the store's files
+    """
+
+    def __init__(self, directory: str, mode: str = "r"):
+        """
+        Opens a store. Mode "w" starts an empty store, "a" appends to an existing one and
+        "r" only reads.
+        """
+        if mode not in ("r", "w", "a"):
+            raise ValueError("Mode must be one of 'r', 'w' or 'a'")
+        self.directory = directory
+        self.mode = mode
+        self.pairings: Dict[Tuple[int, int], List[str]] = {}
+        if mode == "w":
+            os.makedirs(directory, exist_ok=True)
+            for filename in (ACTIONS_FILE, INDEX_FILE, PAIRINGS_FILE):
+                open(self._path(filename), "wb").close()
+        else:
+            with open(self._path(PAIRINGS_FILE)) as file:
+                for line in file:
+                    record = json.loads(line)
+                    self.pairings[(record["tournament"], record["pairing"])] = record["names"]
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    # WRITING
+    def new_buffer(self, tournament: int, pairing: int, names: Tuple[str, str]) -> HistoryBuffer:
+        return HistoryBuffer(tournament, pairing, names)
+
+    def write(self, buffer: HistoryBuffer) -> None:
+        """Appends the games of a buffer, in round order"""
+        if self.mode == "r":
+            raise ValueError("History store was opened read-only")
+        offset = os.path.getsize(self._path(ACTIONS_FILE))
+        index = np.zeros(len(buffer.games), dtype=INDEX_DTYPE)
+        with open(self._path(ACTIONS_FILE), "ab") as file:
+            for round, codes in enumerate(buffer.games):
+                index[round] = (buffer.tournament, buffer.pairing, round, offset, len(codes))
+                packed = pack_actions(codes)
+                file.write(packed)
+                offset += len(packed)
+        with open(self._path(INDEX_FILE), "ab") as file:
+            file.write(index.tobytes())
+        self.pairings[(buffer.tournament, buffer.pairing)] = list(buffer.names)
+        # One line per pairing, so that writing costs the same however large the store grows
+        with open(self._path(PAIRINGS_FILE), "a") as file:
+            file.write(json.dumps({"tournament": buffer.tournament, "pairing": buffer.pairing,
+                                   "names": list(buffer.names)}) + "\n")
+
+    # READING
+    def index(self) -> np.ndarray:
+        """Memory-mapped index records of all games"""
+        if os.path.getsize(self._path(INDEX_FILE)) == 0:
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        return np.memmap(self._path(INDEX_FILE), dtype=INDEX_DTYPE, mode="r")
+
+    def actions(self) -> np.ndarray:
+        """Memory-mapped packed actions of all games"""
+        if os.path.getsize(self._path(ACTIONS_FILE)) == 0:
+            return np.zeros(0, dtype=np.uint8)
+        return np.memmap(self._path(ACTIONS_FILE), dtype=np.uint8, mode="r")
+
+    def get_names(self, tournament: int, pairing: int) -> List[str]:
+        return self.pairings[(tournament, pairing)]
+
+    def select(self, tournament: Optional[int] = None, pairing: Optional[int] = None) -> np.ndarray:
+        """Positions in the index of the games of a tournament and/or pairing, all games by default"""
+        index = self.index()
+        selected = np.ones(len(index), dtype=bool)
+        if tournament is not None:
+            selected &= index["tournament"] == tournament
+        if pairing is not None:
+            selected &= index["pairing"] == pairing
+        return np.flatnonzero(selected)
+
+    def game(self, position: int) -> np.ndarray:
+        """
+        Returns: np.ndarray: The actions of one game of shape (turns, 2), 0 for COOPERATE
+        """
+        record = self.index()[position]
+        num_bytes = -(-int(record["length"]) // TURNS_PER_BYTE)
+        codes = unpack_actions(self.actions()[record["offset"]:record["offset"] + num_bytes], int(record["length"]))
+        return np.stack([codes >> 1, codes & 1], axis=1)
+
+    def _chunks(self, positions: np.ndarray):
+        """
+        Yields the games at the given positions a chunk at a time, as the flat joint action
+        codes of all their turns and each code's turn number within its game.
+        """
+        records = self.index()[positions]
+        actions = self.actions()
+        num_bytes = -(-records["length"].astype(np.int64) // TURNS_PER_BYTE)
+        ends = np.cumsum(num_bytes)
+        start = 0
+        while start < len(positions):
+            # At least one game per chunk, however long
+            done = ends[start - 1] if start > 0 else 0
+            stop = max(start + 1, int(np.searchsorted(ends, done + CHUNK_BYTES, side="right")))
+            chunk = records[start:stop]
+            chunk_bytes = num_bytes[start:stop]
+
+            if positions[stop - 1] - positions[start] == stop - 1 - start:
+                # Consecutive games are stored back to back, so the chunk is a view of the map
+                packed = actions[chunk["offset"][0]:chunk["offset"][0] + chunk_bytes.sum()]
+            else:
+                # Byte positions of every game, one run per game
+                starts = np.repeat(chunk["offset"] - np.cumsum(chunk_bytes) + chunk_bytes, chunk_bytes)
+                packed = actions[starts + np.arange(chunk_bytes.sum())]
+            codes = unpack_actions(packed)
+
+            # Turn numbers within each game, dropping the padding of the last byte
+            padded_lengths = chunk_bytes * TURNS_PER_BYTE
+            turns = np.arange(padded_lengths.sum()) - np.repeat(np.cumsum(padded_lengths) - padded_lengths,
+                                                                padded_lengths)
+            keep = turns < np.repeat(chunk["length"], padded_lengths)
+            yield codes[keep], turns[keep]
+            start = stop
+
+    # ANALYSES
+    def cooperation_over_time(self, tournament: Optional[int] = None,
+                              pairing: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cooperation rate of both sides at every turn number, over all selected games.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Rates of shape (turns, 2), and the number of
+            games that reached each turn
+        """
+        cooperations = np.zeros((0, 2))
+        games = np.zeros(0)
+        for codes, turns in self._chunks(self.select(tournament, pairing)):
+            length = int(turns.max()) + 1
+            cooperations = _pad(cooperations, length)
+            games = _pad(games, length)
+            cooperations[:length, 0] += np.bincount(turns, weights=(codes >> 1) == 0, minlength=length)
+            cooperations[:length, 1] += np.bincount(turns, weights=(codes & 1) == 0, minlength=length)
+            games[:length] += np.bincount(turns, minlength=length)
+        with np.errstate(invalid="ignore"):
+            return cooperations / games[:, None], games.astype(np.int64)
+
+    def conditional_response(self, tournament: Optional[int] = None,
+                             pairing: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        How each side responds to the other's previous move, over all selected games.
+
+        Returns:
+            Dict[str, np.ndarray]: For COOPERATE and DEFECT as the opponent's previous
+            move, the cooperation rate of both sides, of shape (2,)
+        """
+        counts = np.zeros((2, 2, 2))  # side, opponent's previous action, own action
+        for codes, turns in self._chunks(self.select(tournament, pairing)):
+            follows = np.flatnonzero(turns[1:] > 0) + 1
+            previous = codes[follows - 1]
+            current = codes[follows]
+            for side, (own, other) in enumerate(((current >> 1, previous & 1), (current & 1, previous >> 1))):
+                counts[side] += np.bincount(other * 2 + own, minlength=4).reshape(2, 2)
+        with np.errstate(invalid="ignore"):
+            rates = counts[..., 0] / counts.sum(axis=-1)
+        return {COOPERATE: rates[:, 0], DEFECT: rates[:, 1]}
+
+
+def _pad(array: np.ndarray, length: int) -> np.ndarray:
+    if len(array) >= length:
+        return array
+    padded = np.zeros((length,) + array.shape[1:])
+    padded[:len(array)] = array
+    return padded
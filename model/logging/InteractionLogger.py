@@ -1,11 +1,67 @@
-from typing import Dict, Optional
+import csv
+from array import array
 from datetime import datetime
+from functools import lru_cache
+from time import time
+from typing import Dict, Iterator, Optional
+
+from model.constants import PAYOFF_MATRIX
+from model.logging.SymbolTable import SymbolTable, ACTIONS, STATES
+
+# Log policies: log every turn, log every n-th game, or log nothing
+LOG_FULL = "full"
+LOG_SAMPLED = "sampled"
+LOG_NONE = "none"
+LOG_POLICIES = (LOG_FULL, LOG_SAMPLED, LOG_NONE)
+
+# Columns of the log, in the order they are exported, with the array type each is kept in.
+# Bots, states and actions are kept as ids and the timestamp in whole seconds.
+REWARD_TYPE = 'q' if all(isinstance(reward, int) for rewards in PAYOFF_MATRIX.values() for reward in rewards) else 'd'
+COLUMNS = {
+    'timestamp': 'q',
+    'tournament_num': 'l',
+    'round_num': 'q',
+    'turn_num': 'l',
+    'agent_name': 'l',
+    'opponent_name': 'l',
+    'state': 'b',
+    'action_taken': 'b',
+    'reward': REWARD_TYPE,
+    'q_value_cooperate': 'd',
+    'q_value_defect': 'd',
+    'exploration_rate': 'd',
+}
 
 class InteractionLogger:
-    def __init__(self):
-        self.interactions = []
-        
-    def log_interaction(self, 
+    """
+    Keeps the logged turns column by column in typed arrays, which takes a fraction of the
+    memory of one dict per turn. Names are only looked up again when the log is read or
+    exported.
+
+    Attributes:
+        bots (SymbolTable): The ids of the bot names in the log, shared with the loggers
+            created for single pairings
+    """
+
+    def __init__(self, policy: str = LOG_FULL, every: int = 1, bots: Optional[SymbolTable] = None):
+        if policy not in LOG_POLICIES:
+            raise ValueError(f"Log policy must be one of {LOG_POLICIES}")
+        if every < 1:
+            raise ValueError("Logging interval must be at least 1")
+        self.policy = policy
+        self.every = every
+        self.bots = bots if bots is not None else SymbolTable()
+        self.columns = {column: array(typecode) for column, typecode in COLUMNS.items()}
+
+    def should_log(self, round_num: int) -> bool:
+        """Whether the turns of the given game should be logged under the current policy"""
+        if self.policy == LOG_FULL:
+            return True
+        if self.policy == LOG_SAMPLED:
+            return round_num % self.every == 0
+        return False
+
+    def log_interaction(self,
                        tournament_num: int,
                        round_num: int,
                        turn_num: int,
@@ -16,28 +72,67 @@ class InteractionLogger:
                        reward: float,
                        q_values: Dict[str, float],
                        exploration_rate: float):
-        
-        self.interactions.append({
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'tournament_num': tournament_num,
-            'round_num': round_num,
-            'turn_num': turn_num,
-            'agent_name': agent_name,
-            'opponent_name': opponent_name,
-            'state': state,
-            'action_taken': action_taken,
-            'reward': reward,
-            'q_value_cooperate': q_values['COOPERATE'],
-            'q_value_defect': q_values['DEFECT'],
-            'exploration_rate': exploration_rate
-        })
-    
+        columns = self.columns
+        columns['timestamp'].append(int(time()))
+        columns['tournament_num'].append(tournament_num)
+        columns['round_num'].append(round_num)
+        columns['turn_num'].append(turn_num)
+        columns['agent_name'].append(self.bots.intern(agent_name))
+        columns['opponent_name'].append(self.bots.intern(opponent_name))
+        columns['state'].append(STATES.ids[state])
+        columns['action_taken'].append(ACTIONS.ids[action_taken])
+        columns['reward'].append(reward)
+        columns['q_value_cooperate'].append(q_values['COOPERATE'])
+        columns['q_value_defect'].append(q_values['DEFECT'])
+        columns['exploration_rate'].append(exploration_rate)
+
+    def __len__(self) -> int:
+        return len(self.columns['timestamp'])
+
+    def extend(self, other: "InteractionLogger") -> None:
+        """Appends the turns logged by another logger, such as one that ran in a worker process"""
+        ids = self.bots.remap(other.bots) if other.bots is not self.bots else None
+        for column, values in other.columns.items():
+            if column in ('agent_name', 'opponent_name') and ids is not None:
+                values = array(values.typecode, [ids[symbol] for symbol in values])
+            self.columns[column].extend(values)
+
+    def records(self) -> Iterator[Dict]:
+        """Yields the logged turns one dict at a time, with the names and timestamps filled in"""
+        columns = self.columns
+        bots = self.bots.names
+        for row in zip(*columns.values()):
+            record = dict(zip(columns, row))
+            record['timestamp'] = format_timestamp(record['timestamp'])
+            record['agent_name'] = bots[record['agent_name']]
+            record['opponent_name'] = bots[record['opponent_name']]
+            record['state'] = STATES.names[record['state']]
+            record['action_taken'] = ACTIONS.names[record['action_taken']]
+            yield record
+
+    @property
+    def interactions(self) -> list:
+        """All logged turns as dicts"""
+        return list(self.records())
+
     def export_to_csv(self, filename: str = 'qlearning_interaction_log.csv'):
-        if not self.interactions:
+        if not len(self):
             return
-            
+
+        with open(filename, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(COLUMNS), lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(self.records())
+
+    def export_to_json(self, filename: str = 'qlearning_interaction_log.json'):
+        if not len(self):
+            return
+
         import pandas as pd
-        df = pd.DataFrame(self.interactions)
-        df.to_csv(filename, index=False)
-    
-    print("Test")
\ No newline at end of file
+        df = pd.DataFrame(self.records(), columns=list(COLUMNS))
+        df.to_json(filename, orient='records', lines=True)
+
+
+@lru_cache(maxsize=1024)
+def format_timestamp(seconds: int) -> str:
+    return datetime.fromtimestamp(seconds).strftime('%Y-%m-%d %H:%M:%S')
@@ -0,0 +1,239 @@
+"""
+Multi-resolution store of the learning curves of the Q-learning agents.
+
+For every (agent, opponent) the store keeps one series per logged turn: the round, the
+reward, whether the agent cooperated, the Q-values of the state it was in and its
+exploration rate. Level 0 holds the turns themselves; every level above groups
+CURVE_DOWNSAMPLING buckets of the level below into one, with the number of turns and
+the min, mean and max of every series. A million turns make about ten levels, and any
+range of turns can be drawn at any zoom from the level that shows it in at most a few
+thousand buckets, read through a memory map.
+
+The store is built while the tournament runs, from each pairing's InteractionLogger.
+Complete buckets are written as soon as they fill up; the last, partial bucket of every
+level is only written on close(), so readers see a run's complete buckets while it is
+being written and every turn once it is closed.
+
+Files in the store directory:
+    curves.json         the downsampling factor, the series and the (agent, opponent) keys
+    <key>_<level>.bin   the buckets of one key at one level
+"""
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from model.constants import COOPERATE, CURVE_DOWNSAMPLING, CURVE_PLOT_POINTS
+from model.logging.SymbolTable import ACTIONS
+
+META_FILE = "curves.json"
+
+# The series of every key, kept as float32: plenty for plotting, at half the size
+CURVE_SERIES = ('round', 'reward', 'cooperation', 'q_value_cooperate', 'q_value_defect', 'exploration_rate')
+STATISTICS = ('min', 'mean', 'max')
+
+TURN_DTYPE = np.dtype([(series, '<f4') for series in CURVE_SERIES])
+BUCKET_DTYPE = np.dtype([('count', '<i8')] + [(f"{series}_{statistic}", '<f4')
+                                               for series in CURVE_SERIES for statistic in STATISTICS])
+
+
+def aggregate(rows: np.ndarray, groups: int) -> np.ndarray:
+    """
+    Combines consecutive rows, turns or buckets, into the given number of buckets of
+    equally many rows each. Means are weighted by the turns in every bucket.
+    """
+    buckets = np.zeros(groups, dtype=BUCKET_DTYPE)
+    rows = rows.reshape(groups, -1)
+    if rows.dtype == TURN_DTYPE:
+        buckets['count'] = rows.shape[1]
+        for series in CURVE_SERIES:
+            values = rows[series].astype(np.float64)
+            buckets[f"{series}_min"] = values.min(axis=1)
+            buckets[f"{series}_mean"] = values.mean(axis=1)
+            buckets[f"{series}_max"] = values.max(axis=1)
+    else:
+        counts = rows['count']
+        buckets['count'] = counts.sum(axis=1)
+        for series in CURVE_SERIES:
+            buckets[f"{series}_min"] = rows[f"{series}_min"].min(axis=1)
+            buckets[f"{series}_mean"] = ((rows[f"{series}_mean"].astype(np.float64) * counts).sum(axis=1)
+                                         / buckets['count'])
+            buckets[f"{series}_max"] = rows[f"{series}_max"].max(axis=1)
+    return buckets
+
+
+class LearningCurveStore:
+    """
+    Attributes:
+        directory (str): The directory holding the store's files
+        factor (int): The number of buckets of a level combined into one bucket of the next
+        keys (List[Tuple[str, str]]): The (agent, opponent) of every series, in file order
+    """
+
+    def __init__(self, directory: str, mode: str = "r", factor: int = CURVE_DOWNSAMPLING):
+        """
+        Opens a store. Mode "w" starts an empty store to append to, "r" only reads.
+        """
+        if mode not in ("r", "w"):
+            raise ValueError("Mode must be one of 'r' or 'w'")
+        if factor < 2:
+            raise ValueError("Downsampling factor must be at least 2")
+        self.directory = directory
+        self.mode = mode
+        self.keys: List[Tuple[str, str]] = []
+        # Position of every key in keys, which numbers its files
+        self.positions: Dict[Tuple[str, str], int] = {}
+        # Rows of every (key, level) waiting for the rest of their bucket on the next level
+        self._pending: Dict[Tuple[int, int], np.ndarray] = {}
+        if mode == "w":
+            os.makedirs(directory, exist_ok=True)
+            for filename in os.listdir(directory):
+                if filename.endswith(".bin"):
+                    os.remove(self._path(filename))
+            self.factor = factor
+            self._save_meta()
+        else:
+            with open(self._path(META_FILE)) as file:
+                meta = json.load(file)
+            self.factor = meta['factor']
+            self.keys = [tuple(key) for key in meta['keys']]
+            self.positions = {key: position for position, key in enumerate(self.keys)}
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def _level_path(self, key: int, level: int) -> str:
+        return self._path(f"{key}_{level}.bin")
+
+    def _save_meta(self) -> None:
+        with open(self._path(META_FILE), "w") as file:
+            json.dump({'factor': self.factor, 'series': list(CURVE_SERIES), 'keys': [list(key) for key in self.keys]},
+                      file)
+
+    def _write(self, key: int, level: int, rows: np.ndarray) -> None:
+        with open(self._level_path(key, level), "ab") as file:
+            file.write(rows.tobytes())
+
+    # WRITING
+    def append(self, agent: str, opponent: str, turns: np.ndarray) -> None:
+        """
+        Appends consecutive turns of an agent against an opponent, a TURN_DTYPE array, and
+        writes every bucket they complete on every level.
+        """
+        if self.mode != "w":
+            raise ValueError("Learning curve store was opened read-only")
+        key = self.positions.get((agent, opponent))
+        if key is None:
+            key = self.positions[(agent, opponent)] = len(self.keys)
+            self.keys.append((agent, opponent))
+            self._save_meta()
+
+        rows = np.asarray(turns, dtype=TURN_DTYPE)
+        self._write(key, 0, rows)
+        level = 0
+        while len(rows):
+            waiting = self._pending.get((key, level))
+            if waiting is not None:
+                rows = np.concatenate([waiting, rows])
+            complete = len(rows) // self.factor * self.factor
+            self._pending[(key, level)] = rows[complete:]
+            rows = aggregate(rows[:complete], complete // self.factor) if complete else rows[:0]
+            level += 1
+            if len(rows):
+                self._write(key, level, rows)
+
+    def append_log(self, logger) -> None:
+        """Appends the turns of an InteractionLogger, such as one pairing's, key by key"""
+        if logger is None or not len(logger):
+            return
+        columns = logger.columns
+        agents = np.asarray(columns['agent_name'])
+        opponents = np.asarray(columns['opponent_name'])
+        turns = np.zeros(len(agents), dtype=TURN_DTYPE)
+        turns['round'] = columns['round_num']
+        turns['reward'] = columns['reward']
+        turns['cooperation'] = np.asarray(columns['action_taken']) == ACTIONS.ids[COOPERATE]
+        for series in ('q_value_cooperate', 'q_value_defect', 'exploration_rate'):
+            turns[series] = columns[series]
+        pairs = np.unique(np.stack([agents, opponents], axis=1), axis=0)
+        for agent, opponent in pairs:
+            selected = (agents == agent) & (opponents == opponent)
+            self.append(logger.bots.names[agent], logger.bots.names[opponent], turns[selected])
+
+    def close(self) -> None:
+        """Writes the last, partial bucket of every level, up to the single bucket at the top"""
+        if self.mode != "w":
+            return
+        for key in range(len(self.keys)):
+            level = 1
+            tail = None
+            while True:
+                rows = self._pending.pop((key, level - 1), None)
+                below = [part for part in (rows, tail) if part is not None and len(part)]
+                # Turns only wait below level 1, where there is no tail from a level below
+                tail = aggregate(np.concatenate(below), 1) if below else None
+                if tail is not None:
+                    self._write(key, level, tail)
+                if self.length(*self.keys[key], level) <= 1:
+                    break
+                level += 1
+        self.mode = "r"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # READING
+    def length(self, agent: str, opponent: str, level: int = 0) -> int:
+        """The number of turns, or of buckets on a higher level, written for a key"""
+        path = self._level_path(self.positions[(agent, opponent)], level)
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // (TURN_DTYPE if level == 0 else BUCKET_DTYPE).itemsize
+
+    def levels(self, agent: str, opponent: str) -> int:
+        level = 0
+        while self.length(agent, opponent, level):
+            level += 1
+        return level
+
+    def level(self, agent: str, opponent: str, level: int) -> np.ndarray:
+        """Memory-mapped turns or buckets of one level of a key"""
+        dtype = TURN_DTYPE if level == 0 else BUCKET_DTYPE
+        if not self.length(agent, opponent, level):
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._level_path(self.positions[(agent, opponent)], level), dtype=dtype, mode="r")
+
+    def read(self, agent: str, opponent: str, start: int = 0, stop: Optional[int] = None,
+             max_points: int = CURVE_PLOT_POINTS) -> Dict[str, np.ndarray]:
+        """
+        The turns start to stop of a key, from the finest level that shows them in at
+        most max_points buckets.
+
+        Returns:
+            Dict[str, np.ndarray]: 'level', 'turn' (the first turn of every bucket) and
+            'count', and the min, mean and max of every series as '<series>_<statistic>'
+        """
+        stop = self.length(agent, opponent) if stop is None else stop
+        top = max(self.levels(agent, opponent) - 1, 0)
+        level = 0
+        while level < top and (stop - start) / self.factor ** level > max_points:
+            level += 1
+        size = self.factor ** level
+        first, last = start // size, -(-stop // size)
+        rows = self.level(agent, opponent, level)[first:last]
+
+        result = {'level': level, 'turn': np.arange(first, first + len(rows)) * size}
+        if level == 0:
+            result['count'] = np.ones(len(rows), dtype=np.int64)
+            for series in CURVE_SERIES:
+                for statistic in STATISTICS:
+                    result[f"{series}_{statistic}"] = rows[series]
+        else:
+            result['count'] = rows['count']
+            for name in BUCKET_DTYPE.names[1:]:
+                result[name] = rows[name]
+        return result
@@ -0,0 +1,233 @@
+"""
+Streams results out of a running tournament to writer and analysis consumers.
+
+The simulation publishes a PairingResult as soon as a pairing completes and a
+TournamentResult once a tournament is aggregated. Every consumer runs in its own thread
+behind its own bounded queue: when a consumer falls behind, publishing blocks until it
+catches up, so memory stays bounded while disk I/O and plotting overlap with the
+simulation. Writers flush after every item, so the results of all completed pairings
+are on disk even if the run dies.
+"""
+import csv
+import json
+import os
+import queue
+import threading
+from typing import Dict, List
+
+from model.constants import *
+from model.logging.InteractionLogger import COLUMNS as LOG_COLUMNS
+
+# Marks the end of the stream on every consumer's queue
+_DONE = object()
+
+PAIRING_STATS_FIELDS = ['tournament_num', 'pairing', 'bot_name', TOTAL_PAYOFF, MATCHES_PLAYED,
+                        COOPERATE_COUNT, DEFECT_COUNT]
+
+
+class PairingResult:
+    """
+    Attributes:
+        tournament_num (int): The tournament the pairing was played in
+        index (int): The pairing's position in the tournament
+        round_stats (Dict): The stats of both bots over all rounds
+        log: The InteractionLogger holding the pairing's logged Q-learning interactions, if any
+        history: The pairing's HistoryBuffer, if the history is recorded
+    """
+
+    def __init__(self, tournament_num: int, index: int, round_stats: Dict, log=None, history=None):
+        self.tournament_num = tournament_num
+        self.index = index
+        self.round_stats = round_stats
+        self.log = log
+        self.history = history
+
+
+class TournamentResult:
+    """
+    The stats of all tournaments completed so far.
+
+    Attributes:
+        tournament_num (int): The tournament that just completed
+        tournament_stats (List[Dict]): The per-match stats of all completed tournaments
+        aggregate_stats (Dict): The aggregate stats of all completed tournaments
+    """
+
+    def __init__(self, tournament_num: int, tournament_stats: List[Dict], aggregate_stats: Dict):
+        self.tournament_num = tournament_num
+        self.tournament_stats = tournament_stats
+        self.aggregate_stats = aggregate_stats
+
+
+class Consumer:
+    """A consumer of the results stream. Every method is called from the consumer's own thread."""
+
+    def consume(self, item) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Called once the stream has ended"""
+
+
+class ResultsPipeline:
+    def __init__(self, consumers: List[Consumer], max_pending: int = PIPELINE_QUEUE_SIZE):
+        if max_pending < 1:
+            raise ValueError("Pipeline queue size must be at least 1")
+        self.consumers = consumers
+        self.errors: List[BaseException] = []
+        self._queues = [queue.Queue(maxsize=max_pending) for _ in consumers]
+        self._threads = [threading.Thread(target=self._run, args=(consumer, items),
+                                          name=f"{type(consumer).__name__}", daemon=True)
+                         for consumer, items in zip(consumers, self._queues)]
+        self._closed = False
+        # Whether the first consumer error has been raised already
+        self._reported = False
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self, consumer: Consumer, items: queue.Queue) -> None:
+        failed = False
+        while True:
+            item = items.get()
+            if item is _DONE:
+                break
+            # After a failure keep draining the queue, so publishing never blocks for good
+            if failed:
+                continue
+            try:
+                consumer.consume(item)
+            except BaseException as error:
+                self.errors.append(error)
+                failed = True
+        if not failed:
+            try:
+                consumer.close()
+            except BaseException as error:
+                self.errors.append(error)
+
+    def publish(self, item) -> None:
+        """Hands an item to every consumer, blocking while any consumer's queue is full"""
+        if self._closed:
+            raise ValueError("Results pipeline is closed")
+        self._raise_error()
+        for items in self._queues:
+            items.put(item)
+
+    def close(self) -> None:
+        """
+        Ends the stream, waits for every consumer to finish and raises the first consumer
+        error, unless publish already has
+        """
+        if not self._closed:
+            self._closed = True
+            for items in self._queues:
+                items.put(_DONE)
+            for thread in self._threads:
+                thread.join()
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        """Raises the first consumer error, once, so that closing on the way out does not mask it"""
+        if self.errors and not self._reported:
+            self._reported = True
+            raise RuntimeError("A results consumer failed") from self.errors[0]
+
+
+class StatsWriter(Consumer):
+    """Appends the stats of every completed pairing to pairing_stats.<format> in the output directory"""
+
+    def __init__(self, output_dir: str, output_format: str = "csv"):
+        self.filename = os.path.join(output_dir, f"pairing_stats.{output_format}")
+        self.output_format = output_format
+        self.file = open(self.filename, 'w', newline='')
+        self.writer = None
+        if output_format == "csv":
+            self.writer = csv.DictWriter(self.file, fieldnames=PAIRING_STATS_FIELDS, lineterminator="\n")
+            self.writer.writeheader()
+            self.file.flush()
+
+    def consume(self, item) -> None:
+        if not isinstance(item, PairingResult):
+            return
+        for bot_name, stats in item.round_stats.items():
+            row = {'tournament_num': item.tournament_num, 'pairing': item.index, 'bot_name': bot_name}
+            row.update({key: stats[key] for key in PAIRING_STATS_FIELDS[3:]})
+            if self.writer is not None:
+                self.writer.writerow(row)
+            else:
+                self.file.write(json.dumps(row, separators=(",", ":")) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class LogWriter(Consumer):
+    """
+    Appends the logged Q-learning interactions of every completed pairing to the detailed
+    log, in the same layout as InteractionLogger's exports. The names are looked up here,
+    off the simulation's thread. The file stays empty if nothing is logged.
+    """
+
+    def __init__(self, filename: str, output_format: str = "csv"):
+        self.filename = filename
+        self.output_format = output_format
+        self.file = open(filename, 'w', newline='')
+        self.writer = None
+
+    def consume(self, item) -> None:
+        if not isinstance(item, PairingResult) or item.log is None or not len(item.log):
+            return
+        if self.output_format == "csv" and self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=list(LOG_COLUMNS), lineterminator="\n")
+            self.writer.writeheader()
+        for interaction in item.log.records():
+            if self.writer is not None:
+                self.writer.writerow(interaction)
+            else:
+                self.file.write(json.dumps(interaction, separators=(",", ":")) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class HistoryWriter(Consumer):
+    """Appends the games of every completed pairing to a HistoryStore"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def consume(self, item) -> None:
+        if isinstance(item, PairingResult) and item.history is not None:
+            self.store.write(item.history)
+
+
+class CurveWriter(Consumer):
+    """Appends the logged turns of every completed pairing to a LearningCurveStore"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def consume(self, item) -> None:
+        if isinstance(item, PairingResult) and item.log is not None:
+            self.store.append_log(item.log)
+
+
+class AnalysisConsumer(Consumer):
+    """
+    Regenerates the analysis plots from the stats of all completed tournaments every time
+    a tournament completes. The plots are only saved, never shown, as the consumer does
+    not run on the main thread; they are drawn without pyplot, leaving its backend to the
+    main thread.
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+
+    def consume(self, item) -> None:
+        if not isinstance(item, TournamentResult):
+            return
+        from model.stat_analysis.performance_analyzer import PerformanceAnalyzer
+        PerformanceAnalyzer(item.tournament_stats, item.aggregate_stats,
+                            output_dir=self.output_dir, show=False).analyze_all()
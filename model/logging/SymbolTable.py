@@ -0,0 +1,53 @@
+"""
+Small-int identifiers for the names that repeat in every log row and stats entry.
+
+Bots are interned as they are first seen. Actions and states are fixed, with the same
+codes as the array-based engines: 0 for COOPERATE, 1 for DEFECT and 2 for no previous
+move. Rows keep the ids, and names are only looked up again when they are written out.
+"""
+from typing import Iterable, List
+
+from model.constants import COOPERATE, DEFECT
+
+
+class SymbolTable:
+    """
+    Attributes:
+        names (List): The interned names, indexed by id
+    """
+
+    def __init__(self, names: Iterable = ()):
+        self.names: List = []
+        self.ids = {}
+        for name in names:
+            self.intern(name)
+
+    def intern(self, name) -> int:
+        """Returns the id of a name, adding it to the table if it is new"""
+        symbol = self.ids.get(name)
+        if symbol is None:
+            symbol = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return symbol
+
+    def name(self, symbol: int):
+        return self.names[symbol]
+
+    def canonical(self, name):
+        """The table's own copy of a name, so that equal names share one object"""
+        return self.names[self.intern(name)]
+
+    def remap(self, other: "SymbolTable") -> List[int]:
+        """Ids in this table of every name in other, by the name's id in other"""
+        return [self.intern(name) for name in other.names]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name) -> bool:
+        return name in self.ids
+
+
+# Fixed tables, shared by every logger
+ACTIONS = SymbolTable((COOPERATE, DEFECT))
+STATES = SymbolTable((COOPERATE, DEFECT, None))
@@ -13,49 +13,28 @@ def export_tournament_stats(aggregate_stats: Dict, tournament_stats: List[Dict],
         filename (str): Name of the output CSV file
     """
     
-    # Prepare the data rows
-    rows = []
-    
-    # Add header row
+    # Rows are formatted as they are written, so no formatted copy of the stats is kept
     headers = ['Match', 'Bot Name', 'Average Payoff', 'Matches Played', 'Cooperation Rate']
-    rows.append(headers)
-    
-    # Add data for each match
-    for match_num, match_result in enumerate(tournament_stats):
-        for bot_name, stats in match_result.items():
-            total_actions = stats[COOPERATE_COUNT] + stats[DEFECT_COUNT]
-            coop_rate = stats[COOPERATE_COUNT] / total_actions if total_actions > 0 else 0
-            avg_payoff = stats[TOTAL_PAYOFF] / stats[MATCHES_PLAYED] if stats[MATCHES_PLAYED] > 0 else 0
-            
-            row = [
-                f"Match {match_num + 1}",
-                bot_name,
-                f"{avg_payoff:.2f}",
-                f"{stats[MATCHES_PLAYED]}",
-                f"{coop_rate:.2%}"
-            ]
-            rows.append(row)
-    
-    # Add a separator row
-    rows.append([''] * len(headers))
-    
-    # Add tournament averages
-    rows.append(['TOURNAMENT AVERAGES', '', '', '', ''])
-    for bot_name, stats in aggregate_stats.items():
-        total_actions = stats[COOPERATE_COUNT] + stats[DEFECT_COUNT]
-        avg_coop_rate = stats[COOPERATE_COUNT] / total_actions if total_actions > 0 else 0
-        avg_payoff = stats[TOTAL_PAYOFF] / stats[MATCHES_PLAYED] if stats[MATCHES_PLAYED] > 0 else 0
-        
-        row = [
-            'Average',
-            bot_name,
-            f"{avg_payoff:.2f}",
-            f"{stats[MATCHES_PLAYED]}",
-            f"{avg_coop_rate:.2%}"
-        ]
-        rows.append(row)
-    
-    # Write to CSV file
     with open(filename, 'w', newline='') as csvfile:
         writer = csv.writer(csvfile)
-        writer.writerows(rows)
+        writer.writerow(headers)
+
+        # Add data for each match
+        for match_num, match_result in enumerate(tournament_stats):
+            for bot_name, stats in match_result.items():
+                writer.writerow([f"Match {match_num + 1}", bot_name, *format_stats(stats)])
+
+        # Add a separator row
+        writer.writerow([''] * len(headers))
+
+        # Add tournament averages
+        writer.writerow(['TOURNAMENT AVERAGES', '', '', '', ''])
+        for bot_name, stats in aggregate_stats.items():
+            writer.writerow(['Average', bot_name, *format_stats(stats)])
+
+def format_stats(stats: Dict) -> List[str]:
+    """Average payoff, matches played and cooperation rate as they appear in the CSV"""
+    total_actions = stats[COOPERATE_COUNT] + stats[DEFECT_COUNT]
+    coop_rate = stats[COOPERATE_COUNT] / total_actions if total_actions > 0 else 0
+    avg_payoff = stats[TOTAL_PAYOFF] / stats[MATCHES_PLAYED] if stats[MATCHES_PLAYED] > 0 else 0
+    return [f"{avg_payoff:.2f}", f"{stats[MATCHES_PLAYED]}", f"{coop_rate:.2%}"]
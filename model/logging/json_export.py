@@ -0,0 +1,32 @@
+import json
+from typing import Dict, List
+from model.constants import *
+
+def export_tournament_stats_json(aggregate_stats: Dict, tournament_stats: List[Dict], num_tournaments: int, filename: str = "analysis_output/tournament_stats.json"):
+    """
+    Exports the tournament statistics to a JSON file, with the same content as the CSV export
+    but with plain numbers instead of formatted strings
+
+    Args:
+        aggregate_stats (Dict): Dictionary containing the aggregated statistics across all tournaments
+        tournament_stats (List[Dict]): List of dictionaries containing stats for each match
+        num_tournaments (int): Number of tournaments run
+        filename (str): Name of the output JSON file
+    """
+    matches = []
+    for match_num, match_result in enumerate(tournament_stats):
+        for bot_name, stats in match_result.items():
+            matches.append({'match': match_num + 1, 'bot_name': bot_name, **summarize_stats(stats)})
+
+    averages = [{'bot_name': bot_name, **summarize_stats(stats)} for bot_name, stats in aggregate_stats.items()]
+
+    with open(filename, 'w') as jsonfile:
+        json.dump({'num_tournaments': num_tournaments, 'matches': matches, 'averages': averages}, jsonfile, indent=2)
+
+def summarize_stats(stats: Dict) -> Dict:
+    total_actions = stats[COOPERATE_COUNT] + stats[DEFECT_COUNT]
+    return {
+        'average_payoff': stats[TOTAL_PAYOFF] / stats[MATCHES_PLAYED] if stats[MATCHES_PLAYED] > 0 else 0,
+        'matches_played': stats[MATCHES_PLAYED],
+        'cooperation_rate': stats[COOPERATE_COUNT] / total_actions if total_actions > 0 else 0
+    }
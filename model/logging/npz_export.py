@@ -0,0 +1,103 @@
+import json
+import platform
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from model.constants import *
+
+# Bumped whenever the layout of the arrays changes
+RESULTS_FORMAT_VERSION = 1
+
+MATCH_DTYPE = np.dtype([
+    ("tournament", "<i4"),
+    ("match", "<i4"),
+    ("bot", "<i4"),
+    ("total_payoff", "<f8"),
+    ("matches_played", "<i8"),
+    ("cooperate_count", "<i8"),
+    ("defect_count", "<i8"),
+    ("average_payoff", "<f8"),
+    ("cooperation_rate", "<f8"),
+])
+AVERAGE_DTYPE = np.dtype([(name, MATCH_DTYPE[name]) for name in MATCH_DTYPE.names[2:]])
+
+def export_tournament_results_npz(aggregate_stats: Dict, tournament_stats: List[Dict], num_tournaments: int,
+                                  filename: str = "analysis_output/tournament_results.npz",
+                                  metadata: Optional[Dict] = None):
+    """
+    Exports the tournament statistics as typed tables to an .npz file, for tools that load
+    many runs: the same content as the CSV export, but as plain numbers in structured arrays
+    that load back without parsing.
+
+    The file holds:
+        matches: One MATCH_DTYPE row per bot per match, with the tournament it was played in
+        averages: One AVERAGE_DTYPE row per bot over all tournaments
+        bot_names: The names the bot columns index into
+        metadata: A JSON string with the given run parameters, the format version and
+            the time of the export
+
+    Args:
+        aggregate_stats (Dict): Dictionary containing the aggregated statistics across all tournaments
+        tournament_stats (List[Dict]): List of dictionaries containing stats for each match
+        num_tournaments (int): Number of tournaments run
+        filename (str): Name of the output .npz file
+        metadata (Dict): Parameters of the run, such as the seed, saved with the tables
+    """
+    bot_names = list(aggregate_stats)
+    bot_ids = {name: bot for bot, name in enumerate(bot_names)}
+    matches_per_tournament = max(len(tournament_stats) // max(num_tournaments, 1), 1)
+
+    matches = np.zeros(sum(len(match_result) for match_result in tournament_stats), dtype=MATCH_DTYPE)
+    row = 0
+    for match_num, match_result in enumerate(tournament_stats):
+        for bot_name, stats in match_result.items():
+            matches[row] = (match_num // matches_per_tournament + 1, match_num + 1, bot_ids[bot_name],
+                            *stats_fields(stats))
+            row += 1
+
+    averages = np.zeros(len(bot_names), dtype=AVERAGE_DTYPE)
+    for bot, bot_name in enumerate(bot_names):
+        averages[bot] = (bot, *stats_fields(aggregate_stats[bot_name]))
+
+    info = {
+        'format_version': RESULTS_FORMAT_VERSION,
+        'num_tournaments': num_tournaments,
+        'exported_at': datetime.now().isoformat(timespec='seconds'),
+        'python_version': platform.python_version(),
+        'numpy_version': np.__version__,
+        **(metadata or {}),
+    }
+    np.savez(filename, matches=matches, averages=averages, bot_names=np.array(bot_names, dtype=str),
+             metadata=np.array(json.dumps(info)))
+
+def load_tournament_results_npz(filename: str) -> Dict:
+    """
+    Loads an export of export_tournament_results_npz.
+
+    Returns: Dict: The matches and averages tables, the bot names as a list and the
+    metadata as a dict
+    """
+    with np.load(filename, allow_pickle=False) as data:
+        metadata = json.loads(str(data['metadata']))
+        if metadata.get('format_version') != RESULTS_FORMAT_VERSION:
+            raise ValueError(f"Unsupported results format version {metadata.get('format_version')}")
+        return {
+            'matches': data['matches'],
+            'averages': data['averages'],
+            'bot_names': data['bot_names'].tolist(),
+            'metadata': metadata,
+        }
+
+def stats_fields(stats: Dict) -> tuple:
+    """The totals of a stats dict followed by its average payoff and cooperation rate"""
+    total_actions = stats[COOPERATE_COUNT] + stats[DEFECT_COUNT]
+    return (
+        stats[TOTAL_PAYOFF],
+        stats[MATCHES_PLAYED],
+        stats[COOPERATE_COUNT],
+        stats[DEFECT_COUNT],
+        stats[TOTAL_PAYOFF] / stats[MATCHES_PLAYED] if stats[MATCHES_PLAYED] > 0 else 0,
+        stats[COOPERATE_COUNT] / total_actions if total_actions > 0 else 0,
+    )
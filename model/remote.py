@@ -0,0 +1,360 @@
+"""
+Bots whose strategies are played in another process.
+
+A bot server hosts a strategy, given as a factory of bots, and answers the moves of any
+number of games at once: every connection may play hundreds of games, each with a
+fresh bot from the factory, and an asyncio event loop multiplexes the connections. It
+listens on TCP (BotServer, serve_bot), or talks to one client over its stdin and stdout
+(serve_pipe), as `python bot_server.py` does with --stdio.
+
+On the client side, a RemoteBot stands in for the strategy wherever a bot is played,
+over a RemoteConnection to the server. On its own, every move is one round trip. But
+the rounds of a pairing against a bot that does not learn are independent games, so
+play_pairing plays them all together with play_pairing_batched: every turn of every
+game is one batch of moves, and the games are split into REMOTE_PIPELINE_DEPTH groups
+whose batches are kept in flight at once, so the server answers one group while the
+client plays the turn of another.
+
+The protocol is one JSON object per line, answered in the order it is sent. A client
+asks for the next move of some of its games with {"type": "moves", "opponent": name,
+"games": [id, ...], "last": codes}, where codes holds one ACTION_CODES character per
+game for the opponent's last move as the bot perceived it, and gets back
+{"type": "actions", "actions": codes}. The first move of a game id starts a new game,
+and {"type": "end", "games": [id, ...]} ends games, with no answer.
+"""
+import asyncio
+import copy
+import importlib
+import itertools
+import json
+import socket
+import subprocess
+import sys
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from model.QLearningAgent import QLearningAgent
+from model.bots.BaseBot import BaseBot, get_bot_name
+from model.constants import *
+from model.distributed import parse_address, receive_message, send_message
+from model.tournamentManager import (BOT_TYPES, apply_noise, calculate_and_update_payoffs, initialize_bot_stats,
+                                     joint_action, update_bot_stats)
+
+# One character per move on the wire; "-" is the opponent's move before the first turn
+ACTION_CODES = {COOPERATE: "C", DEFECT: "D", None: "-"}
+CODE_ACTIONS = {code: action for action, code in ACTION_CODES.items()}
+
+
+def bot_factory(spec: str) -> Callable[[], BaseBot]:
+    """The bot type of a BOT_TYPES name, or of a "module:Class" path"""
+    if spec in BOT_TYPES:
+        return BOT_TYPES[spec]
+    module, _, name = spec.partition(":")
+    if not name:
+        raise ValueError(f"Bot must be one of {tuple(BOT_TYPES)} or a module:Class path")
+    return getattr(importlib.import_module(module), name)
+
+
+def answer(message: Dict, games: Dict[int, BaseBot], factory: Callable[[], BaseBot]) -> Optional[Dict]:
+    """Plays a message of a client on its games, returning the answer, if any"""
+    if message['type'] == "moves":
+        opponent = message['opponent']
+        actions = []
+        for game, code in zip(message['games'], message['last']):
+            bot = games.get(game)
+            if bot is None:
+                bot = games[game] = factory()
+            actions.append(ACTION_CODES[bot.choose_action(opponent, CODE_ACTIONS[code])])
+        return {"type": "actions", "actions": "".join(actions)}
+    if message['type'] == "end":
+        for game in message['games']:
+            games.pop(game, None)
+        return None
+    raise ValueError(f"Unknown message type {message['type']!r}")
+
+
+async def serve_connection(reader, writer, factory: Callable[[], BaseBot]) -> None:
+    """Answers one client until it closes the connection, with its own games"""
+    games = {}
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            reply = answer(json.loads(line), games, factory)
+            if reply is not None:
+                writer.write((json.dumps(reply) + "\n").encode())
+                await writer.drain()
+    finally:
+        writer.close()
+
+
+def serve_bot(factory: Callable[[], BaseBot], host: str = "127.0.0.1", port: int = BOT_SERVER_PORT) -> None:
+    """Serves the strategy over TCP until interrupted"""
+    async def serve():
+        server = await asyncio.start_server(lambda reader, writer: serve_connection(reader, writer, factory),
+                                            host, port)
+        async with server:
+            await server.serve_forever()
+    asyncio.run(serve())
+
+
+def serve_pipe(factory: Callable[[], BaseBot], rfile=None, wfile=None) -> None:
+    """Answers one client over a pair of binary files, stdin and stdout by default, until it closes them"""
+    rfile = rfile if rfile is not None else sys.stdin.buffer
+    wfile = wfile if wfile is not None else sys.stdout.buffer
+    games = {}
+    while (message := receive_message(rfile)) is not None:
+        reply = answer(message, games, factory)
+        if reply is not None:
+            send_message(wfile, reply)
+
+
+class BotServer:
+    """
+    Serves a strategy over TCP from an event loop on a background thread, for local
+    clients and tests.
+
+    Attributes:
+        address (tuple[str, int]): The host and port clients connect to
+    """
+
+    def __init__(self, factory: Callable[[], BaseBot], host: str = "127.0.0.1", port: int = BOT_SERVER_PORT):
+        """
+        Args:
+            factory (Callable): Creates the bot of every game, e.g. a bot type
+            port (int): The port to listen on, 0 for any free one
+        """
+        self.factory = factory
+        self.connections = set()
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(asyncio.start_server(self._serve, host, port))
+        self.address = self.server.sockets[0].getsockname()[:2]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    async def _serve(self, reader, writer) -> None:
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            await serve_connection(reader, writer, self.factory)
+        except asyncio.CancelledError:
+            # Closed with the server; the client sees the connection drop
+            pass
+        finally:
+            self.connections.discard(task)
+
+    async def _shutdown(self) -> None:
+        self.server.close()
+        for task in list(self.connections):
+            task.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+class RemoteConnection:
+    """
+    A connection to a bot server: over TCP to a "host:port" address, or over the pipes
+    of a server process started from a command. A pickled connection opens a new one
+    to the same server, or starts a new server process.
+
+    Attributes:
+        batches (int): The batches of moves asked for so far
+        moves (int): The moves asked for so far
+    """
+
+    def __init__(self, address=None, command: Optional[List[str]] = None):
+        """
+        Args:
+            address: The "host:port" or (host, port) of a bot server
+            command (List[str]): The command that starts a bot server on its stdin and
+                stdout, e.g. [sys.executable, "bot_server.py", "--bot", "TFTBot", "--stdio"]
+        """
+        if (address is None) == (command is None):
+            raise ValueError("Give either the address of a bot server or the command that starts one")
+        self.address = address
+        self.command = command
+        self.socket = None
+        self.process = None
+        if address is not None:
+            host, port = parse_address(address) if isinstance(address, str) else address
+            self.socket = socket.create_connection((host, port))
+            # Batches are small and answered one by one
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.rfile = self.socket.makefile("rb")
+            self.wfile = self.socket.makefile("wb")
+        else:
+            self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            self.rfile = self.process.stdout
+            self.wfile = self.process.stdin
+        self.game_ids = itertools.count()
+        self.batches = 0
+        self.moves = 0
+
+    def __getstate__(self):
+        return {'address': self.address, 'command': self.command}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def new_game(self) -> int:
+        return next(self.game_ids)
+
+    def send_moves(self, opponent: str, games: List[int], last: str) -> None:
+        """Asks for the next moves of games, given the codes of their opponent's last moves, without waiting"""
+        send_message(self.wfile, {"type": "moves", "opponent": opponent, "games": games, "last": last})
+        self.batches += 1
+        self.moves += len(games)
+
+    def receive_actions(self) -> str:
+        """The codes of the moves of the oldest batch not yet received"""
+        reply = receive_message(self.rfile)
+        if reply is None:
+            raise ConnectionError("The bot server closed the connection")
+        return reply['actions']
+
+    def end_games(self, games: List[int]) -> None:
+        send_message(self.wfile, {"type": "end", "games": games})
+
+    def close(self) -> None:
+        self.wfile.close()
+        self.rfile.close()
+        if self.socket is not None:
+            self.socket.close()
+        if self.process is not None:
+            self.process.wait()
+
+
+class RemoteBot(BaseBot):
+    """
+    A bot whose strategy is played by a bot server. Every game is played with a fresh
+    bot on the server; stats are kept under the given name.
+    """
+
+    def __init__(self, connection: RemoteConnection, name: str):
+        super().__init__(name=name)
+        self.connection = connection
+        self.game = None
+
+    # asks the server for the move of the current game, one round trip
+    def choose_action(self, name, opponent_last_action: Optional[str]) -> str:
+        if self.game is None:
+            self.game = self.connection.new_game()
+        self.connection.send_moves(name, [self.game], ACTION_CODES[opponent_last_action])
+        return CODE_ACTIONS[self.connection.receive_actions()]
+
+    # ends the game on the server, the next move starts a new one
+    def reset(self):
+        if self.game is not None:
+            self.connection.end_games([self.game])
+            self.game = None
+
+
+def supports_pairing(bot1, bot2) -> bool:
+    """Whether a RemoteBot plays a bot that does not learn, so that all rounds are independent games"""
+    bots = (bot1, bot2)
+    return (any(isinstance(bot, RemoteBot) for bot in bots)
+            and not any(isinstance(bot, QLearningAgent) for bot in bots))
+
+
+def play_pairing_batched(bot1, bot2, lengths, error_rate: float = 0.0, misperception_rate: float = 0.0,
+                         history=None, depth: int = REMOTE_PIPELINE_DEPTH) -> dict:
+    """
+    Batched version of play_pairing for a RemoteBot against a bot that does not learn:
+    all rounds are played together in lock-step, every turn of a group of games being one
+    batch of moves per remote side, with depth groups in flight. Local bots play every
+    game on a copy of their own. Lengths holds the number of turns of each round; every
+    game is recorded in the HistoryBuffer history, if given. Returns the same stats dict.
+
+    Moves and noise are drawn in an order that depends on depth, so noisy or random
+    strategies give other results than one game at a time, reproducible for a seed.
+    """
+    bots = (bot1, bot2)
+    names = (get_bot_name(bot1), get_bot_name(bot2))
+    stats = {}
+    initialize_bot_stats(stats, names[0])
+    initialize_bot_stats(stats, names[1])
+    for bot in bots:
+        bot.reset()
+
+    rounds = len(lengths)
+    remote = [isinstance(bot, RemoteBot) for bot in bots]
+    # Per side: the game ids on the server, or a copy of the local bot, of every game
+    players = [[bot.connection.new_game() if remote[side] else copy.deepcopy(bot) for _ in range(rounds)]
+               for side, bot in enumerate(bots)]
+    # Per side: the opponent's last move of every game, as the side perceived it
+    seen = [[None] * rounds, [None] * rounds]
+    turns_left = list(lengths)
+    moves = [[] for _ in range(rounds)] if history is not None else None
+
+    def send(group):
+        for side in (0, 1):
+            if remote[side]:
+                bots[side].connection.send_moves(names[1 - side], [players[side][game] for game in group],
+                                                 "".join([ACTION_CODES[seen[side][game]] for game in group]))
+
+    def play_turn(group):
+        actions = [bots[side].connection.receive_actions() if remote[side] else None for side in (0, 1)]
+        for position, game in enumerate(group):
+            # Both bots choose their actions, which may be misexecuted
+            if remote[0]:
+                bot1_action = CODE_ACTIONS[actions[0][position]]
+            else:
+                bot1_action = players[0][game].choose_action(names[1], seen[0][game])
+            bot1_action = apply_noise(bot1_action, error_rate)
+            if remote[1]:
+                bot2_action = CODE_ACTIONS[actions[1][position]]
+            else:
+                bot2_action = players[1][game].choose_action(names[0], seen[1][game])
+            bot2_action = apply_noise(bot2_action, error_rate)
+            if moves is not None:
+                moves[game].append(joint_action(bot1_action, bot2_action))
+
+            update_bot_stats(stats, names[0], bot1_action)
+            update_bot_stats(stats, names[1], bot2_action)
+            calculate_and_update_payoffs(stats, names[0], names[1], bot1_action, bot2_action)
+
+            # What each bot perceives of the other's move
+            seen[0][game] = apply_noise(bot2_action, misperception_rate)
+            seen[1][game] = apply_noise(bot1_action, misperception_rate)
+            turns_left[game] -= 1
+
+    games = [game for game in range(rounds) if turns_left[game] > 0]
+    size = -(-len(games) // max(depth, 1)) or 1
+    in_flight = deque(games[start:start + size] for start in range(0, len(games), size))
+    for group in in_flight:
+        send(group)
+    while in_flight:
+        group = in_flight.popleft()
+        play_turn(group)
+        playing = [game for game in group if turns_left[game] > 0]
+        if len(playing) < len(group):
+            for side in (0, 1):
+                if remote[side]:
+                    bots[side].connection.end_games([players[side][game] for game in group if not turns_left[game]])
+        if playing:
+            send(playing)
+            in_flight.append(playing)
+
+    if history is not None:
+        for game_moves in moves:
+            history.record_game(game_moves)
+    return stats
@@ -0,0 +1,144 @@
+"""
+Digests of tournament results, and verification that a run can be reproduced.
+
+With a seed every pairing draws its own random numbers, and the stats are reduced in
+pairing order whatever order the workers finish in, so a run gives the same results
+with any number of workers. A reproducible run records a SHA-256 digest of every
+pairing: its stats and what the Q-learning agents learned against each other, down to
+the last bit of every float. verify_run plays a sample of the pairings again, serially
+and from fresh bots, and compares the digests.
+"""
+import hashlib
+import json
+import random
+from collections.abc import Mapping
+from typing import Dict, List, Optional
+
+from model.ExplorationSchedule import POLICY_UCB, schedule_from_description
+from model.QLearningAgent import QLearningAgent
+from model.bots.BaseBot import get_bot_name
+from model.constants import *
+
+REPRODUCIBILITY_FILE = "reproducibility.json"
+
+
+def canonical(value):
+    """A JSON-ready copy of stats or learner state, with floats written out exactly"""
+    if isinstance(value, Mapping):
+        return [[canonical(key), canonical(item)] for key, item in value.items()]
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    if isinstance(value, float):
+        return float(value).hex()
+    if value is None or isinstance(value, str):
+        return value
+    # Integers, including numpy's
+    return int(value)
+
+
+def learner_state(bot, opponent_name: str):
+    """Everything a Q-learning agent keeps about one opponent, None for other bots"""
+    if not isinstance(bot, QLearningAgent):
+        return None
+    return {
+        'q_table': bot.get_qtable_for_opponent(opponent_name).get_table(),
+        'exploration_rate': bot.get_exploration_rate(opponent_name),
+        'exploration_round': bot.get_exploration_round(opponent_name),
+        # Only UCB keeps visit counts
+        'visit_counts': bot.visit_counts.get(opponent_name) if bot.get_schedule().policy == POLICY_UCB else None,
+    }
+
+
+def digest_pairing(round_stats: Dict, bot1, bot2) -> str:
+    """SHA-256 of a pairing's stats and of what both bots learned against each other"""
+    state = {
+        'stats': round_stats,
+        'bot1': learner_state(bot1, get_bot_name(bot2)),
+        'bot2': learner_state(bot2, get_bot_name(bot1)),
+    }
+    return hashlib.sha256(json.dumps(canonical(state), separators=(",", ":")).encode()).hexdigest()
+
+
+def digest_run(seed, pairing_digests: Dict) -> str:
+    """
+    SHA-256 of the seed and of every pairing's digest, in tournament and pairing order.
+    pairing_digests holds the bot names and digest of every (tournament, pairing), as
+    filled in by simulate_round_robin.
+    """
+    digests = [pairing_digests[key]['digest'] for key in sorted(pairing_digests)]
+    return hashlib.sha256(json.dumps([seed, digests]).encode()).hexdigest()
+
+
+def save_record(filename: str, seed: int, parameters: Dict, pairing_digests: Dict) -> str:
+    """Writes the digests of a run with everything needed to play it again, returning the run digest"""
+    run_digest = digest_run(seed, pairing_digests)
+    pairings = [{'tournament': tournament, 'pairing': pairing, **pairing_digests[(tournament, pairing)]}
+                for tournament, pairing in sorted(pairing_digests)]
+    with open(filename, 'w') as file:
+        json.dump({'seed': seed, 'parameters': parameters, 'digest': run_digest, 'pairings': pairings},
+                  file, indent=2)
+    return run_digest
+
+
+def verify_run(filename: str, sample: Optional[int] = None, verbose: bool = True) -> List[Dict]:
+    """
+    Plays a sample of the pairings of a recorded run again, serially in this process,
+    and compares their digests with the recorded ones. Pairings of two Q-learning agents
+    that the compiled engine trained in one batch are replayed with their whole batch.
+
+    Args:
+        filename (str): The reproducibility.json of the run
+        sample (int): The number of pairings to check, all of them by default
+
+    Returns: List[Dict]: The records of the pairings whose digests differ, with the
+    digest found under 'actual'
+    """
+    from model.engine import learner_batch
+    from model.tournamentManager import (create_bots, play_pairing_of_run, _play_learner_pairings_batched,
+                                         ENGINE_COMPILED)
+
+    with open(filename) as file:
+        record = json.load(file)
+    seed = record['seed']
+    parameters = record['parameters']
+    rounds = parameters['rounds']
+    iterations = parameters['iterations']
+    engine = parameters['engine']
+    options = {'engine': engine, 'error_rate': parameters['error_rate'],
+               'misperception_rate': parameters['misperception_rate'],
+               'continuation_probability': parameters['continuation_probability']}
+    schedule = schedule_from_description(parameters['schedule'])
+
+    checked = record['pairings']
+    if sample is not None and sample < len(checked):
+        checked = sorted(random.Random(seed).sample(checked, sample), key=lambda entry: (entry['tournament'],
+                                                                                          entry['pairing']))
+
+    mismatches = []
+    batches = {}
+    for entry in checked:
+        tournament_num, index = entry['tournament'], entry['pairing']
+        bots = create_bots(parameters['bot_names'], parameters['num_learners'], schedule,
+                           parameters.get('replay_capacity', 0))
+        pairings = [(number, i, j) for number, (i, j) in
+                    enumerate((i, j) for i in range(len(bots)) for j in range(i + 1, len(bots)))]
+        _, i, j = pairings[index]
+
+        if engine == ENGINE_COMPILED and learner_batch.supports_pairing(bots[i], bots[j]):
+            # The batch trains all learner pairings of the tournament with one generator
+            if tournament_num not in batches:
+                results = _play_learner_pairings_batched(bots, pairings, rounds, iterations, tournament_num,
+                                                         seed, options, {})
+                batches[tournament_num] = {number: digest_pairing(results[number], bots[a], bots[b])
+                                           for number, a, b in pairings if number in results}
+            actual = batches[tournament_num][index]
+        else:
+            round_stats = play_pairing_of_run(parameters, seed, tournament_num, index, bots)
+            actual = digest_pairing(round_stats, bots[i], bots[j])
+
+        matches = actual == entry['digest']
+        if verbose:
+            print(f"Tournament {tournament_num}, {' vs '.join(entry['bots'])}: {'ok' if matches else 'MISMATCH'}")
+        if not matches:
+            mismatches.append({**entry, 'actual': actual})
+    return mismatches
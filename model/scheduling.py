@@ -0,0 +1,135 @@
+"""
+Cost-model-driven scheduling of the pairings of a parallel run.
+
+Pairings differ in cost by an order of magnitude: a Q-learning agent updates its Q-table
+and may log every turn, while two strategy bots only look up their next moves. A
+PairingCostModel estimates the seconds a pairing takes from its expected number of
+turns and the seconds per turn of its kind (the engine, the bot types and whether it
+is logged). Kinds that have been timed use their measured seconds per turn; others use
+a prior, scaled by how far the measured kinds are off their priors on this machine.
+Timings are recorded as pairings complete, so later tournaments of a run are planned
+from the earlier ones, and run_round_robin keeps them in pairing_costs.json for the
+next run.
+
+plan_chunks orders the pairings longest-first and groups them into chunks by guided
+self-scheduling: each chunk takes about the remaining work / (2 * workers), and at least
+PAIRING_MIN_CHUNK_SECONDS. Expensive pairings go out first, one per chunk, and cheap
+ones follow in chunks that shrink towards the end, so that the last worker to finish
+ends close to total work / workers.
+"""
+import json
+import os
+import statistics
+from typing import Dict, List, Optional
+
+from model.QLearningAgent import QLearningAgent
+from model.constants import *
+from model.tournamentManager import ENGINE_PYTHON, ENGINE_COMPILED
+
+# Prior seconds per turn by engine and number of learning sides, and added per logged
+# learning side. Compiled learner-vs-learner pairings are batched rather than scheduled
+PRIOR_TURN_SECONDS = {ENGINE_PYTHON: (2.7e-6, 6.3e-6, 10e-6), ENGINE_COMPILED: (0.9e-6, 0.12e-6, 10e-6)}
+PRIOR_LOG_SECONDS = 4.5e-6
+
+# Weight of a new timing against what is known of its kind
+SMOOTHING = 0.5
+
+
+def pairing_kind(bot1, bot2, engine: str, logged: bool) -> str:
+    """The key pairings are timed by: engine, logging and the bot types, in sorted order"""
+    learners = [bot for bot in (bot1, bot2) if isinstance(bot, QLearningAgent)]
+    # Agents that replay always play on the Python engine
+    if any(learner.replay_capacity for learner in learners):
+        engine = ENGINE_PYTHON
+    logged = logged and bool(learners)
+    types = sorted(type(bot).__name__ for bot in (bot1, bot2))
+    return f"{engine}:{'logged' if logged else 'silent'}:{types[0]}:{types[1]}"
+
+
+def expected_turns(rounds: int, iterations: int, continuation_probability: Optional[float] = None) -> float:
+    if continuation_probability is not None:
+        return rounds / (1 - continuation_probability)
+    return rounds * iterations
+
+
+class PairingCostModel:
+    """
+    Attributes:
+        turn_seconds (Dict[str, float]): The measured seconds per turn of every timed kind
+    """
+
+    def __init__(self, turn_seconds: Optional[Dict[str, float]] = None):
+        self.turn_seconds = dict(turn_seconds or {})
+
+    @classmethod
+    def load(cls, path: str) -> "PairingCostModel":
+        """The timings saved in path, or none if there is no such file"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as file:
+            return cls(json.load(file)['turn_seconds'])
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump({'turn_seconds': self.turn_seconds}, file, indent=2, sort_keys=True)
+
+    @staticmethod
+    def prior(kind: str) -> float:
+        engine, logging, type1, type2 = kind.split(":")
+        learners = [type1, type2].count(QLearningAgent.__name__)
+        return PRIOR_TURN_SECONDS[engine][learners] + (PRIOR_LOG_SECONDS * learners if logging == 'logged' else 0)
+
+    def calibration(self) -> float:
+        """How much slower than its priors this machine played the kinds timed so far"""
+        if not self.turn_seconds:
+            return 1.0
+        return statistics.median(seconds / self.prior(kind) for kind, seconds in self.turn_seconds.items())
+
+    def seconds_per_turn(self, kind: str) -> float:
+        if kind in self.turn_seconds:
+            return self.turn_seconds[kind]
+        return self.prior(kind) * self.calibration()
+
+    def estimate(self, kind: str, turns: float) -> float:
+        """The estimated seconds of a pairing of a kind playing the given number of turns"""
+        return turns * self.seconds_per_turn(kind)
+
+    def record(self, kind: str, turns: int, seconds: float) -> None:
+        """Adds the timing of a completed pairing"""
+        if turns <= 0:
+            return
+        measured = seconds / turns
+        known = self.turn_seconds.get(kind)
+        self.turn_seconds[kind] = measured if known is None else (1 - SMOOTHING) * known + SMOOTHING * measured
+
+
+def plan_chunks(costs: List[float], workers: int, min_chunk: float = PAIRING_MIN_CHUNK_SECONDS) -> List[List[int]]:
+    """
+    Orders the positions of costs longest-first and splits them into chunks of guided
+    self-scheduling, to be handed out to workers in order.
+
+    Returns: List[List[int]]: The positions in costs of the pairings of every chunk
+    """
+    order = sorted(range(len(costs)), key=lambda position: -costs[position])
+    remaining = sum(costs)
+    chunks = []
+    position = 0
+    while position < len(order):
+        target = max(remaining / (2 * workers), min_chunk)
+        chunk = []
+        chunk_cost = 0.0
+        while position < len(order) and (not chunk or chunk_cost + costs[order[position]] <= target):
+            chunk.append(order[position])
+            chunk_cost += costs[order[position]]
+            position += 1
+        remaining -= chunk_cost
+        chunks.append(chunk)
+    return chunks
+
+
+def estimate_pairing_costs(bots, pairings, rounds: int, iterations: int, options: Dict, logged: bool,
+                           cost_model: PairingCostModel) -> List[float]:
+    """The estimated seconds of every (index, i, j) pairing, in the order given"""
+    turns = expected_turns(rounds, iterations, options.get('continuation_probability'))
+    return [cost_model.estimate(pairing_kind(bots[i], bots[j], options['engine'], logged), turns)
+            for _, i, j in pairings]
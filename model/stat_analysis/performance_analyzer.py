@@ -1,13 +1,16 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from typing import List, Dict
-from model.constants import TOTAL_PAYOFF, COOPERATE_COUNT, DEFECT_COUNT, MATCHES_PLAYED
+from model.constants import TOTAL_PAYOFF, COOPERATE_COUNT, DEFECT_COUNT, MATCHES_PLAYED, OUTPUT_DIR, CURVE_PLOT_POINTS
 
 class PerformanceAnalyzer:
-    def __init__(self, tournament_stats: List[Dict], aggregate_stats: Dict):
+    def __init__(self, tournament_stats: List[Dict], aggregate_stats: Dict,
+                 output_dir: str = OUTPUT_DIR, show: bool = True):
         self.tournament_stats = tournament_stats
         self.aggregate_stats = aggregate_stats
-        self.output_dir = "analysis_output"  # Directory for saving plots
+        self.output_dir = output_dir  # Directory for saving plots
+        self.show = show  # Whether to display the plots after saving them
         
         # Create output directory if it doesn't exist
         import os
@@ -16,26 +19,28 @@ class PerformanceAnalyzer:
 
     def analyze_all(self):
         """Run all analyses and save plots"""
-        # Create a single figure with two subplots
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 12))
+        # Create a single figure with two subplots. Only a figure that is shown goes through
+        # pyplot; one that is only saved needs no backend, so it can be drawn on any thread.
+        fig = plt.figure(figsize=(10, 12)) if self.show else Figure(figsize=(10, 12))
+        ax1, ax2 = fig.subplots(2, 1)
         
         # Create the bar chart in first subplot
-        plt.sca(ax1)  # Set current axes to first subplot
-        self.analyze_qlearning_vs_strategies()
+        self.analyze_qlearning_vs_strategies(ax1)
         
         # Create the cooperation rates chart in second subplot
-        plt.sca(ax2)  # Set current axes to second subplot
-        self.analyze_cooperation_rates()
+        self.analyze_cooperation_rates(ax2)
         
         # Save the combined figure
-        plt.tight_layout()
-        plt.savefig(f'{self.output_dir}/analysis_results.png')
-        plt.show()
-        plt.close()
+        fig.tight_layout()
+        fig.savefig(f'{self.output_dir}/analysis_results.png')
+        if self.show:
+            plt.show()
+            plt.close(fig)
 
-    def analyze_qlearning_vs_strategies(self):
+    def analyze_qlearning_vs_strategies(self, ax=None):
         """
-        Creates a bar chart comparing QLearningAgent's average payoff against different strategies.
+        Creates a bar chart comparing QLearningAgent's average payoff against different strategies,
+        on the given axes or else the current ones.
         """
         print("\nAnalyzing QLearningAgent vs Strategies:")
         
@@ -66,24 +71,26 @@ class PerformanceAnalyzer:
         opponents = list(avg_payoffs.keys())
         payoffs = list(avg_payoffs.values())
         
-        bars = plt.bar(opponents, payoffs)
+        ax = ax if ax is not None else plt.gca()
+        bars = ax.bar(opponents, payoffs)
         
         # Add value labels on top of each bar
         for bar in bars:
             height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{height:.2f}',
-                    ha='center', va='bottom')
+            ax.text(bar.get_x() + bar.get_width()/2., height,
+                   f'{height:.2f}',
+                   ha='center', va='bottom')
         
-        plt.title('QLearningAgent Average Payoff per Match vs Different Strategies')
-        plt.xlabel('Opponent Strategy')
-        plt.ylabel('Average Payoff per Match')
-        plt.ylim(0, 5.5)  # Set y-axis limits based on payoff matrix
-        plt.xticks(rotation=45)
+        ax.set_title('QLearningAgent Average Payoff per Match vs Different Strategies')
+        ax.set_xlabel('Opponent Strategy')
+        ax.set_ylabel('Average Payoff per Match')
+        ax.set_ylim(0, 5.5)  # Set y-axis limits based on payoff matrix
+        ax.tick_params(axis='x', labelrotation=45)
 
-    def analyze_cooperation_rates(self):
+    def analyze_cooperation_rates(self, ax=None):
         """
-        Creates a bar chart comparing cooperation rates between bots.
+        Creates a bar chart comparing cooperation rates between bots, on the given axes or else
+        the current ones.
         """
         bot_names = list(self.aggregate_stats.keys())
         coop_rates = []
@@ -95,16 +102,159 @@ class PerformanceAnalyzer:
                         if total_actions > 0 else 0)
             coop_rates.append(coop_rate)
         
-        bars = plt.bar(bot_names, coop_rates)
+        ax = ax if ax is not None else plt.gca()
+        bars = ax.bar(bot_names, coop_rates)
         
         # Add value labels on top of each bar
         for bar in bars:
             height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{height:.1f}%',
-                    ha='center', va='bottom')
+            ax.text(bar.get_x() + bar.get_width()/2., height,
+                   f'{height:.1f}%',
+                   ha='center', va='bottom')
         
-        plt.title('Cooperation Rates by Bot')
-        plt.xlabel('Bot')
-        plt.ylabel('Cooperation Rate (%)')
-        plt.xticks(rotation=45)
+        ax.set_title('Cooperation Rates by Bot')
+        ax.set_xlabel('Bot')
+        ax.set_ylabel('Cooperation Rate (%)')
+        ax.tick_params(axis='x', labelrotation=45)
+
+
+def analyze_scaling(results: List[Dict], output_dir: str = OUTPUT_DIR, show: bool = True):
+    """
+    Plots the results of benchmarks/bench_scaling.py into scaling_results.png: how wall time,
+    throughput, memory and output grow with the number of bots, rounds and iterations, and
+    the strong- and weak-scaling efficiency over the worker counts. Throughput that falls as
+    the problem grows points at a super-linear cost.
+    """
+    import os
+    os.makedirs(output_dir, exist_ok=True)
+    by_study = {}
+    for result in results:
+        by_study.setdefault(result['study'], []).append(result)
+
+    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(14, 10))
+
+    bots = sorted(by_study.get('bots', []), key=lambda result: result['bots'])
+    if bots:
+        sizes = [result['bots'] for result in bots]
+        ax1.loglog(sizes, [result['wall_time'] for result in bots], 'o-', label='wall time (s)')
+        # Pairings grow as N(N - 1) / 2, so this is the expected slope
+        first = bots[0]
+        ax1.loglog(sizes, [first['wall_time'] * n * (n - 1) / (first['bots'] * (first['bots'] - 1)) for n in sizes],
+                   '--', color='grey', label='∝ pairings')
+        ax1_rate = ax1.twinx()
+        ax1_rate.semilogx(sizes, [result['turns_per_sec'] for result in bots], 's-', color='tab:orange',
+                          label='turns/s')
+        ax1_rate.set_ylabel('Turns/s')
+        ax1.set_xlabel('Bots')
+        ax1.set_ylabel('Wall time (s)')
+        lines, labels = ax1.get_legend_handles_labels()
+        rate_lines, rate_labels = ax1_rate.get_legend_handles_labels()
+        ax1.legend(lines + rate_lines, labels + rate_labels, loc='upper left')
+
+        ax3.semilogx(sizes, [result['peak_rss_mb'] for result in bots], 'o-', label='peak RSS (MB)')
+        ax3.semilogx(sizes, [result['output_bytes'] / 2 ** 20 for result in bots], 's-', label='output (MB)')
+        ax3.set_xlabel('Bots')
+        ax3.set_ylabel('MB')
+        ax3.legend()
+    ax1.set_title('Problem size')
+    ax3.set_title('Memory and output')
+
+    for study in ('rounds', 'iterations'):
+        runs = sorted(by_study.get(study, []), key=lambda result: result[study])
+        if runs:
+            ax2.semilogx([result[study] for result in runs], [result['turns_per_sec'] for result in runs], 'o-',
+                         label=study)
+    ax2.set_title('Throughput by game count and length')
+    ax2.set_xlabel('Rounds / iterations')
+    ax2.set_ylabel('Turns/s')
+    if by_study.get('rounds') or by_study.get('iterations'):
+        ax2.legend()
+
+    for study, label in (('strong', 'strong scaling speedup'), ('weak', 'weak scaling efficiency')):
+        runs = sorted(by_study.get(study, []), key=lambda result: result['workers'])
+        if runs:
+            # Strong scaling keeps the work fixed, weak scaling grows it with the workers;
+            # either way the ratio to the single-worker time is what is plotted
+            base = runs[0]['wall_time']
+            ax4.plot([result['workers'] for result in runs], [base / result['wall_time'] for result in runs],
+                     'o-', label=label)
+    strong = by_study.get('strong', [])
+    if strong:
+        workers = sorted(result['workers'] for result in strong)
+        ax4.plot(workers, workers, '--', color='grey', label='ideal speedup')
+    ax4.axhline(1.0, linestyle=':', color='grey')
+    ax4.set_title('Workers')
+    ax4.set_xlabel('Workers')
+    ax4.set_ylabel('Speedup / efficiency')
+    if strong or by_study.get('weak'):
+        ax4.legend()
+
+    plt.tight_layout()
+    plt.savefig(f'{output_dir}/scaling_results.png')
+    if show:
+        plt.show()
+    plt.close()
+
+
+def plot_learning_curves(candidates: List[Dict], best: Dict, output_dir: str = OUTPUT_DIR, show: bool = True):
+    """
+    Plots the learning curves of a hyperparameter search into learning_curves.png: the
+    average payoff per turn in every round of every candidate, as far as it got, with the
+    best configuration highlighted. Curves that end early were dropped at that rung.
+    """
+    import os
+    os.makedirs(output_dir, exist_ok=True)
+    fig, ax = plt.subplots(figsize=(12, 7))
+    for candidate in candidates:
+        if candidate is not best:
+            ax.plot(range(1, len(candidate['curve']) + 1), candidate['curve'], color='grey', alpha=0.3, linewidth=0.8)
+    ax.plot(range(1, len(best['curve']) + 1), best['curve'], color='tab:blue', linewidth=1.5,
+            label=f"best: α={best['learning_rate']:.3g}, γ={best['discount_factor']:.4g}, "
+                  f"ε₀={best['exploration_rate']:.3g}, decay={best['decay_rate']:.4g}")
+    ax.set_title('Learning curves of the hyperparameter search')
+    ax.set_xlabel('Round')
+    ax.set_ylabel('Average payoff per turn')
+    ax.legend(loc='lower right')
+    plt.tight_layout()
+    plt.savefig(f'{output_dir}/learning_curves.png')
+    if show:
+        plt.show()
+    plt.close()
+
+
+def plot_q_value_curves(store, output_dir: str = OUTPUT_DIR, show: bool = True, max_points: int = CURVE_PLOT_POINTS):
+    """
+    Plots the learning curves of a LearningCurveStore into qlearning_curves.png: the
+    Q-values, exploration rate, cooperation rate and reward of every agent against every
+    opponent by logged turn, each at the resolution that draws at most max_points buckets. Lines
+    are the mean of every bucket, and bands its min to max for the Q-values and exploration rate.
+    """
+    import os
+    os.makedirs(output_dir, exist_ok=True)
+    panels = [('Q-values', ['q_value_cooperate', 'q_value_defect']), ('Exploration rate', ['exploration_rate']),
+              ('Cooperation rate', ['cooperation']), ('Reward', ['reward'])]
+    fig, axes = plt.subplots(len(panels), 1, figsize=(12, 4 * len(panels)), sharex=True)
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    for number, (agent, opponent) in enumerate(store.keys):
+        curve = store.read(agent, opponent, max_points=max_points)
+        color = colors[number % len(colors)]
+        for ax, (title, series_names) in zip(axes, panels):
+            for series, linestyle in zip(series_names, ['-', '--']):
+                label = f"{agent} vs {opponent}"
+                if len(series_names) > 1:
+                    label += " (cooperate)" if series == 'q_value_cooperate' else " (defect)"
+                ax.plot(curve['turn'], curve[f"{series}_mean"], color=color, linestyle=linestyle,
+                        linewidth=1, label=label)
+                # Cooperation and reward jump between a few values every turn, so their
+                # bands would span the whole axis
+                if series not in ('cooperation', 'reward'):
+                    ax.fill_between(curve['turn'], curve[f"{series}_min"], curve[f"{series}_max"],
+                                    color=color, alpha=0.15, linewidth=0)
+            ax.set_title(title)
+    axes[0].legend(loc='upper left', fontsize='small', ncol=2)
+    axes[-1].set_xlabel('Logged turn')
+    plt.tight_layout()
+    plt.savefig(f'{output_dir}/qlearning_curves.png')
+    if show:
+        plt.show()
+    plt.close()
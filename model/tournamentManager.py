@@ -1,22 +1,125 @@
+import itertools
+import math
+import os
+import random
+import time
+
+from model.ExplorationSchedule import describe_schedule, schedule_from_description
 from model.QLearningAgent import QLearningAgent
-from model.bots.BaseBot import BaseBot
+from model.bots.BaseBot import BaseBot, get_bot_name, is_remote
 from model.bots.TFTBot import TFTBot
 from model.bots.DefectBot import DefectBot
 from model.bots.CooperateBot import CooperateBot
 from model.bots.GrimBot import GrimBot
 from model.bots.TFT90Bot import TFT90Bot
 from model.constants import *
-from model.logging.InteractionLogger import InteractionLogger
+from model.logging.InteractionLogger import InteractionLogger, LOG_FULL, LOG_NONE
 from model.logging.csv_export import export_tournament_stats
-from model.stat_analysis.performance_analyzer import PerformanceAnalyzer
+from model.logging.json_export import export_tournament_stats_json
+from model.logging.ResultsPipeline import PairingResult, TournamentResult
+from model.logging.SymbolTable import SymbolTable
+
+OUTPUT_FORMATS = ("csv", "json")
+
+# Simulation engines: the plain Python game loop, or the whole-game kernel where it applies
+ENGINE_PYTHON = "python"
+ENGINE_COMPILED = "compiled"
+ENGINES = (ENGINE_PYTHON, ENGINE_COMPILED)
+
+BOT_TYPES = {
+    "QLearningAgent": QLearningAgent,
+    "TFTBot": TFTBot,
+    "DefectBot": DefectBot,
+    "CooperateBot": CooperateBot,
+    "GrimBot": GrimBot,
+    "TFT90Bot": TFT90Bot,
+}
+
+# Fields of every turn in the batches of a GameStream: executed moves and payoffs
+TURN_FIELDS = ('turn', 'bot1_action', 'bot2_action', 'bot1_reward', 'bot2_reward')
+
+
+class GameStream:
+    """
+    One game of a pairing, played as its turns are read.
+
+    Attributes:
+        number (int): The game's number, as logged
+        length (int): The number of turns the game lasts
+    """
+
+    def __init__(self, number: int, length: int, batches):
+        self.number = number
+        self.length = length
+        self._batches = batches
+
+    def turns(self):
+        """Plays the rest of the game, yielding its turns in lists of TURN_FIELDS tuples"""
+        yield from self._batches
+
+    def finish(self) -> None:
+        """Plays whatever is left of the game without handing out its turns"""
+        for _ in self._batches:
+            pass
+
+
+class PairingStream:
+    """
+    One pairing of a streamed round robin, played as its games are read.
+
+    Attributes:
+        tournament_num (int): The tournament the pairing is part of
+        index (int): The pairing's position in the tournament
+        bot_names (tuple[str, str]): The two bots
+        stats (Dict): The stats of both bots over the games played so far
+    """
+
+    def __init__(self, tournament_num: int, index: int, bot_names: tuple, start_games):
+        self.tournament_num = tournament_num
+        self.index = index
+        self.bot_names = bot_names
+        self.stats = {}
+        self._start_games = start_games
+        self._games = None
+
+    def games(self):
+        """Yields a GameStream for every game, starting the pairing on first use"""
+        if self._games is None:
+            self._games = self._start_games(self.stats)
+        yield from self._games
 
+    def play(self) -> dict:
+        """Plays every game left, returning the stats of the whole pairing"""
+        for game in self.games():
+            game.finish()
+        return self.stats
 
-def play_game(bot1, bot2, discount_factor, logger, game_number, stats):
+
+def play_game(bot1, bot2, discount_factor, logger, game_number, stats,
+              iterations=ITERATIONS, tournament_num=1,
+              error_rate=ERROR_RATE, misperception_rate=MISPERCEPTION_RATE, history=None):
     """
     Simulates a game between two bots and returns the winner based on total payoff.
+
+    With noise, each chosen move is flipped with probability error_rate before the payoff
+    is looked up, and each bot sees the other's executed move flipped with probability
+    misperception_rate. Stats and payoffs count executed moves; bots respond to and learn
+    from what they perceived. The executed moves of every turn are recorded in the
+    HistoryBuffer history, if given.
     """
-    bot1_name = type(bot1).__name__
-    bot2_name = type(bot2).__name__
+    for _ in game_turns(bot1, bot2, logger, game_number, stats, iterations, tournament_num,
+                        error_rate, misperception_rate, history):
+        pass
+
+def game_turns(bot1, bot2, logger, game_number, stats, iterations=ITERATIONS, tournament_num=1,
+               error_rate=ERROR_RATE, misperception_rate=MISPERCEPTION_RATE, history=None, batch_size=None):
+    """
+    The game loop of play_game, as a generator: with a batch_size, it yields the turns
+    in lists of up to batch_size TURN_FIELDS tuples as they are played. Without, it
+    plays the whole game and yields nothing.
+    """
+    bot1_name = get_bot_name(bot1)
+    bot2_name = get_bot_name(bot2)
     
     # Initialize stats for both bots
     initialize_bot_stats(stats, bot1_name)
@@ -28,11 +131,16 @@ def play_game(bot1, bot2, discount_factor, logger, game_number, stats):
     
     bot1_last_action = None
     bot2_last_action = None
+    log_game = logger is not None and logger.should_log(game_number)
+    moves = []
+    batch = [] if batch_size else None
 
-    for iteration in range(ITERATIONS): 
-        # Both bots choose their actions
-        bot1_action = bot1.choose_action(bot2_name, bot2_last_action)
-        bot2_action = bot2.choose_action(bot1_name, bot1_last_action)
+    for iteration in range(iterations): 
+        # Both bots choose their actions, which may be misexecuted
+        bot1_action = apply_noise(bot1.choose_action(bot2_name, bot2_last_action), error_rate)
+        bot2_action = apply_noise(bot2.choose_action(bot1_name, bot1_last_action), error_rate)
+        if history is not None:
+            moves.append(joint_action(bot1_action, bot2_action))
         
         # Update statistics
         update_bot_stats(stats, bot1_name, bot1_action)
@@ -42,111 +150,703 @@ def play_game(bot1, bot2, discount_factor, logger, game_number, stats):
         bot1_reward, bot2_reward = calculate_and_update_payoffs(
             stats, bot1_name, bot2_name, bot1_action, bot2_action)
         
-        # Get current Q-values for logging
+        # What each bot perceives of the other's move
+        bot1_action_seen = apply_noise(bot1_action, misperception_rate)
+        bot2_action_seen = apply_noise(bot2_action, misperception_rate)
+
+        # Both sides learn if they are Q-learning agents
         if isinstance(bot1, QLearningAgent):
-            q_table = bot1.get_qtable_for_opponent(bot2_name)
-            current_q_values = get_current_q_values(q_table, bot2_last_action)
-            
-            # Log the interaction
-            logger.log_interaction(
-                tournament_num=1,
-                round_num=game_number,
-                turn_num=iteration,
-                agent_name=bot1_name,
-                opponent_name=bot2_name,
-                state=str(bot2_last_action if bot2_last_action is not None else COOPERATE),
-                action_taken=bot1_action,
-                reward=bot1_reward,
-                q_values=current_q_values,
-                exploration_rate=bot1.get_exploration_rate(bot2_name)
-            )
-
-            # Update the agent's Q-table
-            bot1.update_q_value(
-                opponent_name=bot2_name,
-                state=bot2_last_action if bot2_last_action is not None else COOPERATE,
-                action=bot1_action,
-                reward=bot1_reward,
-                next_state=bot2_action
-            )
-
-        # Update last actions
-        bot1_last_action = bot1_action
-        bot2_last_action = bot2_action
-
-def run_round_robin():
-    """
-    Runs a round-robin tournament where each bot plays against every other bot.
-    """
-    # Create all bots
-    bots = [
-        QLearningAgent(),
-        TFTBot(),
-        DefectBot(),
-        CooperateBot(),
-        GrimBot(),
-        TFT90Bot()
-    ]
-    
-    logger = InteractionLogger()
+            learn_from_turn(bot1, bot1_name, bot2_name, bot2_last_action, bot1_action, bot1_reward,
+                            bot2_action_seen, logger if log_game else None, game_number, iteration, tournament_num)
+        if isinstance(bot2, QLearningAgent):
+            learn_from_turn(bot2, bot2_name, bot1_name, bot1_last_action, bot2_action, bot2_reward,
+                            bot1_action_seen, logger if log_game else None, game_number, iteration, tournament_num)
+
+        # Update last actions, as the opponent perceived them
+        bot1_last_action = bot1_action_seen
+        bot2_last_action = bot2_action_seen
+
+        if batch is not None:
+            batch.append((iteration, bot1_action, bot2_action, bot1_reward, bot2_reward))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+
+    if history is not None:
+        history.record_game(moves)
+    if batch:
+        yield batch
+
+def learn_from_turn(agent, agent_name, opponent_name, opponent_last_action, action, reward,
+                    opponent_action, logger, game_number, iteration, tournament_num) -> None:
+    """
+    Logs the agent's view of one turn (when a logger is given) and updates its Q-table,
+    with the opponent's action as the next state.
+    """
+    if logger is not None:
+        # Get current Q-values for logging
+        q_table = agent.get_qtable_for_opponent(opponent_name)
+        current_q_values = get_current_q_values(q_table, opponent_last_action)
+
+        # Log the interaction
+        logger.log_interaction(
+            tournament_num=tournament_num,
+            round_num=game_number,
+            turn_num=iteration,
+            agent_name=agent_name,
+            opponent_name=opponent_name,
+            state=opponent_last_action if opponent_last_action is not None else COOPERATE,
+            action_taken=action,
+            reward=reward,
+            q_values=current_q_values,
+            exploration_rate=agent.get_exploration_rate(opponent_name)
+        )
+
+    # Update the agent's Q-table
+    agent.update_q_value(
+        opponent_name=opponent_name,
+        state=opponent_last_action if opponent_last_action is not None else COOPERATE,
+        action=action,
+        reward=reward,
+        next_state=opponent_action
+    )
+
+def play_pairing(bot1, bot2, rounds, iterations, logger, first_game_number, tournament_num=1,
+                 engine=ENGINE_PYTHON, error_rate=ERROR_RATE, misperception_rate=MISPERCEPTION_RATE,
+                 continuation_probability=CONTINUATION_PROBABILITY, history=None) -> dict:
+    """
+    Plays all rounds between two bots, decaying exploration rates after each round.
+    See play_game for the noise rates. The length of every game is drawn up front
+    by sample_game_lengths, so all engines play the same horizons. Every engine records
+    its games in the HistoryBuffer history, if given.
+
+    With the compiled engine, a QLearningAgent against a bot with an FSM form runs through
+    the whole-game kernel, and two FSM bots play all rounds together in the lock-step FSM
+    engine. Neither logs per-turn interactions. On any engine, a RemoteBot against a bot
+    that does not learn plays all rounds together in pipelined batches of moves, see
+    model/remote.py.
+
+    Returns: dict: The stats of both bots over all rounds of this pairing
+    """
+    lengths = sample_game_lengths(rounds, continuation_probability, iterations)
+    if is_remote(bot1) or is_remote(bot2):
+        from model import remote
+        if remote.supports_pairing(bot1, bot2):
+            return remote.play_pairing_batched(bot1, bot2, lengths, error_rate, misperception_rate, history)
+    if engine == ENGINE_COMPILED:
+        from model.engine import qlearning_kernel, fsm_engine
+        if qlearning_kernel.supports_pairing(bot1, bot2) or fsm_engine.supports_pairing(bot1, bot2):
+            import numpy as np
+            rng = np.random.default_rng(random.getrandbits(64))
+            if fsm_engine.supports_pairing(bot1, bot2):
+                round_stats = fsm_engine.play_pairing_batched(bot1, bot2, lengths, rng,
+                                                              error_rate, misperception_rate, history)
+            else:
+                round_stats = qlearning_kernel.play_pairing_compiled(bot1, bot2, lengths, rng,
+                                                                     error_rate, misperception_rate, history)
+            return round_stats
+
+    round_stats = {}
+    for _ in iter_games(bot1, bot2, lengths, logger, first_game_number, round_stats, tournament_num,
+                        error_rate, misperception_rate, history):
+        pass
+    return round_stats
+
+def iter_games(bot1, bot2, lengths, logger, first_game_number, stats, tournament_num=1,
+               error_rate=ERROR_RATE, misperception_rate=MISPERCEPTION_RATE, history=None, batch_size=None):
+    """
+    Yields a GameStream for every game of a pairing, one game length each, on the Python
+    engine. Each game is played as its turns are read, and to its end once the next one
+    is asked for; stats add up over all games played.
+    """
+    game_number = first_game_number
+    for game_length in lengths:
+        game = GameStream(game_number, game_length,
+                          game_turns(bot1, bot2, logger, game_number, stats, game_length, tournament_num,
+                                     error_rate, misperception_rate, history, batch_size))
+        yield game
+        game.finish()
+        game_number += 1
+
+        # Decay exploration rates using helper function
+        handle_exploration_decay(bot1, bot2)
+
+        # Reset bots at the end of each round, so every game starts from the bot's initial state
+        reset_bots(bot1, bot2)
+
+def simulate_round_robin(bots=None, logger=None, rounds=ROUNDS, iterations=ITERATIONS,
+                         num_tournaments=1, workers=1, seed=None, bot_names=None, engine=ENGINE_PYTHON,
+                         num_learners=0, error_rate=ERROR_RATE, misperception_rate=MISPERCEPTION_RATE,
+                         continuation_probability=CONTINUATION_PROBABILITY, history=None, schedule=None,
+                         pipeline=None, digests=None, replay_capacity=0, curves=None, cost_model=None):
+    """
+    Plays the round-robin tournament without producing any outputs, consuming
+    iter_round_robin.
+
+    This is the simulation-only entry point used by workers: it does not touch
+    matplotlib or pandas, and skips per-turn logging when no logger is given.
+    Every tournament starts from freshly created bots unless explicit bots are given.
+    With a seed, each pairing is seeded on its own, so the results do not depend
+    on the number of workers. Pairings of two Q-learning agents update both sides, and
+    with the compiled engine they are all trained together in one batch. With a
+    HistoryStore as history, every game of every pairing is appended to it, and with a
+    LearningCurveStore as curves, every logged turn of the Q-learning agents. Created
+    Q-learning agents follow the given ExplorationSchedule, if any, and replay their
+    transitions from rings of replay_capacity, if not 0.
+
+    With a ResultsPipeline, every pairing is published as soon as it completes, together
+    with its logged interactions and history buffer, instead of being added to the logger,
+    the history and the curves here; the stats so far are published after every tournament.
+
+    With workers, the pairings are handed out longest-first as planned from the
+    PairingCostModel cost_model, which learns how long they take as they complete.
+    Pairings may complete in any order, but their stats are always added up in pairing
+    order. With a dict as digests, the bot names and the digest of every pairing's stats
+    and learned state are added to it by (tournament, pairing), see model/reproducibility.py.
+
+    Returns: tuple[list, dict]: The per-match stats and the aggregate stats
+    """
     tournament_stats = []
     aggregate_stats = {}
-    game_number = 0
-    
-    # Each bot plays against every other bot
-    for i in range(len(bots)):
-        for j in range(i + 1, len(bots)):  # Start from i+1 to avoid playing against self
-            bot1 = bots[i]
-            bot2 = bots[j]
-            
-            print(f"\nMatch: {type(bot1).__name__} vs {type(bot2).__name__}")
-            
-            # Play multiple rounds between these two bots
-            round_stats = {}
-            for round in range(ROUNDS):
-                play_game(bot1, bot2, DISCOUNT_FACTOR, logger, game_number, round_stats)
-                game_number += 1
-                
-                # Decay exploration rates using helper function
-                handle_exploration_decay(bot1, bot2, DECAY_RATE)
-            
+    played = {}
+    for result in iter_round_robin(bots, logger, rounds, iterations, num_tournaments, workers, seed, bot_names,
+                                   engine, num_learners, error_rate, misperception_rate, continuation_probability,
+                                   history, schedule, digests, replay_capacity, cost_model):
+        if pipeline is not None:
+            pipeline.publish(result)
+        if isinstance(result, TournamentResult):
+            # The history is written in pairing order
+            for index in sorted(played):
+                history.write(played[index])
+            played = {}
+            tournament_stats, aggregate_stats = result.tournament_stats, result.aggregate_stats
+        elif pipeline is None:
+            if history is not None:
+                played[result.index] = result.history
+            if logger is not None and result.log is not None:
+                logger.extend(result.log)
+                if curves is not None:
+                    curves.append_log(result.log)
+
+    return tournament_stats, aggregate_stats
+
+def iter_round_robin(bots=None, logger=None, rounds=ROUNDS, iterations=ITERATIONS,
+                     num_tournaments=1, workers=1, seed=None, bot_names=None, engine=ENGINE_PYTHON,
+                     num_learners=0, error_rate=ERROR_RATE, misperception_rate=MISPERCEPTION_RATE,
+                     continuation_probability=CONTINUATION_PROBABILITY, history=None, schedule=None,
+                     digests=None, replay_capacity=0, cost_model=None):
+    """
+    Plays the round-robin tournament as a generator: every pairing is yielded as a
+    PairingResult as soon as it completes, with the pairing logger holding its logged
+    interactions, if logger is given, and its buffer of the HistoryStore history, if
+    given. Once all pairings of a tournament have completed, the stats of all
+    tournaments so far follow as a TournamentResult. Nothing is played until the next
+    result is asked for, so a consumer can stop the run early; see simulate_round_robin
+    for the options.
+    """
+    tournament_stats = []
+    aggregate_stats = {}
+    # One copy of every bot name, shared by the stats and the log
+    bot_names_table = logger.bots if logger is not None else SymbolTable()
+    # Options every pairing is played with
+    options = {'engine': engine, 'error_rate': error_rate, 'misperception_rate': misperception_rate,
+               'continuation_probability': continuation_probability}
+    if workers > 1 and cost_model is None:
+        from model.scheduling import PairingCostModel
+        cost_model = PairingCostModel()
+
+    for tournament_num in range(1, num_tournaments + 1):
+        # Create all bots
+        tournament_bots = bots if bots is not None else create_bots(bot_names, num_learners, schedule, replay_capacity)
+        pairs = [(i, j) for i in range(len(tournament_bots))
+                 for j in range(i + 1, len(tournament_bots))]  # Start from i+1 to avoid playing against self
+        pairings = [(index, i, j) for index, (i, j) in enumerate(pairs)]
+        first_game = (tournament_num - 1) * len(pairings) * rounds
+
+        # Per-pairing history buffers, written to the store in pairing order
+        histories = {}
+        if history is not None:
+            histories = {index: history.new_buffer(tournament_num, index, (get_bot_name(tournament_bots[i]),
+                                                                            get_bot_name(tournament_bots[j])))
+                         for index, i, j in pairings}
+
+        learner_results = {}
+        if engine == ENGINE_COMPILED:
+            # Learner-vs-learner pairings all train together in one batch
+            learner_results = _play_learner_pairings_batched(tournament_bots, pairings, rounds, iterations,
+                                                             tournament_num, seed, options, histories)
+        remaining = [pairing for pairing in pairings if pairing[0] not in learner_results]
+        completed = [(index, round_stats, None) for index, round_stats in learner_results.items()]
+        if workers > 1:
+            completed = itertools.chain(completed, _play_pairings_parallel(
+                tournament_bots, remaining, rounds, iterations, logger, first_game, tournament_num, seed,
+                workers, options, histories, cost_model))
+        else:
+            completed = itertools.chain(completed, _play_pairings_serial(
+                tournament_bots, remaining, rounds, iterations, logger, first_game, tournament_num, seed,
+                options, histories))
+
+        results = {}
+        for index, round_stats, pairing_logger in completed:
+            # Stats from worker processes carry their own copies of the names
+            round_stats = {bot_names_table.canonical(name): stats for name, stats in round_stats.items()}
+            results[index] = round_stats
+            if digests is not None:
+                from model.reproducibility import digest_pairing
+                _, i, j = pairings[index]
+                digests[(tournament_num, index)] = {
+                    'bots': [get_bot_name(tournament_bots[i]), get_bot_name(tournament_bots[j])],
+                    'digest': digest_pairing(round_stats, tournament_bots[i], tournament_bots[j])}
+            yield PairingResult(tournament_num, index, round_stats, pairing_logger, histories.get(index))
+
+        for index, _, _ in pairings:
             # Add round stats to tournament stats
-            tournament_stats.append(round_stats)
-            
+            tournament_stats.append(results[index])
+
             # Update aggregate stats
-            for bot_name, stats in round_stats.items():
-                if bot_name not in aggregate_stats:
-                    aggregate_stats[bot_name] = {
-                        TOTAL_PAYOFF: 0,
-                        MATCHES_PLAYED: 0,
-                        COOPERATE_COUNT: 0,
-                        DEFECT_COUNT: 0
-                    }
-                for key in [TOTAL_PAYOFF, MATCHES_PLAYED, COOPERATE_COUNT, DEFECT_COUNT]:
-                    aggregate_stats[bot_name][key] += stats[key]
-            
-            # Reset bots at the end of each round
-            reset_bots(bot1, bot2)
-    
-    # Export statistics to CSV in analysis_output directory
-    export_tournament_stats(aggregate_stats, tournament_stats, 1, 'analysis_output/tournament_stats.csv')
-    print("\nSummary statistics have been exported to analysis_output/tournament_stats.csv")
+            add_to_aggregate_stats(aggregate_stats, results[index])
+
+        yield TournamentResult(tournament_num, list(tournament_stats),
+                               {name: dict(stats) for name, stats in aggregate_stats.items()})
+
+def stream_round_robin(bots=None, logger=None, rounds=ROUNDS, iterations=ITERATIONS, num_tournaments=1,
+                       seed=None, bot_names=None, num_learners=0, error_rate=ERROR_RATE,
+                       misperception_rate=MISPERCEPTION_RATE, continuation_probability=CONTINUATION_PROBABILITY,
+                       schedule=None, replay_capacity=0, batch_size=TURN_BATCH_SIZE):
+    """
+    Plays the round-robin tournament lazily, pairing by pairing on the Python engine,
+    yielding a PairingStream for every pairing: its games() yield a GameStream for every
+    game, and their turns() lists of up to batch_size turns, each played only as it is
+    read. Logged interactions go to the logger, if given.
+
+    A pairing whose games are never read is skipped, and one left halfway stops there.
+    As every pairing is seeded on its own and only touches what the learners keep for
+    that one opponent, the pairings that are played give the same results as in
+    simulate_round_robin, whatever is skipped. Stopping the iteration stops the run.
+    """
+    for tournament_num in range(1, num_tournaments + 1):
+        tournament_bots = bots if bots is not None else create_bots(bot_names, num_learners, schedule, replay_capacity)
+        pairs = [(i, j) for i in range(len(tournament_bots)) for j in range(i + 1, len(tournament_bots))]
+        first_game = (tournament_num - 1) * len(pairs) * rounds
+        for index, (i, j) in enumerate(pairs):
+            bot1, bot2 = tournament_bots[i], tournament_bots[j]
+
+            # Bound now, so that pairings can also be played after the stream has moved on
+            def start_games(stats, bot1=bot1, bot2=bot2, tournament_num=tournament_num, index=index,
+                            first_game_number=first_game + index * rounds):
+                seed_pairing(seed, tournament_num, index)
+                lengths = sample_game_lengths(rounds, continuation_probability, iterations)
+                return iter_games(bot1, bot2, lengths, logger, first_game_number, stats, tournament_num,
+                                  error_rate, misperception_rate, batch_size=batch_size)
+
+            yield PairingStream(tournament_num, index, (get_bot_name(bot1), get_bot_name(bot2)), start_games)
+
+def run_round_robin(bot_names=None, rounds=ROUNDS, iterations=ITERATIONS, num_tournaments=1,
+                    workers=1, seed=None, log_policy=LOG_FULL, log_every=1,
+                    output_format="csv", output_dir=OUTPUT_DIR, plots=True, show_plots=True,
+                    engine=ENGINE_PYTHON, num_learners=0, error_rate=ERROR_RATE,
+                    misperception_rate=MISPERCEPTION_RATE, continuation_probability=CONTINUATION_PROBABILITY,
+                    record_history=False, schedule=None, stream=False, reproducible=False, replay_capacity=0,
+                    serve=None, record_curves=False):
+    """
+    Runs a round-robin tournament where each bot plays against every other bot,
+    then exports the statistics, plots and the detailed Q-learning log. The statistics are
+    exported twice: formatted for reading, and as typed tables with the run's parameters.
+
+    When streaming, a ResultsPipeline writes the stats of every pairing, the detailed log
+    and the history while the tournament runs, and regenerates the plots after every
+    tournament unless they are to be shown. Only the summary statistics wait for the end.
+
+    Args:
+        bot_names (List[str]): Names of the bots to enter, see BOT_TYPES. Defaults to all of them
+        rounds (int): Games played per pairing
+        iterations (int): Turns per game, unless continuation_probability is given
+        num_tournaments (int): Number of independent tournaments, each with fresh bots
+        workers (int): Number of processes the pairings are spread over, longest first as
+            estimated from the timings in pairing_costs.json in output_dir, which are
+            updated as the run goes
+        seed (int): Seed for reproducible runs
+        log_policy (str): One of LOG_POLICIES, how much of the Q-learning detail to log
+        log_every (int): With the sampled policy, log every n-th game
+        output_format (str): One of OUTPUT_FORMATS
+        output_dir (str): Directory all outputs are written to
+        plots (bool): Whether to generate the analysis plots
+        show_plots (bool): Whether to also display the plots once saved
+        engine (str): One of ENGINES
+        num_learners (int): Extra Q-learning agents to enter for self-play
+        error_rate (float): Probability that a chosen move is misexecuted
+        misperception_rate (float): Probability that a move is misperceived by the opponent
+        continuation_probability (float): Chance that a game goes on after each turn, giving
+            geometric game lengths with mean 1 / (1 - continuation_probability)
+        record_history (bool): Whether to keep every turn of every game in a HistoryStore
+            in the history directory of output_dir
+        schedule (ExplorationSchedule): How the Q-learning agents explore, by default
+            ε-greedy with ε decaying by DECAY_RATE every round
+        stream (bool): Whether to write results through the streaming pipeline as they complete
+        replay_capacity (int): Transitions each Q-learning agent keeps per opponent for
+            experience replay, 0 to learn from each transition only once
+        reproducible (bool): Whether to record the digest of every pairing in
+            reproducibility.json, for verify_run to check. Draws a seed if none is given
+        serve (str): A "host:port" to serve the pairings on as work units for workers on
+            other hosts, see model/distributed.py, with workers local worker processes
+            joining in. Draws a seed if none is given; nothing is logged or streamed
+        record_curves (bool): Whether to build multi-resolution learning curves of the
+            logged turns in a LearningCurveStore in the curves directory of output_dir, and
+            plot them
+
+    Returns: tuple[list, dict]: The per-match stats and the aggregate stats
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Output format must be one of {OUTPUT_FORMATS}")
+    if engine not in ENGINES:
+        raise ValueError(f"Engine must be one of {ENGINES}")
+    if not (0 <= error_rate <= 1 and 0 <= misperception_rate <= 1):
+        raise ValueError("Noise rates must be between 0 and 1")
+    if continuation_probability is not None and not 0 <= continuation_probability < 1:
+        raise ValueError("Continuation probability must be at least 0 and below 1")
+    if serve is not None and (reproducible or stream or record_history):
+        raise ValueError("A served run cannot be reproducible, streamed or keep the history")
+    if record_curves and (log_policy == LOG_NONE or serve is not None):
+        raise ValueError("Learning curves are built from the detailed log, which needs a log policy and a local run")
+    os.makedirs(output_dir, exist_ok=True)
+    digests = None
+    if reproducible:
+        digests = {}
+    if (reproducible or serve is not None) and seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+        print(f"{'Reproducible' if reproducible else 'Served'} run with seed {seed}")
+    # Everything needed to play the run again
+    parameters = {
+        'bot_names': bot_names, 'num_learners': num_learners, 'rounds': rounds, 'iterations': iterations,
+        'num_tournaments': num_tournaments, 'engine': engine, 'workers': workers, 'error_rate': error_rate,
+        'misperception_rate': misperception_rate, 'continuation_probability': continuation_probability,
+        'schedule': describe_schedule(schedule), 'replay_capacity': replay_capacity}
+
+    logger = InteractionLogger(policy=log_policy, every=log_every) if log_policy != LOG_NONE else None
+    cost_model = None
+    costs_file = os.path.join(output_dir, PAIRING_COSTS_FILE)
+    if workers > 1 and serve is None:
+        from model.scheduling import PairingCostModel
+        cost_model = PairingCostModel.load(costs_file)
+    history = None
+    if record_history:
+        from model.logging.HistoryStore import HistoryStore
+        history = HistoryStore(os.path.join(output_dir, HISTORY_DIR), mode="w")
+    curves = None
+    if record_curves:
+        from model.logging.LearningCurveStore import LearningCurveStore
+        curves = LearningCurveStore(os.path.join(output_dir, CURVES_DIR), mode="w")
+    log_file = os.path.join(output_dir, f"qlearning_detailed_log.{output_format}")
+    pipeline = None
+    if stream:
+        pipeline = create_results_pipeline(output_dir, output_format, log_file if logger is not None else None,
+                                           history, plots and not show_plots, curves)
+    try:
+        if serve is not None:
+            from model.distributed import run_distributed, parse_address
+            host, port = parse_address(serve)
+            print(f"Serving the pairings on {host}:{port}, run python worker.py --connect HOST:{port} to join")
+            tournament_stats, aggregate_stats = run_distributed([{**parameters, 'seed': seed}], workers, host, port)[0]
+        else:
+            tournament_stats, aggregate_stats = simulate_round_robin(
+                logger=logger, rounds=rounds, iterations=iterations, num_tournaments=num_tournaments,
+                workers=workers, seed=seed, bot_names=bot_names, engine=engine, num_learners=num_learners,
+                error_rate=error_rate, misperception_rate=misperception_rate,
+                continuation_probability=continuation_probability, history=history, schedule=schedule,
+                pipeline=pipeline, digests=digests, replay_capacity=replay_capacity, curves=curves,
+                cost_model=cost_model)
+    finally:
+        if pipeline is not None:
+            pipeline.close()
+        if curves is not None:
+            curves.close()
     
-    # Run analysis and generate visualizations
-    analyzer = PerformanceAnalyzer(tournament_stats, aggregate_stats)
-    analyzer.analyze_all()
-    print("Analysis plots have been generated in the analysis_output directory")
+    # Export statistics to the output directory
+    stats_file = os.path.join(output_dir, f"tournament_stats.{output_format}")
+    if output_format == "json":
+        export_tournament_stats_json(aggregate_stats, tournament_stats, num_tournaments, stats_file)
+    else:
+        export_tournament_stats(aggregate_stats, tournament_stats, num_tournaments, stats_file)
+    print(f"\nSummary statistics have been exported to {stats_file}")
+
+    # Typed tables of the same statistics, with the parameters of the run
+    from model.logging.npz_export import export_tournament_results_npz
+    results_file = os.path.join(output_dir, RESULTS_FILE)
+    export_tournament_results_npz(aggregate_stats, tournament_stats, num_tournaments, results_file,
+                                  metadata={'seed': seed, **parameters})
+    print(f"Typed results have been exported to {results_file}")
+
+    if cost_model is not None:
+        # Timings to plan the next parallel run from
+        cost_model.save(costs_file)
+
+    if digests is not None:
+        from model.reproducibility import save_record, REPRODUCIBILITY_FILE
+        record_file = os.path.join(output_dir, REPRODUCIBILITY_FILE)
+        run_digest = save_record(record_file, seed, parameters, digests)
+        print(f"Run digest {run_digest} and the digests of every pairing have been recorded in {record_file}")
     
-    # Export detailed log to analysis_output directory
-    logger.export_to_csv('analysis_output/qlearning_detailed_log.csv')
-    print("Detailed Q-learning interactions have been exported to analysis_output/qlearning_detailed_log.csv")
+    # Run analysis and generate visualizations. Imported here so that matplotlib
+    # is only loaded once the analysis actually runs.
+    if plots and (pipeline is None or show_plots):
+        from model.stat_analysis.performance_analyzer import PerformanceAnalyzer
+        analyzer = PerformanceAnalyzer(tournament_stats, aggregate_stats, output_dir=output_dir, show=show_plots)
+        analyzer.analyze_all()
+        print(f"Analysis plots have been generated in the {output_dir} directory")
+    elif plots:
+        print(f"Analysis plots have been generated in the {output_dir} directory")
+
+    if curves is not None:
+        print(f"Learning curves have been recorded in {curves.directory}")
+        if plots:
+            from model.stat_analysis.performance_analyzer import plot_q_value_curves
+            plot_q_value_curves(curves, output_dir=output_dir, show=show_plots)
+
+    # Export detailed log to the output directory
+    if pipeline is not None:
+        if logger is not None and os.path.getsize(log_file) > 0:
+            print(f"Detailed Q-learning interactions have been streamed to {log_file}")
+    elif logger is not None and len(logger):
+        if output_format == "json":
+            logger.export_to_json(log_file)
+        else:
+            logger.export_to_csv(log_file)
+        print(f"Detailed Q-learning interactions have been exported to {log_file}")
+
+    return tournament_stats, aggregate_stats
+
+def create_results_pipeline(output_dir, output_format, log_file=None, history=None, plots=False, curves=None):
+    """
+    A pipeline streaming the stats of every pairing, and optionally the detailed log to
+    log_file, the games to the history store, the logged turns to the learning-curve store
+    and regenerated plots, into output_dir.
+    """
+    from model.logging.ResultsPipeline import (ResultsPipeline, StatsWriter, LogWriter, HistoryWriter, CurveWriter,
+                                               AnalysisConsumer)
+    consumers = [StatsWriter(output_dir, output_format)]
+    if log_file is not None:
+        consumers.append(LogWriter(log_file, output_format))
+    if history is not None:
+        consumers.append(HistoryWriter(history))
+    if curves is not None:
+        consumers.append(CurveWriter(curves))
+    if plots:
+        consumers.append(AnalysisConsumer(output_dir))
+    return ResultsPipeline(consumers)
+
+def _play_pairings_serial(bots, pairings, rounds, iterations, logger, first_game, tournament_num, seed,
+                          options, histories):
+    """
+    Plays the pairings one after the other, yielding the index, stats and logger of each
+    pairing as soon as it completes.
+    """
+    for index, i, j in pairings:
+        bot1 = bots[i]
+        bot2 = bots[j]
+
+        print(f"\nMatch: {get_bot_name(bot1)} vs {get_bot_name(bot2)}")
+
+        seed_pairing(seed, tournament_num, index)
+        pairing_logger = create_pairing_logger(logger)
+        round_stats = play_pairing(bot1, bot2, rounds, iterations, pairing_logger,
+                                   first_game + index * rounds, tournament_num, **options,
+                                   history=histories.get(index))
+        yield index, round_stats, pairing_logger
+
+def _play_pairings_parallel(bots, pairings, rounds, iterations, logger, first_game,
+                            tournament_num, seed, workers, options, histories, cost_model):
+    """
+    Plays the pairings in a process pool, yielding the index, stats and logger of each
+    pairing as soon as its chunk completes. The pairings are handed out longest-first in
+    chunks planned from the cost model's estimates, see model/scheduling.py, and the
+    model records how long every pairing took. Every pairing only touches the Q-table and
+    exploration rate a learner keeps for that one opponent, so the learners' state can
+    be merged back opponent by opponent once the worker is done. History buffers are
+    filled in the workers and replace the ones in histories.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from model.scheduling import estimate_pairing_costs, pairing_kind, plan_chunks
+
+    costs = estimate_pairing_costs(bots, pairings, rounds, iterations, options, logger is not None, cost_model)
+    players = {index: (i, j) for index, i, j in pairings}
+    chunks = []
+    for chunk in plan_chunks(costs, workers):
+        tasks = []
+        for index, i, j in (pairings[position] for position in chunk):
+            worker_logger = create_pairing_logger(logger)
+            tasks.append((bots[i], bots[j], rounds, iterations, worker_logger,
+                          first_game + index * rounds, tournament_num, seed, index, options, histories.get(index)))
+        chunks.append(tasks)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_play_pairing_chunk, tasks) for tasks in chunks]
+        for future in as_completed(futures):
+            for index, (round_stats, bot1, bot2, worker_logger, history, seconds) in future.result():
+                i, j = players[index]
+                print(f"\nMatch: {get_bot_name(bot1)} vs {get_bot_name(bot2)}")
+                cost_model.record(pairing_kind(bots[i], bots[j], options['engine'], logger is not None),
+                                  round_stats[get_bot_name(bot1)][MATCHES_PLAYED], seconds)
+                merge_learner_state(bots[i], bot1, get_bot_name(bots[j]))
+                merge_learner_state(bots[j], bot2, get_bot_name(bots[i]))
+                if history is not None:
+                    histories[index] = history
+                yield index, round_stats, worker_logger
+
+def _play_learner_pairings_batched(bots, pairings, rounds, iterations, tournament_num, seed, options,
+                                   histories) -> dict:
+    """
+    Plays every pairing of two Q-learning agents in the batched self-play engine.
+    """
+    from model.engine import learner_batch
+    learner_pairings = [(index, i, j) for index, i, j in pairings
+                        if learner_batch.supports_pairing(bots[i], bots[j])]
+    if not learner_pairings:
+        return {}
+
+    import numpy as np
+    seed_pairing(seed, tournament_num, -1)
+    rng = np.random.default_rng(random.getrandbits(64))
+    print(f"\nMatch: {len(learner_pairings)} learner pairings in one batch")
+    # Games of shape (rounds, pairings)
+    lengths = np.array([sample_game_lengths(rounds, options['continuation_probability'], iterations)
+                        for _ in learner_pairings]).T
+    stats = learner_batch.play_learner_pairings([(bots[i], bots[j]) for _, i, j in learner_pairings],
+                                                lengths, rng,
+                                                options['error_rate'], options['misperception_rate'],
+                                                [histories[index] for index, _, _ in learner_pairings]
+                                                if histories else None)
+    return {index: round_stats for (index, _, _), round_stats in zip(learner_pairings, stats)}
+
+def _play_pairing_chunk(tasks):
+    """Plays a chunk of pairings in a worker, returning the index, results and seconds of each"""
+    results = []
+    for task in tasks:
+        bot1, bot2, rounds, iterations, logger, first_game_number, tournament_num, seed, index, options, history = task
+        started = time.perf_counter()
+        seed_pairing(seed, tournament_num, index)
+        round_stats = play_pairing(bot1, bot2, rounds, iterations, logger, first_game_number, tournament_num,
+                                   **options, history=history)
+        results.append((index, (round_stats, bot1, bot2, logger, history, time.perf_counter() - started)))
+    return results
 
 # HELPERS
+def create_bots(bot_names=None, num_learners=0, schedule=None, replay_capacity=0) -> list:
+    """
+    Creates one bot per name, by default one of every type in BOT_TYPES, followed by
+    num_learners extra Q-learning agents named QLearningAgent_1, QLearningAgent_2, ...
+    All Q-learning agents follow the given ExplorationSchedule, if any, and replay their
+    transitions from rings of replay_capacity, if not 0.
+    """
+    if bot_names is None:
+        bot_names = list(BOT_TYPES)
+    unknown = [name for name in bot_names if name not in BOT_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown bots {unknown}, choose from {list(BOT_TYPES)}")
+    learner_options = {'schedule': schedule, 'replay_capacity': replay_capacity}
+    learners = [QLearningAgent(name=f"QLearningAgent_{number}", **learner_options)
+                for number in range(1, num_learners + 1)]
+    bots = [BOT_TYPES[name](**learner_options) if BOT_TYPES[name] is QLearningAgent else BOT_TYPES[name]()
+            for name in bot_names]
+    return bots + learners
+
+def play_pairing_of_run(parameters: dict, seed, tournament_num: int, index: int, bots=None) -> dict:
+    """
+    Plays one pairing of a run from fresh bots, exactly as a serial run with the same seed
+    plays it. The run is described by its parameters as run_round_robin records them, and
+    its bots are created from them unless freshly created ones are given. Pairings of two
+    Q-learning agents are played on their own, not in a batch.
+
+    Returns: dict: The stats of both bots over all rounds of the pairing
+    """
+    if bots is None:
+        bots = create_bots(parameters['bot_names'], parameters['num_learners'],
+                           schedule_from_description(parameters['schedule']), parameters.get('replay_capacity', 0))
+    pairs = [(i, j) for i in range(len(bots)) for j in range(i + 1, len(bots))]
+    i, j = pairs[index]
+    rounds = parameters['rounds']
+    first_game = (tournament_num - 1) * len(pairs) * rounds
+    seed_pairing(seed, tournament_num, index)
+    return play_pairing(bots[i], bots[j], rounds, parameters['iterations'], None, first_game + index * rounds,
+                        tournament_num, engine=parameters['engine'], error_rate=parameters['error_rate'],
+                        misperception_rate=parameters['misperception_rate'],
+                        continuation_probability=parameters['continuation_probability'])
+
+def add_to_aggregate_stats(aggregate_stats: dict, round_stats: dict) -> None:
+    """Adds the stats of one pairing to the aggregate stats of every bot"""
+    for bot_name, stats in round_stats.items():
+        if bot_name not in aggregate_stats:
+            aggregate_stats[bot_name] = {
+                TOTAL_PAYOFF: 0,
+                MATCHES_PLAYED: 0,
+                COOPERATE_COUNT: 0,
+                DEFECT_COUNT: 0
+            }
+        for key in [TOTAL_PAYOFF, MATCHES_PLAYED, COOPERATE_COUNT, DEFECT_COUNT]:
+            aggregate_stats[bot_name][key] += stats[key]
+
+def create_pairing_logger(logger):
+    """
+    A fresh logger with the same policy and bot ids for the turns of one pairing, or None
+    without a logger
+    """
+    if logger is None:
+        return None
+    return InteractionLogger(policy=logger.policy, every=logger.every, bots=logger.bots)
+
+def seed_pairing(seed, tournament_num: int, pairing_index: int) -> None:
+    """
+    Seeds the random module for one pairing, so serial and parallel runs draw the same numbers.
+    """
+    if seed is not None:
+        random.seed(f"{seed}:{tournament_num}:{pairing_index}")
+
+def merge_learner_state(target, source, opponent_name: str) -> None:
+    """
+    Copies what a learner learned against one opponent in a worker back into the original.
+    """
+    if isinstance(target, QLearningAgent):
+        target.set_qtable_for_opponent(opponent_name, source.get_qtable_for_opponent(opponent_name))
+        target.set_exploration_rate(opponent_name, source.get_exploration_rate(opponent_name))
+        target.exploration_rounds[opponent_name] = source.get_exploration_round(opponent_name)
+        if opponent_name in source.visit_counts:
+            target.visit_counts[opponent_name] = source.visit_counts[opponent_name]
+        if opponent_name in source.replay_buffers:
+            target.replay_buffers[opponent_name] = source.replay_buffers[opponent_name]
+
 def initialize_Q_table_for_agent(bot, opponent_name):
         if isinstance(bot, QLearningAgent):
             bot.initialize_q_table_for_opponent(opponent_name)
             bot.initialize_exploration_rate(opponent_name)
 
+def sample_game_lengths(rounds: int, continuation_probability, iterations: int = ITERATIONS) -> list:
+    """
+    Draws the number of turns of every game of a pairing. Without a continuation
+    probability every game lasts the given number of iterations; otherwise each game
+    ends after every turn with probability 1 - continuation_probability, so its length
+    is geometric with mean 1 / (1 - continuation_probability).
+
+    Returns: list[int]: The length of each round's game
+    """
+    if continuation_probability is None:
+        return [iterations] * rounds
+    if continuation_probability == 0:
+        return [1] * rounds
+    log_continuation = math.log(continuation_probability)
+    # 1 - random() lies in (0, 1], so the log is always defined
+    return [1 + int(math.log(1.0 - random.random()) / log_continuation) for _ in range(rounds)]
+
+def apply_noise(action: str, rate: float) -> str:
+    """
+    Flips the action with the given probability. Draws no random number when the rate is 0.
+    """
+    if rate > 0 and random.random() < rate:
+        return DEFECT if action == COOPERATE else COOPERATE
+    return action
+
+def joint_action(bot1_action: str, bot2_action: str) -> int:
+    """The 2-bit code of one turn as kept in a HistoryStore"""
+    return ((bot1_action == DEFECT) << 1) | (bot2_action == DEFECT)
+
 def initialize_bot_stats(stats: dict, bot_name: str) -> None:
     if bot_name not in stats:
         stats[bot_name] = {
@@ -200,12 +900,12 @@ def reset_bots(bot1: BaseBot, bot2: BaseBot) -> None:
     if isinstance(bot2, BaseBot):
         bot2.reset()
         
-def handle_exploration_decay(bot1: BaseBot, bot2: BaseBot, decay_rate: float) -> None:
+def handle_exploration_decay(bot1: BaseBot, bot2: BaseBot) -> None:
     """
-    Decay exploration rates for Q-learning bots.
+    Moves the exploration of Q-learning bots on to the next round of their schedules.
     """
     if isinstance(bot1, QLearningAgent):
-        bot1.decay_exploration_rate(type(bot2).__name__, decay_rate)
+        bot1.advance_exploration(get_bot_name(bot2))
     if isinstance(bot2, QLearningAgent):
-        bot2.decay_exploration_rate(type(bot1).__name__, decay_rate)
+        bot2.advance_exploration(get_bot_name(bot1))
 
@@ -0,0 +1,50 @@
+import random
+import unittest
+
+from model.bots.CooperateBot import CooperateBot
+from model.bots.DefectBot import DefectBot
+from model.bots.FSMBot import FSMBot
+from model.bots.FSMSpec import FSMSpec
+from model.bots.GrimBot import GrimBot
+from model.bots.TFT90Bot import TFT90Bot
+from model.bots.TFTBot import TFTBot
+from model.constants import COOPERATE, DEFECT
+
+
+class TestFSMBot(unittest.TestCase):
+
+    def test_name(self):
+        self.assertEqual(FSMBot(TFTBot.fsm).name, "TFTBot")
+
+    def test_reexpresses_builtin_bots(self):
+        """Tests whether each built-in bot's FSM plays exactly like the bot itself"""
+        rng = random.Random(3)
+        for bot_type in (CooperateBot, DefectBot, TFTBot, GrimBot, TFT90Bot):
+            bot = bot_type()
+            fsm_bot = FSMBot(bot_type.fsm)
+            for game in range(20):
+                opponent_moves = [None] + [rng.choice([COOPERATE, DEFECT]) for _ in range(30)]
+                random.seed(game)
+                expected = [bot.choose_action("Opponent", move) for move in opponent_moves]
+                random.seed(game)
+                actual = [fsm_bot.choose_action("Opponent", move) for move in opponent_moves]
+                self.assertEqual(actual, expected, msg=bot_type.__name__)
+                bot.reset()
+                fsm_bot.reset()
+
+    def test_new_archetype_as_data(self):
+        """Tests a strategy defined only as data: one that alternates regardless of the opponent"""
+        alternating = FSMSpec("AlternateBot", transitions=[[1, 1], [0, 0]], defect_probabilities=[0.0, 1.0])
+        bot = FSMBot(alternating)
+        self.assertEqual([bot.choose_action("Opponent", COOPERATE) for _ in range(4)],
+                         [COOPERATE, DEFECT, COOPERATE, DEFECT])
+
+    def test_invalid_spec(self):
+        with self.assertRaises(ValueError):
+            FSMSpec("Broken", transitions=[[0, 2]], defect_probabilities=[0.0])
+        with self.assertRaises(ValueError):
+            FSMSpec("Broken", transitions=[[0, 0]], defect_probabilities=[1.5])
+
+
+if __name__ == "__main__":
+    unittest.main()
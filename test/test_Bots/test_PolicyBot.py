@@ -0,0 +1,45 @@
+import random
+import unittest
+
+from model.QLearningAgent import QLearningAgent
+from model.bots.GrimBot import GrimBot
+from model.bots.PolicyBot import PolicyBot, freeze_policies
+from model.bots.TFTBot import TFTBot
+from model.constants import *
+from model.engine import fsm_engine
+from model.tournamentManager import play_pairing, ENGINE_PYTHON, ENGINE_COMPILED
+
+
+class TestPolicyBot(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(0)
+        self.agent = QLearningAgent()
+        play_pairing(self.agent, TFTBot(), 50, 20, None, 0)
+
+    def test_plays_greedy_policy(self):
+        """Tests whether the frozen bot plays what the agent would play without exploring"""
+        bot = PolicyBot(self.agent, "TFTBot")
+        self.assertEqual(bot.name, "QLearningAgent@TFTBot")
+        self.agent.set_exploration_rate("TFTBot", 0.0)
+        rng = random.Random(1)
+        opponent_moves = [None] + [rng.choice([COOPERATE, DEFECT]) for _ in range(30)]
+        expected = [self.agent.choose_action("TFTBot", move) for move in opponent_moves]
+        self.assertEqual([bot.choose_action("Opponent", move) for move in opponent_moves], expected)
+
+    def test_ties_cooperate(self):
+        """Tests whether states the agent never rated apart are played as COOPERATE"""
+        bot = PolicyBot(QLearningAgent(), "TFTBot")
+        self.assertEqual(bot.actions, {None: COOPERATE, COOPERATE: COOPERATE, DEFECT: COOPERATE})
+
+    def test_runs_in_fsm_engine(self):
+        """Tests whether frozen policies play in the FSM engine with the same results as in Python"""
+        bot = freeze_policies(self.agent)["TFTBot"]
+        self.assertTrue(fsm_engine.supports_pairing(bot, GrimBot()))
+        python_stats = play_pairing(bot, GrimBot(), 5, 30, None, 0, engine=ENGINE_PYTHON)
+        compiled_stats = play_pairing(bot, GrimBot(), 5, 30, None, 0, engine=ENGINE_COMPILED)
+        self.assertEqual(python_stats, compiled_stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import random
+import unittest
+
+import numpy as np
+
+from model.ExplorationSchedule import (ExponentialSchedule, LinearSchedule, InverseTimeSchedule, StepSchedule,
+                                       BoltzmannSchedule, UCBSchedule, boltzmann_defect_probability)
+from model.QLearningAgent import QLearningAgent
+from model.bots.TFTBot import TFTBot
+from model.constants import *
+from model.engine.learner_batch import play_learner_pairings
+from model.tournamentManager import play_pairing, ENGINE_COMPILED
+
+
+class TestExplorationSchedule(unittest.TestCase):
+
+    def test_exponential_matches_repeated_decay(self):
+        """Tests whether the exponential table gives exactly the rates of decaying every round"""
+        rate = DEFAULT_EXPLORATION_RATE
+        expected = []
+        for _ in range(50):
+            expected.append(rate)
+            rate *= DECAY_RATE
+        self.assertEqual(ExponentialSchedule().rates(50), expected)
+
+    def test_schedule_shapes(self):
+        """Tests the rates of the linear, inverse-time and step schedules"""
+        linear = LinearSchedule(1.0, 0.2, horizon=4).rates(6)
+        for actual, expected in zip(linear, [1.0, 0.8, 0.6, 0.4, 0.2, 0.2]):
+            self.assertAlmostEqual(actual, expected)
+        inverse = InverseTimeSchedule(1.0, rate=0.5).rates(3)
+        for actual, expected in zip(inverse, [1.0, 1 / 1.5, 1 / 2.0]):
+            self.assertAlmostEqual(actual, expected)
+        self.assertEqual(StepSchedule(1.0, factor=0.5, every=2).rates(5), [1.0, 1.0, 0.5, 0.5, 0.25])
+        self.assertEqual(LinearSchedule(1.0, 0.0, horizon=2).rates(4), [1.0, 0.5, 0.0, 0.0])
+
+    def test_table_grows_with_the_run(self):
+        """Tests whether decay factors beyond the precomputed table are still available"""
+        schedule = StepSchedule(every=3)
+        self.assertEqual(len(schedule.decay_factors(0, 10)), 10)
+        self.assertEqual(schedule.decay_factors(5 * ROUNDS, 3),
+                         [schedule.decay_factor(round) for round in range(5 * ROUNDS, 5 * ROUNDS + 3)])
+
+    def test_agent_follows_schedule(self):
+        """Tests whether advancing the agent's exploration walks through the schedule's rates"""
+        schedule = InverseTimeSchedule(0.8, rate=0.1)
+        agent = QLearningAgent(schedule=schedule)
+        agent.initialize_exploration_rate("TFTBot")
+        for expected in schedule.rates(20):
+            self.assertAlmostEqual(agent.get_exploration_rate("TFTBot"), expected)
+            agent.advance_exploration("TFTBot")
+        self.assertEqual(agent.get_exploration_round("TFTBot"), 20)
+
+    def test_boltzmann_selection(self):
+        """Tests whether softmax selection is greedy when cold and uniform when hot"""
+        self.assertEqual(boltzmann_defect_probability(1.0, 2.0, 0.0), 1.0)
+        self.assertAlmostEqual(boltzmann_defect_probability(1.0, 2.0, 1e9), 0.5)
+        self.assertAlmostEqual(boltzmann_defect_probability(0.0, 1e6, 1.0), 1.0)
+
+        random.seed(0)
+        agent = QLearningAgent(schedule=BoltzmannSchedule(temperature=1.0))
+        agent.get_qtable_for_opponent("TFTBot").set_q_value(COOPERATE, DEFECT, 1.0)
+        defections = sum(agent.choose_action("TFTBot", COOPERATE) == DEFECT for _ in range(5000))
+        self.assertAlmostEqual(defections / 5000, 1 / (1 + np.exp(-1.0)), delta=0.02)
+
+    def test_ucb_tries_every_action(self):
+        """Tests whether UCB tries both actions in a state before trusting the Q-values"""
+        agent = QLearningAgent(schedule=UCBSchedule())
+        agent.get_qtable_for_opponent("TFTBot").set_q_value(COOPERATE, COOPERATE, 100.0)
+        first = agent.choose_action("TFTBot", COOPERATE)
+        second = agent.choose_action("TFTBot", COOPERATE)
+        self.assertEqual({first, second}, {COOPERATE, DEFECT})
+        self.assertEqual(agent.get_visit_counts("TFTBot")[COOPERATE], {COOPERATE: 1, DEFECT: 1})
+
+    def test_engines_agree_under_ucb(self):
+        """Tests whether all engines play the same deterministic games under UCB selection"""
+        python_agent = QLearningAgent(schedule=UCBSchedule(coefficient=5.0, decay=0.9))
+        kernel_agent = QLearningAgent(schedule=UCBSchedule(coefficient=5.0, decay=0.9))
+        python_stats = play_pairing(python_agent, TFTBot(), 10, 20, None, 0)
+        kernel_stats = play_pairing(kernel_agent, TFTBot(), 10, 20, None, 0, engine=ENGINE_COMPILED)
+        self.assertEqual(python_stats, kernel_stats)
+        self.assertEqual(python_agent.get_visit_counts("TFTBot"), kernel_agent.get_visit_counts("TFTBot"))
+        self.assertAlmostEqual(python_agent.get_exploration_rate("TFTBot"), 5.0 * 0.9 ** 10)
+        self.assertEqual(kernel_agent.get_exploration_round("TFTBot"), 10)
+
+        learners = [[QLearningAgent(name=f"QLearningAgent_{i}", schedule=UCBSchedule()) for i in (1, 2)]
+                    for _ in range(2)]
+        expected = play_pairing(learners[0][0], learners[0][1], 5, 20, None, 0)
+        actual = play_learner_pairings([(learners[1][0], learners[1][1])], np.full((5, 1), 20),
+                                       np.random.default_rng(0))
+        self.assertEqual(actual, [expected])
+        self.assertEqual(learners[0][0].get_visit_counts("QLearningAgent_2"),
+                         learners[1][0].get_visit_counts("QLearningAgent_2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
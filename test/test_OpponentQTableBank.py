@@ -0,0 +1,84 @@
+import pickle
+import random
+import unittest
+
+from model.ExplorationSchedule import UCBSchedule
+from model.OpponentQTableBank import OpponentQTableBank
+from model.QLearningAgent import QLearningAgent
+from model.constants import *
+from model.tournamentManager import BOT_TYPES, ENGINE_PYTHON, ENGINE_COMPILED, play_pairing
+
+OPPONENTS = [name for name, bot_type in BOT_TYPES.items() if bot_type is not QLearningAgent]
+
+
+def train(agent, engine):
+    random.seed(1)
+    stats = [play_pairing(agent, BOT_TYPES[name](), 3, 20, None, 0, engine=engine)
+             for _ in range(2) for name in OPPONENTS]
+    tables = {name: agent.get_qtable_for_opponent(name).get_table() for name in OPPONENTS}
+    exploration = {name: (agent.get_exploration_rate(name), agent.get_exploration_round(name)) for name in OPPONENTS}
+    return stats, tables, exploration
+
+
+class TestOpponentQTableBank(unittest.TestCase):
+
+    def test_rows_survive_eviction(self):
+        """Tests whether rows evicted to the spill file come back with their values"""
+        bank = OpponentQTableBank(capacity=2, start_rate=0.5)
+        for number in range(6):
+            bank.exploration_rounds[f"Bot_{number}"] = number
+            bank[f"Bot_{number}"].set_q_value(DEFECT, COOPERATE, float(number))
+        self.assertEqual(len(bank.slots), 2)
+        self.assertEqual(bank.evictions, 4)
+        for number in range(6):
+            self.assertEqual(bank[f"Bot_{number}"].get_q_value(DEFECT, COOPERATE), number)
+            self.assertEqual(bank.exploration_rounds[f"Bot_{number}"], number)
+            self.assertEqual(bank.exploration_rates[f"Bot_{number}"], 0.5)
+        self.assertEqual(bank.faults, 6)  # reading in order evicts the last two before they are read
+        self.assertEqual(list(bank), [f"Bot_{number}" for number in range(6)])
+        bank.close()
+
+    def test_agent_matches_dict_tables(self):
+        """Tests whether an agent learns the same with a bank too small for its opponents as with dicts"""
+        for engine in (ENGINE_PYTHON, ENGINE_COMPILED):
+            banked = QLearningAgent(qtable_capacity=2)
+            self.assertEqual(train(QLearningAgent(), engine), train(banked, engine))
+            self.assertGreater(banked.QTables.faults, 0)
+
+    def test_visit_counts_and_replay_stay_bounded(self):
+        """Tests whether UCB counts and replay rings live in the bank, with the same results as with dicts"""
+        for engine in (ENGINE_PYTHON, ENGINE_COMPILED):
+            agent = QLearningAgent(schedule=UCBSchedule())
+            banked = QLearningAgent(schedule=UCBSchedule(), qtable_capacity=2)
+            self.assertEqual(train(agent, engine), train(banked, engine))
+            self.assertEqual({name: {state: dict(counts) for state, counts in banked.get_visit_counts(name).items()}
+                              for name in OPPONENTS}, agent.visit_counts)
+
+        # Without UCB the compiled engine keeps no visit counts
+        agent = QLearningAgent()
+        train(agent, ENGINE_COMPILED)
+        self.assertEqual(agent.visit_counts, {})
+
+        agent = QLearningAgent(replay_capacity=40)
+        banked = QLearningAgent(replay_capacity=40, qtable_capacity=2)
+        self.assertEqual(train(agent, ENGINE_PYTHON), train(banked, ENGINE_PYTHON))
+        self.assertEqual(len(banked.replay_buffers.resident), 2)
+        self.assertEqual(list(banked.replay_buffers), OPPONENTS)
+        self.assertGreater(banked.replay_buffers.faults, 0)
+        copy = pickle.loads(pickle.dumps(banked))
+        self.assertEqual(copy.get_replay_buffer(OPPONENTS[0]).added, agent.get_replay_buffer(OPPONENTS[0]).added)
+
+    def test_pickle(self):
+        """Tests whether a pickled agent keeps every row, on disk or not, and its columns share the bank"""
+        agent = QLearningAgent(qtable_capacity=2)
+        _, tables, exploration = train(agent, ENGINE_PYTHON)
+        copy = pickle.loads(pickle.dumps(agent))
+        self.assertIs(copy.exploration_rates.bank, copy.QTables)
+        self.assertEqual(list(copy.QTables.slots), list(agent.QTables.slots))
+        self.assertEqual({name: copy.get_qtable_for_opponent(name).get_table() for name in OPPONENTS}, tables)
+        self.assertEqual({name: (copy.get_exploration_rate(name), copy.get_exploration_round(name))
+                          for name in OPPONENTS}, exploration)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import random
+import unittest
+
+import numpy as np
+
+from model.QLearningAgent import QLearningAgent
+from model.QTable import QTable
+from model.ReplayBuffer import ReplayBuffer, q_array, write_q_array
+from model.bots.TFTBot import TFTBot
+from model.constants import *
+from model.engine import learner_batch, qlearning_kernel
+from model.tournamentManager import play_pairing
+
+# Q-values of the best response to TFTBot, cooperating forever
+OPTIMAL_TFT_Q = {
+    (COOPERATE, COOPERATE): 3 / (1 - DISCOUNT_FACTOR),
+    (COOPERATE, DEFECT): 5 + DISCOUNT_FACTOR * (3 / (1 - DISCOUNT_FACTOR) - 3),
+    (DEFECT, COOPERATE): 3 / (1 - DISCOUNT_FACTOR) - 3,
+    (DEFECT, DEFECT): 1 + DISCOUNT_FACTOR * (3 / (1 - DISCOUNT_FACTOR) - 3),
+}
+
+
+def tft_error(agent) -> float:
+    table = agent.get_qtable_for_opponent("TFTBot")
+    return max(abs(table.get_q_value(state, action) - value) for (state, action), value in OPTIMAL_TFT_Q.items())
+
+
+class TestReplayBuffer(unittest.TestCase):
+
+    def test_ring_overwrites_oldest(self):
+        """Tests whether a full ring keeps its capacity and overwrites the oldest transitions"""
+        buffer = ReplayBuffer(3, batch_size=1)
+        for reward in range(5):
+            buffer.add(COOPERATE, DEFECT, float(reward), None)
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(sorted(buffer.rewards), [2.0, 3.0, 4.0])
+        self.assertEqual(buffer.position, 2)
+
+    def test_replay_waits_for_batch_and_interval(self):
+        """Tests whether replays are only due with a full minibatch, every interval transitions"""
+        buffer = ReplayBuffer(10, batch_size=3, interval=2)
+        due = []
+        for _ in range(8):
+            buffer.add(COOPERATE, COOPERATE, 3.0, COOPERATE)
+            due.append(buffer.due())
+        self.assertEqual(due, [False, False, False, True, False, True, False, True])
+
+    def test_duplicate_samples_move_by_mean(self):
+        """Tests whether a state-action pair sampled many times takes a single step of the learning rate"""
+        buffer = ReplayBuffer(4, batch_size=32, rng=np.random.default_rng(0))
+        buffer.add(COOPERATE, DEFECT, 5.0, DEFECT)
+        q = np.zeros((3, 2))
+        q[1, 0] = 2.0  # DEFECT, COOPERATE
+        buffer.replay(q, 0.5, 0.9)
+        self.assertEqual(q[0, 0], 0.0)
+        self.assertAlmostEqual(q[0, 1], 0.5 * (5.0 + 0.9 * 2.0))
+
+    def test_replay_matches_single_update(self):
+        """Tests whether replaying one transition is the agent's own Bellman update"""
+        agent = QLearningAgent()
+        agent.update_q_value("TFTBot", COOPERATE, DEFECT, 5, DEFECT)
+        agent.update_q_value("TFTBot", DEFECT, COOPERATE, 0, COOPERATE)
+        table = agent.get_qtable_for_opponent("TFTBot")
+        q = q_array(table)
+
+        buffer = ReplayBuffer(1, batch_size=1)
+        buffer.add(DEFECT, COOPERATE, 0.0, COOPERATE)
+        buffer.replay(q, LEARNING_RATE, DISCOUNT_FACTOR)
+        agent.update_q_value("TFTBot", DEFECT, COOPERATE, 0, COOPERATE)
+        np.testing.assert_allclose(q, q_array(table))
+
+        # Written back into a fresh table, every value lands in its state and action
+        fresh = QTable([COOPERATE, DEFECT, None], [COOPERATE, DEFECT])
+        write_q_array(fresh, q)
+        for row, state in enumerate((COOPERATE, DEFECT, None)):
+            for column, action in enumerate((COOPERATE, DEFECT)):
+                self.assertEqual(fresh.get_q_value(state, action), q[row, column])
+
+    def test_replay_agents_stay_on_python_engine(self):
+        """Tests whether the compiled engines leave agents with replay to the Python engine"""
+        self.assertFalse(qlearning_kernel.supports_pairing(QLearningAgent(replay_capacity=10), TFTBot()))
+        self.assertTrue(qlearning_kernel.supports_pairing(QLearningAgent(), TFTBot()))
+        self.assertFalse(learner_batch.supports_pairing(QLearningAgent(replay_capacity=10), QLearningAgent()))
+
+    def test_replay_learns_faster(self):
+        """Tests whether replay brings the Q-values against TFTBot closer to optimal within a few rounds"""
+        errors = {}
+        for capacity in (0, REPLAY_CAPACITY):
+            random.seed(1)
+            agent = QLearningAgent(replay_capacity=capacity)
+            play_pairing(agent, TFTBot(), 5, 200, None, 0)
+            errors[capacity] = tft_error(agent)
+        self.assertLess(errors[REPLAY_CAPACITY], errors[0])
+        self.assertEqual(len(agent.get_replay_buffer("TFTBot")), REPLAY_CAPACITY)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import pickle
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from model.QLearningAgent import QLearningAgent
+from model.QTable import QTable
+from model.SharedQTableBank import SharedQTableBank, attach_bank, train_shared, UPDATE_STRIPED
+from model.bots.TFTBot import TFTBot
+from model.constants import *
+
+
+def update_in_worker(table):
+    table.update_q_value(COOPERATE, DEFECT, 0.5, 5, 0.9, COOPERATE)
+
+
+class FailingBot(TFTBot):
+    def choose_action(self, name, opponent_last_action):
+        raise RuntimeError("strategy failed")
+
+
+class TestSharedQTableBank(unittest.TestCase):
+
+    def test_layout(self):
+        """Tests whether every (agent, opponent) table writes its own cell of the bank"""
+        with SharedQTableBank(["A", "B"], ["X", "Y", "Z"]) as bank:
+            self.assertEqual(bank.values.shape, (2, 3, 3, 2))
+            table = bank.table("B", "Y")
+            table.set_q_value(DEFECT, COOPERATE, 7.0)
+            table.set_q_value(None, DEFECT, 2.0)
+            self.assertEqual(bank.values[1, 1, 1, 0], 7.0)
+            self.assertEqual(bank.values[1, 1, 2, 1], 2.0)
+            self.assertEqual(bank.values.sum(), 9.0)
+            table.release()
+
+    def test_update_matches_qtable(self):
+        """Tests whether the shared Bellman update is the one of QTable"""
+        qtable = QTable(states=[COOPERATE, DEFECT], actions=[COOPERATE, DEFECT])
+        with SharedQTableBank(["A"], ["X"], UPDATE_STRIPED) as bank:
+            table = bank.table("A", "X")
+            for state, action, reward, next_state in [(COOPERATE, DEFECT, 5, DEFECT), (DEFECT, DEFECT, 1, COOPERATE),
+                                                      (COOPERATE, COOPERATE, 3, COOPERATE), (None, DEFECT, 5, DEFECT)]:
+                qtable.update_q_value(state, action, LEARNING_RATE, reward, DISCOUNT_FACTOR, next_state)
+                table.update_q_value(state, action, LEARNING_RATE, reward, DISCOUNT_FACTOR, next_state)
+            self.assertEqual(table.get_table(), qtable.get_table())
+            table.release()
+
+    def test_worker_updates_shared_table(self):
+        """Tests whether a table sent to a worker process updates the parent's bank, without copying it"""
+        with SharedQTableBank(["A"], ["X"]) as bank:
+            table = bank.table("A", "X")
+            self.assertLess(len(pickle.dumps(table)), 200)
+            with ProcessPoolExecutor(max_workers=1, initializer=attach_bank, initargs=(bank,)) as executor:
+                executor.submit(update_in_worker, table).result()
+            self.assertEqual(table.get_q_value(COOPERATE, DEFECT), 2.5)
+            table.release()
+
+    def test_train_shared(self):
+        """Tests whether parallel streams play all rounds and leave the agent with what they learned"""
+        agent = QLearningAgent()
+        stats = train_shared(agent, TFTBot(), 6, 10, workers=2, update=UPDATE_STRIPED, seed=3)
+        self.assertEqual(stats["QLearningAgent"][MATCHES_PLAYED], 60)
+        self.assertEqual(stats["TFTBot"][MATCHES_PLAYED], 60)
+        table = agent.get_qtable_for_opponent("TFTBot")
+        self.assertIs(type(table), QTable)
+        self.assertNotEqual(table.get_q_value(COOPERATE, COOPERATE), 0.0)
+        self.assertEqual(agent.get_exploration_round("TFTBot"), 6)
+
+    def test_train_shared_failure_and_replay(self):
+        """Tests whether a failing stream raises its own error and leaves plain tables, and striped replay works"""
+        agent = QLearningAgent()
+        with self.assertRaisesRegex(RuntimeError, "strategy failed"):
+            train_shared(agent, FailingBot(), 4, 10, workers=2, update=UPDATE_STRIPED, seed=3)
+        self.assertIs(type(agent.get_qtable_for_opponent("TFTBot")), QTable)
+
+        agent = QLearningAgent(replay_capacity=50)
+        stats = train_shared(agent, TFTBot(), 4, 20, workers=2, update=UPDATE_STRIPED, seed=3)
+        self.assertEqual(stats["QLearningAgent"][MATCHES_PLAYED], 80)
+
+
+if __name__ == '__main__':
+    unittest.main()
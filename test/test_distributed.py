@@ -0,0 +1,89 @@
+import contextlib
+import io
+import socket
+import tempfile
+import time
+import unittest
+
+from model.distributed import Coordinator, run_distributed, run_worker, sweep_points, send_message, receive_message
+from model.tournamentManager import simulate_round_robin, run_round_robin, play_pairing_of_run
+
+BOTS = ["QLearningAgent", "TFTBot", "GrimBot"]
+
+
+def local_stats(**parameters):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return simulate_round_robin(bot_names=BOTS, **parameters)
+
+
+def take_unit(address):
+    """Connects like a worker and takes one unit without ever returning it"""
+    connection = socket.create_connection(address)
+    file = connection.makefile('rwb')
+    send_message(file, {'type': 'request'})
+    return connection, file, receive_message(file)
+
+
+class TestDistributed(unittest.TestCase):
+
+    def test_sweep_matches_local_runs(self):
+        """Tests whether every point of a distributed sweep adds up to the stats of a local run"""
+        points = sweep_points({'error_rate': [0.0, 0.1]}, bot_names=BOTS, rounds=3, iterations=10,
+                              num_tournaments=2, num_learners=1, seed=11)
+        results = run_distributed(points, workers=2, port=0)
+        for point, stats in zip(points, results):
+            self.assertEqual(stats, local_stats(rounds=3, iterations=10, num_tournaments=2, num_learners=1,
+                                                seed=11, error_rate=point['error_rate']))
+
+    def test_lost_unit_is_retried(self):
+        """Tests whether the unit of a worker that disconnects is served again"""
+        with Coordinator([{'bot_names': BOTS, 'rounds': 2, 'iterations': 5, 'seed': 3}], port=0) as coordinator:
+            connection, file, message = take_unit(coordinator.address)
+            self.assertEqual(message['type'], 'unit')
+            file.close()
+            connection.close()
+            self.assertEqual(run_worker(*coordinator.address), 3)
+            self.assertTrue(coordinator.wait(5))
+            self.assertEqual(coordinator.retries, 1)
+            self.assertEqual(coordinator.stats(), local_stats(rounds=2, iterations=5, seed=3))
+
+    def test_late_result_is_not_served_again(self):
+        """Tests whether a unit served again after its lease ran out is dropped once its first worker reports it"""
+        with Coordinator([{'bot_names': BOTS, 'rounds': 2, 'iterations': 5, 'seed': 3}], port=0, lease=0.001,
+                         steal=False) as coordinator:
+            connection, file, message = take_unit(coordinator.address)
+            time.sleep(0.01)
+            # Another request finds the lease run out and queues the unit again
+            other_connection, other_file, _ = take_unit(coordinator.address)
+            round_stats = play_pairing_of_run(message['parameters'], message['seed'], message['tournament'],
+                                              message['pairing'])
+            send_message(file, {'type': 'result', 'unit': message['unit'], 'stats': round_stats})
+            for closing in (file, connection, other_file, other_connection):
+                closing.close()
+            self.assertEqual(run_worker(*coordinator.address), 2)
+            self.assertTrue(coordinator.wait(5))
+            self.assertEqual(coordinator.stats(), local_stats(rounds=2, iterations=5, seed=3))
+
+    def test_idle_worker_steals_busy_unit(self):
+        """Tests whether an idle worker finishes a unit another worker holds on to"""
+        with Coordinator([{'bot_names': BOTS, 'rounds': 2, 'iterations': 5, 'seed': 3}], port=0) as coordinator:
+            connection, file, _ = take_unit(coordinator.address)
+            try:
+                self.assertEqual(run_worker(*coordinator.address), 3)
+                self.assertTrue(coordinator.wait(5))
+                self.assertEqual(coordinator.steals, 1)
+                self.assertEqual(coordinator.stats(), local_stats(rounds=2, iterations=5, seed=3))
+            finally:
+                file.close()
+                connection.close()
+
+    def test_served_run(self):
+        """Tests whether run_round_robin can serve its pairings to local workers"""
+        with tempfile.TemporaryDirectory() as output_dir, contextlib.redirect_stdout(io.StringIO()):
+            served = run_round_robin(bot_names=BOTS, rounds=2, iterations=5, seed=4, workers=2, output_dir=output_dir,
+                                     plots=False, serve="127.0.0.1:0")
+        self.assertEqual(served, local_stats(rounds=2, iterations=5, seed=4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+import numpy as np
+
+from model.bots.CooperateBot import CooperateBot
+from model.bots.DefectBot import DefectBot
+from model.bots.GrimBot import GrimBot
+from model.bots.TFT90Bot import TFT90Bot
+from model.bots.TFTBot import TFTBot
+from model.constants import *
+from model.engine.fsm_engine import FSMTables, play_fsm_games, play_pairing_batched
+from model.tournamentManager import play_pairing
+
+
+class TestFSMEngine(unittest.TestCase):
+
+    def test_matches_python_engine_for_deterministic_bots(self):
+        """Tests whether the lock-step engine reproduces play_game for deterministic bots"""
+        bot_types = (CooperateBot, DefectBot, TFTBot, GrimBot)
+        for bot1_type in bot_types:
+            for bot2_type in bot_types:
+                if bot1_type is bot2_type:
+                    continue
+                expected = play_pairing(bot1_type(), bot2_type(), 3, 20, None, 0)
+                actual = play_pairing_batched(bot1_type(), bot2_type(), [20] * 3, np.random.default_rng(0))
+                self.assertEqual(actual, expected)
+
+    def test_mixed_strategies_in_one_batch(self):
+        """Tests whether games between different strategies can share one batch"""
+        tables = FSMTables([TFTBot.fsm, DefectBot.fsm, GrimBot.fsm])
+        rows1 = np.array([0, 2, 0])
+        rows2 = np.array([1, 1, 2])
+        payoffs, cooperations = play_fsm_games(tables, rows1, rows2, 10, np.random.default_rng(0))
+        self.assertEqual(payoffs[0].tolist(), [9, 14])  # TFT vs Defect
+        self.assertEqual(payoffs[1].tolist(), [9, 14])  # Grim vs Defect
+        self.assertEqual(payoffs[2].tolist(), [30, 30])  # TFT vs Grim
+        self.assertEqual(cooperations[2].tolist(), [10, 10])
+
+    def test_stochastic_strategy(self):
+        """Tests whether TFT90Bot retaliates against DefectBot about 90% of the time"""
+        stats = play_pairing_batched(TFT90Bot(), DefectBot(), [50] * 200, np.random.default_rng(1))
+        coop_rate = stats["TFT90Bot"][COOPERATE_COUNT] / stats["TFT90Bot"][MATCHES_PLAYED]
+        expected = (1 + 49 * 0.1) / 50
+        self.assertAlmostEqual(coop_rate, expected, delta=0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from model.bots.DefectBot import DefectBot
+from model.bots.TFTBot import TFTBot
+from model.constants import *
+from model.logging import HistoryStore as history_store
+from model.logging.HistoryStore import HistoryStore, pack_actions, unpack_actions
+from model.tournamentManager import simulate_round_robin, play_pairing, ENGINE_PYTHON, ENGINE_COMPILED
+
+
+class TestHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_pack_round_trip(self):
+        """Tests whether joint actions survive packing, whatever the padding of the last byte"""
+        for length in (1, 4, 7):
+            codes = np.random.default_rng(length).integers(0, 4, length).astype(np.uint8)
+            packed = np.frombuffer(pack_actions(codes), dtype=np.uint8)
+            self.assertEqual(len(packed), -(-length // 4))
+            self.assertEqual(unpack_actions(packed, length).tolist(), codes.tolist())
+
+    def test_games_match_stats(self):
+        """Tests whether the stored games of every engine add up to the tournament stats"""
+        for engine in (ENGINE_PYTHON, ENGINE_COMPILED):
+            store = HistoryStore(self.directory, mode="w")
+            tournament_stats, _ = simulate_round_robin(rounds=3, iterations=10, num_tournaments=2, seed=0,
+                                                       engine=engine, num_learners=1, history=store)
+            reader = HistoryStore(self.directory)
+            self.assertEqual(len(reader.index()), len(tournament_stats) * 3)
+            with open(os.path.join(self.directory, history_store.PAIRINGS_FILE)) as file:
+                self.assertEqual(len(file.readlines()), len(tournament_stats))
+            for position, round_stats in enumerate(tournament_stats):
+                tournament, pairing = divmod(position, len(tournament_stats) // 2)
+                games = [reader.game(game) for game in reader.select(tournament + 1, pairing)]
+                actions = np.concatenate(games)
+                for side, name in enumerate(reader.get_names(tournament + 1, pairing)):
+                    self.assertEqual(int((actions[:, side] == 0).sum()), round_stats[name][COOPERATE_COUNT])
+                    self.assertEqual(len(actions), round_stats[name][MATCHES_PLAYED])
+
+    def test_analyses(self):
+        """Tests the cooperation over time and conditional responses of TFT against Defect"""
+        store = HistoryStore(self.directory, mode="w")
+        buffer = store.new_buffer(1, 0, ("TFTBot", "DefectBot"))
+        random.seed(0)
+        play_pairing(TFTBot(), DefectBot(), 4, 6, None, 0, history=buffer)
+        store.write(buffer)
+
+        rates, games = store.cooperation_over_time()
+        self.assertEqual(games.tolist(), [4] * 6)
+        self.assertEqual(rates[:, 0].tolist(), [1.0] + [0.0] * 5)
+        self.assertEqual(rates[:, 1].tolist(), [0.0] * 6)
+
+        response = store.conditional_response()
+        self.assertEqual(response[DEFECT][0], 0.0)  # TFT never cooperates after a defection
+        self.assertEqual(response[COOPERATE][1], 0.0)  # Defect never cooperates at all
+
+    def test_chunked_reads(self):
+        """Tests whether analyses give the same results when unpacked in small chunks"""
+        store = HistoryStore(self.directory, mode="w")
+        simulate_round_robin(rounds=5, iterations=13, num_tournaments=2, seed=1, history=store,
+                             continuation_probability=0.9)
+        expected_rates, _ = store.cooperation_over_time(pairing=2)
+        expected_response = store.conditional_response()
+
+        chunk_bytes = history_store.CHUNK_BYTES
+        history_store.CHUNK_BYTES = 3
+        try:
+            rates, _ = store.cooperation_over_time(pairing=2)
+            response = store.conditional_response()
+        finally:
+            history_store.CHUNK_BYTES = chunk_bytes
+        np.testing.assert_array_equal(rates, expected_rates)
+        for action in (COOPERATE, DEFECT):
+            np.testing.assert_array_equal(response[action], expected_response[action])
+
+
+if __name__ == "__main__":
+    unittest.main()
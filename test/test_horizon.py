@@ -0,0 +1,71 @@
+import random
+import unittest
+
+import numpy as np
+
+from model.QLearningAgent import QLearningAgent
+from model.bots.DefectBot import DefectBot
+from model.bots.GrimBot import GrimBot
+from model.bots.TFTBot import TFTBot
+from model.constants import *
+from model.engine.fsm_engine import FSMTables, play_fsm_games
+from model.engine.learner_batch import play_learner_pairings
+from model.tournamentManager import play_pairing, sample_game_lengths, ENGINE_PYTHON, ENGINE_COMPILED
+
+
+class TestHorizon(unittest.TestCase):
+
+    def test_fixed_lengths_without_continuation_probability(self):
+        """Tests whether every game lasts the given iterations without a continuation probability"""
+        self.assertEqual(sample_game_lengths(4, None, 7), [7, 7, 7, 7])
+        self.assertEqual(sample_game_lengths(3, 0.0, 7), [1, 1, 1])
+
+    def test_geometric_lengths(self):
+        """Tests whether game lengths are geometric with mean 1 / (1 - continuation probability)"""
+        random.seed(0)
+        lengths = sample_game_lengths(20000, 0.9)
+        self.assertEqual(min(lengths), 1)
+        self.assertAlmostEqual(sum(lengths) / len(lengths), 10, delta=0.3)
+
+    def test_ragged_games_match_single_games(self):
+        """Tests whether games of different lengths in one batch play as they would alone"""
+        tables = FSMTables([TFTBot.fsm, DefectBot.fsm, GrimBot.fsm])
+        rows1 = np.array([0, 2, 0, 2])
+        rows2 = np.array([1, 1, 2, 0])
+        lengths = np.array([3, 12, 1, 7])
+        payoffs, cooperations = play_fsm_games(tables, rows1, rows2, lengths, np.random.default_rng(0))
+        for game in range(len(lengths)):
+            single_payoffs, single_cooperations = play_fsm_games(
+                tables, rows1[game:game + 1], rows2[game:game + 1], lengths[game], np.random.default_rng(0))
+            self.assertEqual(payoffs[game].tolist(), single_payoffs[0].tolist())
+            self.assertEqual(cooperations[game].tolist(), single_cooperations[0].tolist())
+
+    def test_engines_agree_on_sampled_lengths(self):
+        """Tests whether both engines play the same sampled horizons and count the actual turns"""
+        for engine in (ENGINE_PYTHON, ENGINE_COMPILED):
+            random.seed(3)
+            expected_turns = sum(sample_game_lengths(30, 0.8))
+            random.seed(3)
+            stats = play_pairing(GrimBot(), DefectBot(), 30, ITERATIONS, None, 0, engine=engine,
+                                 continuation_probability=0.8)
+            self.assertEqual(stats["GrimBot"][MATCHES_PLAYED], expected_turns)
+            # Grim only cooperates on the first turn of every game
+            self.assertEqual(stats["GrimBot"][COOPERATE_COUNT], 30)
+
+    def test_compiled_learner_counts_actual_turns(self):
+        """Tests whether the kernel and the self-play batch count the turns of ragged games"""
+        random.seed(4)
+        stats = play_pairing(QLearningAgent(), TFTBot(), 25, ITERATIONS, None, 0, engine=ENGINE_COMPILED,
+                             continuation_probability=0.9)
+        random.seed(4)
+        self.assertEqual(stats["QLearningAgent"][MATCHES_PLAYED], sum(sample_game_lengths(25, 0.9)))
+
+        lengths = np.array([[3, 1], [5, 8]])
+        learners = [QLearningAgent(name=f"QLearningAgent_{i}") for i in range(1, 4)]
+        results = play_learner_pairings([(learners[0], learners[1]), (learners[0], learners[2])],
+                                        lengths, np.random.default_rng(0))
+        self.assertEqual([result["QLearningAgent_1"][MATCHES_PLAYED] for result in results], [8, 9])
+
+
+if __name__ == "__main__":
+    unittest.main()
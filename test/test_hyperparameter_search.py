@@ -0,0 +1,56 @@
+import contextlib
+import io
+import random
+import unittest
+
+from model.hyperparameter_search import SEARCH_SPACE, sample_candidates, successive_halving, hyperband, score
+
+
+def search(candidates, **options):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return successive_halving(candidates, iterations=10, seed=1, **options)
+
+
+class TestHyperparameterSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.candidates = sample_candidates(8, random.Random(0))
+
+    def test_candidates_within_space(self):
+        """Tests whether every sampled hyperparameter lies in its range"""
+        for candidate in self.candidates:
+            for name, (low, high) in SEARCH_SPACE.items():
+                self.assertTrue(low <= candidate[name] <= high, msg=name)
+
+    def test_rungs_halve_and_resume(self):
+        """Tests whether each rung keeps half the candidates and trains them on from where they stopped"""
+        result = search(self.candidates, min_rounds=5, max_rounds=20, eta=2)
+        self.assertEqual([rung['rounds'] for rung in result['rungs']], [5, 10, 20])
+        self.assertEqual([len(rung['survivors']) for rung in result['rungs']], [4, 2, 1])
+        rounds = sorted(candidate['rounds'] for candidate in result['candidates'])
+        self.assertEqual(rounds, [5, 5, 5, 5, 10, 10, 20, 20])
+        best = result['best']
+        self.assertIs(best, result['candidates'][result['rungs'][-1]['survivors'][0]])
+        self.assertEqual(len(best['curve']), 20)
+        self.assertEqual(best['score'], score(best['curve'], 2))
+        finalists = [candidate for candidate in result['candidates'] if candidate['rounds'] == 20]
+        self.assertEqual(best['score'], max(candidate['score'] for candidate in finalists))
+
+    def test_workers_do_not_change_results(self):
+        """Tests whether a search spread over processes finds the same curves"""
+        serial = search(self.candidates[:4], min_rounds=3, max_rounds=6)
+        parallel = search(self.candidates[:4], min_rounds=3, max_rounds=6, workers=2)
+        self.assertEqual(serial, parallel)
+
+    def test_hyperband_brackets(self):
+        """Tests whether Hyperband runs every bracket up to the full budget and picks the best finalist"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = hyperband(max_rounds=8, min_rounds=2, eta=2, seed=3, iterations=5)
+        self.assertEqual([len(bracket['candidates']) for bracket in result['brackets']], [4, 3, 3])
+        for bracket in result['brackets']:
+            self.assertEqual(bracket['best']['rounds'], 8)
+        self.assertEqual(result['best']['score'], max(bracket['best']['score'] for bracket in result['brackets']))
+
+
+if __name__ == '__main__':
+    unittest.main()
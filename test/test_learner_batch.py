@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+
+from model.QLearningAgent import QLearningAgent
+from model.constants import *
+from model.engine.learner_batch import play_learner_pairings
+from model.tournamentManager import play_pairing, simulate_round_robin, ENGINE_COMPILED
+
+
+class TestLearnerBatch(unittest.TestCase):
+
+    def greedy_learners(self, count):
+        learners = [QLearningAgent(name=f"QLearningAgent_{number}") for number in range(count)]
+        for learner in learners:
+            for other in learners:
+                if other is not learner:
+                    learner.set_exploration_rate(other.get_name(), 0.0)
+        return learners
+
+    def test_both_sides_learn_in_python_engine(self):
+        """Tests whether play_game updates both Q-learning agents"""
+        agent1, agent2 = QLearningAgent(name="A"), QLearningAgent(name="B")
+        play_pairing(agent1, agent2, 2, 10, None, 0)
+        self.assertNotEqual(agent1.get_qtable_for_opponent("B").get_table()[COOPERATE],
+                            {COOPERATE: 0.0, DEFECT: 0.0})
+        self.assertNotEqual(agent2.get_qtable_for_opponent("A").get_table()[COOPERATE],
+                            {COOPERATE: 0.0, DEFECT: 0.0})
+
+    def test_batch_matches_python_engine_when_greedy(self):
+        """Tests whether the batched update gives the same Q-tables and stats as play_game"""
+        python_learners = self.greedy_learners(3)
+        batch_learners = self.greedy_learners(3)
+        pairs = [(0, 1), (0, 2), (1, 2)]
+
+        # Make the tables differ between pairings, so that the greedy choices differ too
+        for learners in (python_learners, batch_learners):
+            learners[0].get_qtable_for_opponent("QLearningAgent_2").set_q_value(COOPERATE, DEFECT, 1.0)
+
+        expected = [play_pairing(python_learners[i], python_learners[j], 5, 20, None, 0) for i, j in pairs]
+        actual = play_learner_pairings([(batch_learners[i], batch_learners[j]) for i, j in pairs],
+                                       np.full((5, len(pairs)), 20), np.random.default_rng(0))
+        self.assertEqual(actual, expected)
+        for python_learner, batch_learner in zip(python_learners, batch_learners):
+            for opponent, table in python_learner.get_qtables().items():
+                for state in (COOPERATE, DEFECT):
+                    for action in (COOPERATE, DEFECT):
+                        self.assertAlmostEqual(table.get_q_value(state, action),
+                                               batch_learner.get_q_value(opponent, state, action), places=12)
+
+    def test_self_play_tournament(self):
+        """Tests whether N learners play every pairing of a self-play tournament"""
+        tournament_stats, aggregate_stats = simulate_round_robin(
+            rounds=3, iterations=5, bot_names=[], num_learners=4, engine=ENGINE_COMPILED, seed=1)
+        self.assertEqual(len(tournament_stats), 6)
+        self.assertEqual(aggregate_stats["QLearningAgent_1"][MATCHES_PLAYED], 3 * 3 * 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
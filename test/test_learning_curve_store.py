@@ -0,0 +1,91 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from model.constants import *
+from model.logging.InteractionLogger import InteractionLogger
+from model.logging.LearningCurveStore import LearningCurveStore, CURVE_SERIES, TURN_DTYPE
+from model.logging.ResultsPipeline import ResultsPipeline, CurveWriter
+from model.tournamentManager import simulate_round_robin
+
+
+def random_turns(length, rng):
+    turns = np.zeros(length, dtype=TURN_DTYPE)
+    for series in CURVE_SERIES:
+        turns[series] = rng.random(length)
+    return turns
+
+
+class TestLearningCurveStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_levels_match_turns(self):
+        """Tests whether every bucket of every level holds the count, min, mean and max of its turns"""
+        rng = np.random.default_rng(0)
+        parts = [random_turns(length, rng) for length in (3, 10, 1, 50, 7)]
+        with LearningCurveStore(self.directory, mode="w") as store:
+            for part in parts:
+                store.append("QLearningAgent", "TFTBot", part)
+        turns = np.concatenate(parts)
+
+        reader = LearningCurveStore(self.directory)
+        self.assertEqual([reader.length("QLearningAgent", "TFTBot", level) for level in range(5)], [71, 18, 5, 2, 1])
+        for level in range(1, reader.levels("QLearningAgent", "TFTBot")):
+            size = reader.factor ** level
+            for bucket, row in enumerate(reader.level("QLearningAgent", "TFTBot", level)):
+                covered = turns[bucket * size:(bucket + 1) * size]
+                self.assertEqual(row['count'], len(covered))
+                for series in CURVE_SERIES:
+                    self.assertEqual(row[f"{series}_min"], covered[series].min())
+                    self.assertAlmostEqual(row[f"{series}_mean"], covered[series].astype(float).mean(), places=5)
+                    self.assertEqual(row[f"{series}_max"], covered[series].max())
+
+    def test_read_picks_level(self):
+        """Tests whether reads come from the finest level that fits the range in max_points buckets"""
+        with LearningCurveStore(self.directory, mode="w") as store:
+            store.append("QLearningAgent", "TFTBot", random_turns(1000, np.random.default_rng(1)))
+        reader = LearningCurveStore(self.directory)
+        whole = reader.read("QLearningAgent", "TFTBot", max_points=100)
+        self.assertEqual(whole['level'], 2)
+        self.assertEqual(whole['count'].sum(), 1000)
+        zoomed = reader.read("QLearningAgent", "TFTBot", 100, 180, max_points=100)
+        self.assertEqual(zoomed['level'], 0)
+        self.assertEqual(zoomed['turn'].tolist(), list(range(100, 180)))
+        self.assertEqual(reader.read("QLearningAgent", "TFTBot", max_points=1)['level'], 5)
+
+    def test_tournament_curves(self):
+        """Tests whether the curves built during a tournament, directly or streamed, hold every logged turn"""
+        for streamed in (False, True):
+            logger = InteractionLogger()
+            store = LearningCurveStore(self.directory, mode="w")
+            pipeline = ResultsPipeline([CurveWriter(store)]) if streamed else None
+            try:
+                simulate_round_robin(logger=logger, bot_names=["QLearningAgent", "TFTBot", "DefectBot"], rounds=3,
+                                     iterations=10, num_tournaments=2, seed=2, curves=store, pipeline=pipeline)
+            finally:
+                if pipeline is not None:
+                    pipeline.close()
+            store.close()
+
+            reader = LearningCurveStore(self.directory)
+            self.assertEqual(sorted(reader.keys), [("QLearningAgent", "DefectBot"), ("QLearningAgent", "TFTBot")])
+            for agent, opponent in reader.keys:
+                records = [record for record in logger.records()
+                           if record['agent_name'] == agent and record['opponent_name'] == opponent]
+                turns = reader.level(agent, opponent, 0)
+                if not streamed:
+                    self.assertEqual(len(turns), len(records))
+                    self.assertEqual(turns['reward'].tolist(), [record['reward'] for record in records])
+                    self.assertEqual(turns['cooperation'].tolist(),
+                                     [float(record['action_taken'] == COOPERATE) for record in records])
+                top = reader.level(agent, opponent, reader.levels(agent, opponent) - 1)
+                self.assertEqual(top['count'].tolist(), [2 * 3 * 10])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+
+from model.QLearningAgent import QLearningAgent
+from model.bots.DefectBot import DefectBot
+from model.bots.FSMSpec import FSMSpec
+from model.bots.GrimBot import GrimBot
+from model.bots.TFT90Bot import TFT90Bot
+from model.bots.TFTBot import TFTBot
+from model.constants import *
+from model.engine.fsm_engine import FSMTables, play_fsm_games
+from model.engine.markov import JointChains, expected_round_robin, cross_check
+from model.tournamentManager import simulate_round_robin
+
+# Tit-for-tat that opens with a defection
+SUSPICIOUS_TFT = FSMSpec("SuspiciousTFT", transitions=[[0, 1], [0, 1]], defect_probabilities=[0.0, 1.0],
+                         initial_state=1)
+
+
+class TestMarkov(unittest.TestCase):
+
+    def test_deterministic_pairings_are_exact(self):
+        """Tests whether deterministic pairings get exactly the payoffs they play"""
+        tables = FSMTables([TFTBot.fsm, DefectBot.fsm, GrimBot.fsm])
+        chains = JointChains(tables, [0, 2], [1, 0])
+        payoffs, cooperations = chains.expected(chains.visits(10))
+        simulated, simulated_cooperations = play_fsm_games(tables, np.array([0, 2]), np.array([1, 0]), 10,
+                                                           np.random.default_rng(0))
+        np.testing.assert_allclose(payoffs, simulated)
+        np.testing.assert_allclose(cooperations, simulated_cooperations)
+
+    def test_transitions_are_stochastic(self):
+        """Tests whether every row of every transition matrix sums to 1 under noise"""
+        tables = FSMTables([TFT90Bot.fsm, GrimBot.fsm])
+        chains = JointChains(tables, [0, 1], [1, 0], error_rate=0.1, misperception_rate=[0.0, 0.2])
+        np.testing.assert_allclose(chains.transitions.sum(axis=-1), 1.0)
+
+    def test_horizons_agree(self):
+        """Tests whether long fixed and geometric horizons approach the long-run payoffs"""
+        tables = FSMTables([TFT90Bot.fsm, TFTBot.fsm])
+        chains = JointChains(tables, [0], [1], error_rate=0.05)
+        long_run = chains.expected(chains.stationary())[0]
+        np.testing.assert_allclose(chains.expected(chains.visits(100000))[0] / 100000, long_run, atol=1e-4)
+        np.testing.assert_allclose(chains.expected(chains.discounted_visits(0.99999))[0] * 1e-5, long_run, atol=1e-4)
+
+    def test_periodic_chain_averages(self):
+        """Tests whether an alternating pairing averages over its cycle in the long run"""
+        chains = JointChains(FSMTables([TFTBot.fsm, SUSPICIOUS_TFT]), [0], [1])
+        np.testing.assert_allclose(chains.expected(chains.stationary())[0], [[2.5, 2.5]])
+
+    def test_cross_check_against_simulation(self):
+        """Tests whether the simulated payoffs of TFT90Bot stay close to their exact expectation"""
+        bots = [TFT90Bot(), GrimBot(), DefectBot(), QLearningAgent()]
+        tournament_stats, _ = simulate_round_robin(bots=bots, rounds=300, iterations=20, seed=0, error_rate=0.05)
+        expected = expected_round_robin(bots, 300, 20, error_rate=0.05)
+        # Learner pairings are left out
+        self.assertEqual(sorted(expected), [0, 1, 3])
+        for row in cross_check(tournament_stats, expected):
+            self.assertAlmostEqual(row['simulated_payoff'], row['exact_payoff'], delta=0.05)
+            self.assertAlmostEqual(row['simulated_cooperation'], row['exact_cooperation'], delta=0.02)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import random
+import unittest
+
+import numpy as np
+
+from model.QLearningAgent import QLearningAgent
+from model.bots.DefectBot import DefectBot
+from model.bots.TFTBot import TFTBot
+from model.constants import *
+from model.engine.fsm_engine import play_pairing_batched
+from model.engine.noise_sweep import noise_sweep
+from model.tournamentManager import play_pairing, apply_noise, ENGINE_COMPILED
+
+
+class TestNoise(unittest.TestCase):
+
+    def test_apply_noise(self):
+        """Tests whether noise flips moves at the given rate and never at rate 0"""
+        random.seed(0)
+        self.assertEqual(apply_noise(COOPERATE, 0.0), COOPERATE)
+        self.assertEqual(apply_noise(COOPERATE, 1.0), DEFECT)
+        self.assertEqual(apply_noise(DEFECT, 1.0), COOPERATE)
+        flips = sum(apply_noise(COOPERATE, 0.2) == DEFECT for _ in range(10000))
+        self.assertAlmostEqual(flips / 10000, 0.2, delta=0.02)
+
+    def test_error_rate_in_python_engine(self):
+        """Tests whether DefectBot cooperates at about the error rate when its moves are misexecuted"""
+        random.seed(1)
+        stats = play_pairing(DefectBot(), TFTBot(), 20, 50, None, 0, error_rate=0.1)
+        self.assertAlmostEqual(stats["DefectBot"][COOPERATE_COUNT] / stats["DefectBot"][MATCHES_PLAYED],
+                               0.1, delta=0.03)
+
+    def test_misperception_only_changes_what_is_seen(self):
+        """Tests whether misperception never changes the executed moves of unconditional bots"""
+        stats = play_pairing_batched(DefectBot(), DefectBot(), [20] * 10, np.random.default_rng(0),
+                                     misperception_rate=0.5)
+        self.assertEqual(stats["DefectBot"][COOPERATE_COUNT], 0)
+
+    def test_engines_agree_on_noisy_tft(self):
+        """Tests whether the python and FSM engines agree on TFTBot's cooperation rate under noise"""
+        random.seed(2)
+        python_stats = play_pairing(TFTBot(), DefectBot(), 200, 50, None, 0, error_rate=0.05)
+        fsm_stats = play_pairing_batched(TFTBot(), DefectBot(), [50] * 200, np.random.default_rng(2),
+                                         error_rate=0.05)
+        for stats in (python_stats, fsm_stats):
+            stats["rate"] = stats["TFTBot"][COOPERATE_COUNT] / stats["TFTBot"][MATCHES_PLAYED]
+        self.assertAlmostEqual(python_stats["rate"], fsm_stats["rate"], delta=0.02)
+
+    def test_compiled_engine_with_noise(self):
+        """Tests whether the compiled engine applies the error rate to the Q-learning pairing"""
+        agent = QLearningAgent()
+        agent.set_exploration_rate("DefectBot", 0.0)
+        stats = play_pairing(agent, DefectBot(), 50, 20, None, 0, engine=ENGINE_COMPILED, error_rate=0.2)
+        self.assertAlmostEqual(stats["DefectBot"][COOPERATE_COUNT] / stats["DefectBot"][MATCHES_PLAYED],
+                               0.2, delta=0.03)
+
+    def test_noise_sweep(self):
+        """Tests whether cooperation between TFT bots falls with noise and sweeps do not depend on workers"""
+        levels = [(0.0, 0.0), (0.05, 0.0), (0.0, 0.05)]
+        serial = noise_sweep(TFTBot.fsm, TFTBot.fsm, levels, replicates=4, rounds=20, iterations=50, seed=3)
+        parallel = noise_sweep(TFTBot.fsm, TFTBot.fsm, levels, replicates=4, rounds=20, iterations=50, seed=3,
+                               workers=2)
+        self.assertTrue(np.array_equal(serial['average_payoffs'], parallel['average_payoffs']))
+        self.assertEqual(serial['average_payoffs'].shape, (3, 4, 2))
+        self.assertTrue(np.all(serial['average_payoffs'][0] == 3))
+        self.assertTrue(np.all(serial['cooperation_rates'][1:] < 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
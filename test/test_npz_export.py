@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+from model.constants import *
+from model.logging.npz_export import export_tournament_results_npz, load_tournament_results_npz
+from model.tournamentManager import simulate_round_robin, run_round_robin
+
+
+class TestNpzExport(unittest.TestCase):
+
+    def test_round_trip(self):
+        """Tests whether the typed tables hold the same numbers as the stats they were exported from"""
+        tournament_stats, aggregate_stats = simulate_round_robin(
+            rounds=2, iterations=5, num_tournaments=2, bot_names=["TFTBot", "DefectBot", "GrimBot"], seed=0)
+        with tempfile.TemporaryDirectory() as output_dir:
+            filename = os.path.join(output_dir, RESULTS_FILE)
+            export_tournament_results_npz(aggregate_stats, tournament_stats, 2, filename, metadata={'seed': 0})
+            results = load_tournament_results_npz(filename)
+
+        matches = results['matches']
+        self.assertEqual(len(matches), 2 * 3 * 2)
+        self.assertEqual(matches['tournament'].tolist(), [1] * 6 + [2] * 6)
+        first = matches[0]
+        stats = tournament_stats[0][results['bot_names'][first['bot']]]
+        self.assertEqual(first['total_payoff'], stats[TOTAL_PAYOFF])
+        self.assertEqual(first['cooperate_count'], stats[COOPERATE_COUNT])
+
+        averages = results['averages']
+        defect = averages[results['bot_names'].index("DefectBot")]
+        self.assertEqual(defect['matches_played'], aggregate_stats["DefectBot"][MATCHES_PLAYED])
+        self.assertEqual(defect['cooperation_rate'], 0.0)
+        self.assertEqual(results['metadata']['seed'], 0)
+        self.assertEqual(results['metadata']['num_tournaments'], 2)
+
+    def test_run_records_parameters(self):
+        """Tests whether a run writes the typed tables with its parameters next to the human export"""
+        with tempfile.TemporaryDirectory() as output_dir:
+            run_round_robin(bot_names=["TFTBot", "DefectBot"], rounds=2, iterations=5, seed=3,
+                            output_dir=output_dir, plots=False)
+            metadata = load_tournament_results_npz(os.path.join(output_dir, RESULTS_FILE))['metadata']
+        self.assertEqual((metadata['seed'], metadata['rounds'], metadata['iterations']), (3, 2, 5))
+        self.assertEqual(metadata['bot_names'], ["TFTBot", "DefectBot"])
+
+
+if __name__ == "__main__":
+    unittest.main()
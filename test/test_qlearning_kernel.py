@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+from model.QLearningAgent import QLearningAgent
+from model.bots.GrimBot import GrimBot
+from model.bots.TFTBot import TFTBot
+from model.bots.TFT90Bot import TFT90Bot
+from model.constants import *
+from model.engine import qlearning_kernel
+from model.tournamentManager import play_pairing, ENGINE_COMPILED
+
+
+class TestQLearningKernel(unittest.TestCase):
+
+    def greedy_agent(self, opponent_name):
+        agent = QLearningAgent()
+        agent.initialize_q_table_for_opponent(opponent_name)
+        agent.set_exploration_rate(opponent_name, 0.0)
+        return agent
+
+    def test_matches_python_engine_when_greedy(self):
+        """Tests whether the kernel plays the same games as play_game for deterministic bots"""
+        for opponent_type in (TFTBot, GrimBot):
+            name = opponent_type.__name__
+            python_agent = self.greedy_agent(name)
+            kernel_agent = self.greedy_agent(name)
+
+            python_stats = play_pairing(python_agent, opponent_type(), 20, 30, None, 0)
+            kernel_stats = qlearning_kernel.play_pairing_compiled(
+                kernel_agent, opponent_type(), [30] * 20, np.random.default_rng(0))
+
+            self.assertEqual(python_stats, kernel_stats)
+            for state in (COOPERATE, DEFECT):
+                for action in (COOPERATE, DEFECT):
+                    self.assertAlmostEqual(python_agent.get_q_value(name, state, action),
+                                           kernel_agent.get_q_value(name, state, action), places=12)
+
+    def test_backends_identical(self):
+        """Tests whether the compiled kernel and the Python fallback give identical results"""
+        draws = qlearning_kernel.draw_random_numbers(np.random.default_rng(5), 50 * 40)
+        results = []
+        for compiled in (True, False):
+            q = np.zeros((3, 2))
+            payoffs, cooperations, rate = qlearning_kernel.play_qlearning_games(
+                q, TFT90Bot.fsm, [40] * 50, 1.0, DECAY_RATE,
+                LEARNING_RATE, DISCOUNT_FACTOR, draws, compiled=compiled)
+            results.append((q, payoffs, cooperations, rate))
+        self.assertTrue(np.array_equal(results[0][0], results[1][0]))
+        self.assertTrue(np.array_equal(results[0][1], results[1][1]))
+        self.assertTrue(np.array_equal(results[0][2], results[1][2]))
+        self.assertEqual(results[0][3], results[1][3])
+
+    def test_compiled_engine_decays_exploration(self):
+        """Tests whether the compiled engine decays the exploration rate once per round"""
+        agent = QLearningAgent()
+        stats = play_pairing(agent, TFTBot(), 10, 5, None, 0, engine=ENGINE_COMPILED)
+        self.assertAlmostEqual(agent.get_exploration_rate("TFTBot"), DEFAULT_EXPLORATION_RATE * DECAY_RATE ** 10)
+        self.assertEqual(stats["QLearningAgent"][MATCHES_PLAYED], 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import contextlib
+import io
+import random
+import sys
+import unittest
+
+from model.QLearningAgent import QLearningAgent
+from model.bots.GrimBot import GrimBot
+from model.bots.TFT90Bot import TFT90Bot
+from model.bots.TFTBot import TFTBot
+from model.constants import *
+from model.logging.HistoryStore import HistoryBuffer
+from model.remote import BotServer, RemoteBot, RemoteConnection, answer, play_pairing_batched
+from model.tournamentManager import play_pairing, simulate_round_robin, sample_game_lengths
+
+
+class TestRemote(unittest.TestCase):
+
+    def setUp(self):
+        self.server = BotServer(TFTBot, port=0)
+        self.connection = RemoteConnection(self.server.address)
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.close()
+
+    def test_batched_pairing_matches_local(self):
+        """Tests whether pipelined batches of moves give the stats and history of the strategy played locally"""
+        random.seed(4)
+        local_history = HistoryBuffer(1, 0, ("TFTBot", "GrimBot"))
+        local = play_pairing(TFTBot(), GrimBot(), 30, 0, None, 0, continuation_probability=0.9,
+                             history=local_history)
+        random.seed(4)
+        lengths = sample_game_lengths(30, 0.9)
+        for depth in (1, 4, 64):
+            history = HistoryBuffer(1, 0, ("TFTBot", "GrimBot"))
+            remote = play_pairing_batched(RemoteBot(self.connection, "TFTBot"), GrimBot(), lengths,
+                                          history=history, depth=depth)
+            self.assertEqual(remote, local)
+            self.assertEqual([list(game) for game in history.games], [list(game) for game in local_history.games])
+
+        # Both sides remote, on one connection
+        batches = self.connection.batches
+        remote = play_pairing(RemoteBot(self.connection, "TFTBot"), RemoteBot(self.connection, "Copy"), 20, 10, None, 0)
+        self.assertEqual(remote["Copy"], {TOTAL_PAYOFF: 600, MATCHES_PLAYED: 200, COOPERATE_COUNT: 200, DEFECT_COUNT: 0})
+        self.assertEqual(remote["TFTBot"], remote["Copy"])
+        self.assertEqual(self.connection.batches - batches, 2 * 10 * REMOTE_PIPELINE_DEPTH)
+
+    def test_round_robin(self):
+        """Tests whether a remote strategy plays learners move by move as it would locally, and noisy runs reproduce"""
+        def run(first_bot, **parameters):
+            with contextlib.redirect_stdout(io.StringIO()):
+                return simulate_round_robin(bots=[first_bot, QLearningAgent(), TFT90Bot()], rounds=5, iterations=10,
+                                            seed=3, **parameters)
+        self.assertEqual(run(RemoteBot(self.connection, "TFTBot")), run(TFTBot()))
+        noisy = run(RemoteBot(self.connection, "TFTBot"), error_rate=0.1)
+        self.assertEqual(run(RemoteBot(self.connection, "TFTBot"), error_rate=0.1), noisy)
+
+    def test_pipe_server(self):
+        """Tests a server process over its pipes, and that ended games are dropped"""
+        command = [sys.executable, "bot_server.py", "--bot", "TFTBot", "--stdio"]
+        with RemoteConnection(command=command) as connection:
+            stats = play_pairing(RemoteBot(connection, "TFTBot"), GrimBot(), 10, 5, None, 0)
+            self.assertEqual(stats, play_pairing(TFTBot(), GrimBot(), 10, 5, None, 0))
+            self.assertEqual(connection.moves, 50)
+
+        games = {}
+        reply = answer({"type": "moves", "opponent": "DefectBot", "games": [0, 1], "last": "--"}, games, TFTBot)
+        self.assertEqual(reply, {"type": "actions", "actions": "CC"})
+        reply = answer({"type": "moves", "opponent": "DefectBot", "games": [0, 1], "last": "DC"}, games, TFTBot)
+        self.assertEqual(reply['actions'], "DC")
+        self.assertIsNone(answer({"type": "end", "games": [0]}, games, TFTBot))
+        self.assertEqual(list(games), [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+
+from model.ExplorationSchedule import (SCHEDULES, BoltzmannSchedule, describe_schedule,
+                                       schedule_from_description)
+from model.QLearningAgent import QLearningAgent
+from model.bots.TFTBot import TFTBot
+from model.reproducibility import digest_pairing, verify_run, REPRODUCIBILITY_FILE
+from model.tournamentManager import run_round_robin, play_pairing, ENGINE_COMPILED
+
+
+def reproducible_run(output_dir, **options):
+    run_round_robin(bot_names=["QLearningAgent", "TFTBot", "TFT90Bot"], rounds=4, iterations=10,
+                    output_dir=output_dir, plots=False, reproducible=True, **options)
+    return os.path.join(output_dir, REPRODUCIBILITY_FILE)
+
+
+class TestReproducibility(unittest.TestCase):
+
+    def test_digest_sees_learned_state(self):
+        """Tests whether the digest changes with the last bit of a learned Q-value"""
+        agent = QLearningAgent()
+        stats = play_pairing(agent, TFTBot(), 2, 5, None, 0)
+        digest = digest_pairing(stats, agent, TFTBot())
+        table = agent.get_qtable_for_opponent("TFTBot")
+        value = table.get_q_value("Cooperate", "Cooperate")
+        table.set_q_value("Cooperate", "Cooperate", value + value * 2 ** -52)
+        self.assertNotEqual(digest_pairing(stats, agent, TFTBot()), digest)
+
+    def test_parallel_run_verifies_serially(self):
+        """Tests whether a noisy parallel run reproduces pairing by pairing in a serial replay"""
+        with tempfile.TemporaryDirectory() as output_dir:
+            record_file = reproducible_run(output_dir, workers=2, seed=5, error_rate=0.05, num_tournaments=2)
+            self.assertEqual(verify_run(record_file, verbose=False), [])
+            self.assertEqual(verify_run(record_file, sample=2, verbose=False), [])
+
+    def test_compiled_learner_batch_verifies(self):
+        """Tests whether learner pairings trained in one batch replay with their batch"""
+        with tempfile.TemporaryDirectory() as output_dir:
+            record_file = reproducible_run(output_dir, engine=ENGINE_COMPILED, num_learners=2,
+                                           schedule=BoltzmannSchedule(temperature=2.0))
+            with open(record_file) as file:
+                record = json.load(file)
+            self.assertIsNotNone(record['seed'])
+            self.assertEqual(verify_run(record_file, verbose=False), [])
+
+    def test_tampered_record_is_caught(self):
+        """Tests whether a digest that does not match the replay is reported"""
+        with tempfile.TemporaryDirectory() as output_dir:
+            record_file = reproducible_run(output_dir, seed=1)
+            with open(record_file) as file:
+                record = json.load(file)
+            record['pairings'][1]['digest'] = "0" * 64
+            with open(record_file, 'w') as file:
+                json.dump(record, file)
+            mismatches = verify_run(record_file, verbose=False)
+        self.assertEqual([(entry['tournament'], entry['pairing']) for entry in mismatches], [(1, 1)])
+
+    def test_schedules_describe_round_trip(self):
+        """Tests whether every schedule can be created again from its description"""
+        for schedule_type in SCHEDULES.values():
+            description = describe_schedule(schedule_type())
+            self.assertEqual(describe_schedule(schedule_from_description(description)), description)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import csv
+import os
+import tempfile
+import threading
+import unittest
+
+from model.constants import *
+from model.logging.ResultsPipeline import ResultsPipeline, Consumer, PairingResult, AnalysisConsumer, TournamentResult
+from model.tournamentManager import run_round_robin
+
+
+class RecordingConsumer(Consumer):
+    def __init__(self, release=None):
+        self.items = []
+        self.closed = False
+        self.release = release
+
+    def consume(self, item):
+        if self.release is not None:
+            self.release.wait()
+        self.items.append(item)
+
+    def close(self):
+        self.closed = True
+
+
+class FailingConsumer(Consumer):
+    def consume(self, item):
+        raise OSError("disk full")
+
+
+class TestResultsPipeline(unittest.TestCase):
+
+    def test_items_reach_every_consumer_in_order(self):
+        """Tests whether every consumer sees every item in publishing order and is closed"""
+        consumers = [RecordingConsumer(), RecordingConsumer()]
+        pipeline = ResultsPipeline(consumers, max_pending=2)
+        for item in range(20):
+            pipeline.publish(item)
+        pipeline.close()
+        for consumer in consumers:
+            self.assertEqual(consumer.items, list(range(20)))
+            self.assertTrue(consumer.closed)
+
+    def test_backpressure(self):
+        """Tests whether publishing blocks while a slow consumer's queue is full"""
+        release = threading.Event()
+        pipeline = ResultsPipeline([RecordingConsumer(release)], max_pending=1)
+        publisher = threading.Thread(target=lambda: [pipeline.publish(item) for item in range(5)])
+        publisher.start()
+        publisher.join(timeout=0.2)
+        self.assertTrue(publisher.is_alive())
+        release.set()
+        publisher.join()
+        pipeline.close()
+
+    def test_consumer_errors_surface(self):
+        """Tests whether a failing consumer is reported instead of blocking the simulation"""
+        pipeline = ResultsPipeline([FailingConsumer()], max_pending=1)
+        with self.assertRaises(RuntimeError) as raised:
+            for item in range(10):
+                pipeline.publish(PairingResult(1, item, {}))
+        self.assertIsInstance(raised.exception.__cause__, OSError)
+        # Already raised, so closing on the way out does not raise it again
+        pipeline.close()
+
+        pipeline = ResultsPipeline([FailingConsumer()])
+        pipeline.publish(PairingResult(1, 0, {}))
+        with self.assertRaises(RuntimeError) as raised:
+            pipeline.close()
+        self.assertIsInstance(raised.exception.__cause__, OSError)
+
+    def test_streamed_run_matches_batch_run(self):
+        """Tests whether a streamed run gives the same stats and writes every pairing as it completes"""
+        with tempfile.TemporaryDirectory() as streamed_dir, tempfile.TemporaryDirectory() as batch_dir:
+            options = dict(bot_names=["QLearningAgent", "TFTBot", "GrimBot"], rounds=3, iterations=5,
+                           num_tournaments=2, seed=4, plots=False)
+            streamed = run_round_robin(output_dir=streamed_dir, stream=True, **options)
+            batch = run_round_robin(output_dir=batch_dir, **options)
+            self.assertEqual(streamed, batch)
+
+            with open(os.path.join(streamed_dir, "pairing_stats.csv")) as file:
+                rows = list(csv.DictReader(file))
+            self.assertEqual(len(rows), 2 * 3 * 2)
+            self.assertEqual(int(rows[0][MATCHES_PLAYED]), 15)
+            for name in ("tournament_stats.csv", "qlearning_detailed_log.csv"):
+                with open(os.path.join(streamed_dir, name)) as streamed_file, \
+                        open(os.path.join(batch_dir, name)) as batch_file:
+                    self.assertEqual(len(streamed_file.readlines()), len(batch_file.readlines()))
+
+    def test_analysis_leaves_pyplot_alone(self):
+        """Tests whether the plots drawn on the consumer thread are saved without switching pyplot's backend"""
+        import matplotlib
+        import matplotlib.pyplot as plt
+        # A backend other than Agg stands in for an interactive one
+        backend = matplotlib.get_backend()
+        plt.switch_backend("svg")
+        self.addCleanup(plt.switch_backend, backend)
+        with tempfile.TemporaryDirectory() as output_dir:
+            tournament_stats, aggregate_stats = run_round_robin(
+                bot_names=["QLearningAgent", "TFTBot"], rounds=2, iterations=5, output_dir=output_dir, plots=False)
+            pipeline = ResultsPipeline([AnalysisConsumer(output_dir)])
+            pipeline.publish(TournamentResult(1, tournament_stats, aggregate_stats))
+            pipeline.close()
+            self.assertTrue(os.path.exists(os.path.join(output_dir, "analysis_results.png")))
+        self.assertEqual(matplotlib.get_backend(), "svg")
+        self.assertEqual(plt.get_fignums(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from model.QLearningAgent import QLearningAgent
+from model.bots.CooperateBot import CooperateBot
+from model.bots.DefectBot import DefectBot
+from model.bots.TFTBot import TFTBot
+from model.scheduling import PairingCostModel, pairing_kind, plan_chunks
+from model.tournamentManager import simulate_round_robin, ENGINE_PYTHON
+
+BOTS = ["QLearningAgent", "TFTBot", "DefectBot", "CooperateBot"]
+
+
+class TestScheduling(unittest.TestCase):
+
+    def test_chunks_longest_first(self):
+        """Tests whether chunks hand out every pairing once, expensive ones alone and first"""
+        costs = [0.01, 5.0, 0.02, 3.0, 0.01, 0.01, 1.0, 0.02]
+        chunks = plan_chunks(costs, workers=2, min_chunk=0.05)
+        self.assertEqual(sorted(position for chunk in chunks for position in chunk), list(range(len(costs))))
+        self.assertEqual(chunks[:3], [[1], [3], [6]])
+        self.assertLess(len(chunks), len(costs))
+        order = [position for chunk in chunks for position in chunk]
+        self.assertEqual([costs[position] for position in order], sorted(costs, reverse=True))
+
+    def test_cost_model(self):
+        """Tests the priors, their calibration by measured kinds, and saving the timings"""
+        model = PairingCostModel()
+        learner = pairing_kind(QLearningAgent(), TFTBot(), ENGINE_PYTHON, logged=True)
+        silent_learner = pairing_kind(TFTBot(), QLearningAgent(), ENGINE_PYTHON, logged=False)
+        strategies = pairing_kind(CooperateBot(), DefectBot(), ENGINE_PYTHON, logged=True)
+        self.assertEqual(strategies, pairing_kind(DefectBot(), CooperateBot(), ENGINE_PYTHON, logged=False))
+        self.assertGreater(model.estimate(learner, 100), model.estimate(silent_learner, 100))
+        self.assertGreater(model.estimate(silent_learner, 100), model.estimate(strategies, 100))
+
+        # A machine twice as slow as the priors
+        model.record(strategies, 1000, 2 * 1000 * model.prior(strategies))
+        self.assertAlmostEqual(model.seconds_per_turn(learner), 2 * model.prior(learner))
+        model.record(strategies, 1000, 4 * 1000 * model.prior(strategies))
+        self.assertAlmostEqual(model.seconds_per_turn(strategies), 3 * model.prior(strategies))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "pairing_costs.json")
+            model.save(path)
+            self.assertEqual(PairingCostModel.load(path).turn_seconds, model.turn_seconds)
+            self.assertEqual(PairingCostModel.load(os.path.join(directory, "missing.json")).turn_seconds, {})
+
+    def test_scheduled_run_matches_serial(self):
+        """Tests whether a scheduled parallel run gives the serial results and times every kind of pairing"""
+        model = PairingCostModel()
+        with contextlib.redirect_stdout(io.StringIO()):
+            serial = simulate_round_robin(bot_names=BOTS, rounds=3, iterations=10, num_tournaments=2, seed=5)
+            parallel = simulate_round_robin(bot_names=BOTS, rounds=3, iterations=10, num_tournaments=2, seed=5,
+                                            workers=2, cost_model=model)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(len(model.turn_seconds), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import subprocess
+import sys
+import unittest
+
+
+class TestStartup(unittest.TestCase):
+
+    def assert_not_imported(self, statement, modules):
+        probe = f"{statement}\nimport sys\nprint(','.join(m for m in {modules!r} if m in sys.modules))"
+        result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "", msg=f"'{statement}' imported {result.stdout.strip()}")
+
+    def test_tournament_manager_is_lazy(self):
+        """Importing the tournament engine must not load matplotlib or pandas"""
+        self.assert_not_imported("import model.tournamentManager", ["matplotlib", "pandas"])
+
+    def test_entry_points_are_lazy(self):
+        """The CLI and worker entry points must not load matplotlib or pandas"""
+        self.assert_not_imported("import main", ["matplotlib", "pandas"])
+        self.assert_not_imported("import worker", ["matplotlib", "pandas"])
+
+    def test_no_stray_output(self):
+        """Importing the entry point and logger must not print anything"""
+        result = subprocess.run([sys.executable, "-c", "import main, model.logging.InteractionLogger"],
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import contextlib
+import io
+import unittest
+
+from model.QLearningAgent import QLearningAgent
+from model.bots.DefectBot import DefectBot
+from model.bots.GrimBot import GrimBot
+from model.bots.TFTBot import TFTBot
+from model.constants import *
+from model.logging.InteractionLogger import InteractionLogger
+from model.logging.ResultsPipeline import PairingResult, TournamentResult
+from model.tournamentManager import simulate_round_robin, stream_round_robin, iter_round_robin, TURN_FIELDS
+
+BOTS = ["QLearningAgent", "TFTBot", "DefectBot", "GrimBot"]
+RUN = {'bot_names': BOTS, 'rounds': 3, 'iterations': 12, 'num_tournaments': 2, 'seed': 7}
+
+
+def simulate(**parameters):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return simulate_round_robin(**parameters)
+
+
+class TestStreamRoundRobin(unittest.TestCase):
+
+    def test_stream_matches_simulation(self):
+        """Tests whether playing every streamed pairing gives the stats and log of simulate_round_robin"""
+        logger = InteractionLogger()
+        expected_logger = InteractionLogger()
+        tournament_stats, _ = simulate(logger=expected_logger, **RUN)
+        stats = [pairing.play() for pairing in stream_round_robin(logger=logger, **RUN)]
+        self.assertEqual(stats, tournament_stats)
+        self.assertEqual([{key: value for key, value in record.items() if key != 'timestamp'}
+                          for record in logger.records()],
+                         [{key: value for key, value in record.items() if key != 'timestamp'}
+                          for record in expected_logger.records()])
+
+    def test_turn_batches(self):
+        """Tests whether the turn batches of every game add up to the pairing's stats"""
+        pairing = next(stream_round_robin(**{**RUN, 'iterations': 10}, batch_size=4))
+        payoffs = [0, 0]
+        for number, game in enumerate(pairing.games()):
+            self.assertEqual(game.number, number)
+            batches = list(game.turns())
+            self.assertEqual([len(batch) for batch in batches], [4, 4, 2])
+            for turn in (turn for batch in batches for turn in batch):
+                self.assertEqual(len(turn), len(TURN_FIELDS))
+                payoffs[0] += turn[3]
+                payoffs[1] += turn[4]
+        self.assertEqual(payoffs, [pairing.stats[name][TOTAL_PAYOFF] for name in pairing.bot_names])
+
+    def test_skipping_and_stopping(self):
+        """Tests whether skipped pairings are not played and leave the others' results unchanged"""
+        tournament_stats, _ = simulate(**RUN)
+        odd = [pairing.play() for pairing in stream_round_robin(**RUN) if pairing.index % 2]
+        self.assertEqual(odd, [stats for position, stats in enumerate(tournament_stats) if position % 6 % 2])
+
+        bots = [QLearningAgent(), TFTBot(), DefectBot(), GrimBot()]
+        for pairing in stream_round_robin(bots=bots, rounds=3, iterations=12, batch_size=4):
+            for game in pairing.games():
+                next(game.turns())
+                break
+            break
+        # Only the first turns of the first game were played
+        self.assertEqual(list(bots[0].get_qtables()), ["TFTBot"])
+        self.assertEqual(bots[0].get_exploration_round("TFTBot"), 0)
+        self.assertEqual(pairing.stats["TFTBot"][MATCHES_PLAYED], 4)
+
+    def test_iter_round_robin(self):
+        """Tests whether results come pairing by pairing and tournament by tournament, lazily"""
+        results = list(iter_round_robin(**RUN))
+        kinds = [type(result) for result in results]
+        self.assertEqual(kinds, ([PairingResult] * 6 + [TournamentResult]) * 2)
+        self.assertEqual(results[-1].tournament_stats, simulate(**RUN)[0])
+
+        bots = [QLearningAgent(), TFTBot(), DefectBot()]
+        first = next(iter_round_robin(bots=bots, rounds=2, iterations=5))
+        self.assertEqual(first.index, 0)
+        self.assertEqual(list(bots[0].get_qtables()), ["TFTBot"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import pickle
+import unittest
+
+from model.constants import *
+from model.logging.InteractionLogger import InteractionLogger
+from model.logging.SymbolTable import SymbolTable, ACTIONS, STATES
+
+
+def log_turn(logger, agent_name, opponent_name, action=DEFECT):
+    logger.log_interaction(1, 0, 0, agent_name, opponent_name, COOPERATE, action, 5,
+                           {'COOPERATE': 0.5, 'DEFECT': 1.5}, 0.9)
+
+
+class TestSymbolTable(unittest.TestCase):
+
+    def test_intern(self):
+        """Tests whether names get stable small ids and resolve back to one shared copy"""
+        table = SymbolTable()
+        self.assertEqual(table.intern("TFTBot"), 0)
+        self.assertEqual(table.intern("GrimBot"), 1)
+        self.assertEqual(table.intern("TFTBot"), 0)
+        self.assertEqual(table.name(1), "GrimBot")
+        copy = "".join(["TFT", "Bot"])
+        self.assertIs(table.canonical(copy), table.name(0))
+        self.assertEqual(len(table), 2)
+
+    def test_fixed_tables_match_engine_codes(self):
+        """Tests whether action and state ids are the codes the engines use"""
+        self.assertEqual([ACTIONS.ids[COOPERATE], ACTIONS.ids[DEFECT]], [0, 1])
+        self.assertEqual(STATES.ids[None], 2)
+
+    def test_logger_resolves_names_on_export(self):
+        """Tests whether logged turns are kept as ids and read back with their names"""
+        logger = InteractionLogger()
+        log_turn(logger, "QLearningAgent", "TFTBot")
+        log_turn(logger, "QLearningAgent", "GrimBot", COOPERATE)
+        self.assertEqual(list(logger.columns['opponent_name']), [1, 2])
+        records = list(logger.records())
+        self.assertEqual(len(logger), 2)
+        self.assertEqual([record['opponent_name'] for record in records], ["TFTBot", "GrimBot"])
+        self.assertEqual(records[1]['action_taken'], COOPERATE)
+        self.assertEqual(records[0]['q_value_defect'], 1.5)
+
+    def test_extend_remaps_ids(self):
+        """Tests whether turns logged with another table, as in a worker, keep their names"""
+        logger = InteractionLogger()
+        log_turn(logger, "QLearningAgent", "TFTBot")
+        worker_logger = pickle.loads(pickle.dumps(InteractionLogger()))
+        log_turn(worker_logger, "GrimBot", "QLearningAgent")
+        logger.extend(worker_logger)
+        self.assertEqual([(record['agent_name'], record['opponent_name']) for record in logger.records()],
+                         [("QLearningAgent", "TFTBot"), ("GrimBot", "QLearningAgent")])
+        self.assertEqual(len(logger.bots), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+from main import main
+from model.QLearningAgent import QLearningAgent
+from model.bots.DefectBot import DefectBot
+from model.bots.GrimBot import GrimBot
+from model.bots.TFTBot import TFTBot
+from model.constants import *
+from model.tournamentManager import play_game, play_pairing, simulate_round_robin, create_bots
+
+
+class TestTournamentManager(unittest.TestCase):
+
+    def test_play_game_iterations(self):
+        """Tests whether a game plays the requested number of turns"""
+        stats = {}
+        play_game(TFTBot(), DefectBot(), DISCOUNT_FACTOR, None, 0, stats, iterations=10)
+        self.assertEqual(stats["TFTBot"][MATCHES_PLAYED], 10)
+        self.assertEqual(stats["TFTBot"][COOPERATE_COUNT], 1)
+        self.assertEqual(stats["DefectBot"][TOTAL_PAYOFF], 5 + 9 * 1)
+
+    def test_bots_reset_every_round(self):
+        """Tests whether every game of a pairing starts from the bots' initial state"""
+        stats = play_pairing(GrimBot(), DefectBot(), 3, 10, None, 0)
+        self.assertEqual(stats["GrimBot"][COOPERATE_COUNT], 3)
+
+    def test_create_bots(self):
+        """Tests whether bots are created by name and unknown names are rejected"""
+        bots = create_bots(["TFTBot", "QLearningAgent"])
+        self.assertIsInstance(bots[0], TFTBot)
+        self.assertIsInstance(bots[1], QLearningAgent)
+        with self.assertRaises(ValueError):
+            create_bots(["NoSuchBot"])
+
+    def test_seeded_runs_do_not_depend_on_workers(self):
+        """Tests whether a seeded run gives the same stats serially and in parallel"""
+        serial = simulate_round_robin(rounds=5, iterations=10, seed=7)
+        parallel = simulate_round_robin(rounds=5, iterations=10, seed=7, workers=2)
+        self.assertEqual(serial, parallel)
+
+    def test_tournaments_use_fresh_bots(self):
+        """Tests whether every tournament adds one stats entry per pairing"""
+        tournament_stats, aggregate_stats = simulate_round_robin(
+            rounds=2, iterations=5, num_tournaments=3, bot_names=["TFTBot", "DefectBot"])
+        self.assertEqual(len(tournament_stats), 3)
+        self.assertEqual(aggregate_stats["TFTBot"][MATCHES_PLAYED], 3 * 2 * 5)
+
+    def test_cli_outputs(self):
+        """Tests whether the CLI writes its outputs in the chosen format and directory"""
+        with tempfile.TemporaryDirectory() as output_dir:
+            main(["--rounds", "2", "--iterations", "5", "--no-plots", "--format", "json",
+                  "--output-dir", output_dir, "--bots", "QLearningAgent", "TFTBot"])
+            self.assertEqual(sorted(os.listdir(output_dir)),
+                             ["qlearning_detailed_log.json", "tournament_results.npz", "tournament_stats.json"])
+
+    def test_cli_rejects_invalid_options(self):
+        """Tests whether the CLI rejects duplicate bots and a verify sample below 1"""
+        with self.assertRaises(SystemExit):
+            main(["--no-plots", "--bots", "TFTBot", "TFTBot"])
+        with self.assertRaises(SystemExit):
+            main(["--verify", "reproducibility.json", "--verify-sample", "0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
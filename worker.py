@@ -0,0 +1,20 @@
+import argparse
+
+from model.tournamentManager import simulate_round_robin
+from model.logging.csv_export import export_tournament_stats
+
+# Simulation-only entry point: plays the tournament and writes the summary
+# statistics, without loading matplotlib or pandas or buffering per-turn logs.
+# With --connect it plays the work units a coordinator serves instead, see
+# model/distributed.py.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play a tournament, or the work units of a coordinator.")
+    parser.add_argument("--connect", metavar="HOST:PORT", default=None,
+                        help="play the work units served by python main.py --serve HOST:PORT")
+    args = parser.parse_args()
+    if args.connect is not None:
+        from model.distributed import parse_address, run_worker
+        print(f"Played {run_worker(*parse_address(args.connect))} work units")
+    else:
+        tournament_stats, aggregate_stats = simulate_round_robin()
+        export_tournament_stats(aggregate_stats, tournament_stats, 1, 'analysis_output/tournament_stats.csv')